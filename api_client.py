@@ -0,0 +1,329 @@
+"""HTTP client กลางสำหรับคุยกับ POS backend ที่ทุกหน้าใช้ร่วมกัน
+
+ทั้ง process ใช้ ``requests.Session`` ตัวเดียวที่มี connection pool (keep-alive),
+timeout แยกตาม endpoint, retry แบบ backoff + jitter สำหรับ method ที่ idempotent
+และขอ response แบบ gzip เสมอ ข้อผิดพลาดทุกแบบถูกแปลงเป็น ``ApiError``
+เพื่อให้หน้าเพจแสดงข้อความได้โดยไม่ต้องเดาว่ามี ``response`` หรือไม่
+"""
+
+import os
+import threading
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.exceptions import HTTPError as Urllib3Error
+from urllib3.util.retry import Retry
+
+import perf_spans
+
+API_BASE_URL = os.environ.get("POS_API_BASE_URL", "http://localhost:8000").rstrip("/")
+
+# (connect timeout, read timeout) เป็นวินาที
+DEFAULT_TIMEOUT: Tuple[float, float] = (3.05, 10.0)
+ENDPOINT_TIMEOUTS: Dict[str, Tuple[float, float]] = {
+    "products": (3.05, 5.0),
+    "orders": (3.05, 15.0),
+    "create_order": (3.05, 10.0),
+    "product_write": (3.05, 10.0),
+    "upload_image": (3.05, 30.0),
+    "image": (3.05, 15.0),
+    # feed ส่ง heartbeat ทุก ~15 วินาที ถ้าเงียบนานกว่านี้ถือว่าขาด
+    "order_stream": (3.05, 45.0),
+}
+
+POOL_SIZE = int(os.environ.get("POS_API_POOL_SIZE", "16"))
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.3
+BACKOFF_JITTER = 0.2
+RETRY_STATUSES = (429, 502, 503, 504)
+# POST ไม่ถูก retry อัตโนมัติ เพราะอาจทำให้ออเดอร์ถูกบันทึกซ้ำ
+RETRY_METHODS = frozenset({"GET", "HEAD", "PUT", "DELETE", "OPTIONS"})
+
+
+class ApiError(Exception):
+    """ข้อผิดพลาดทุกแบบที่เกิดจากการเรียก backend"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, detail: Optional[str] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.detail = detail or message
+
+
+class ApiConnectionError(ApiError):
+    """เชื่อมต่อ backend ไม่ได้ (รวมถึงหลัง retry ครบแล้ว)"""
+
+
+class ApiUnreachableError(ApiConnectionError):
+    """เปิด connection ไปหา backend ไม่ได้เลย request ยังไม่ถูกส่ง (ส่งซ้ำได้โดยไม่เสี่ยงซ้ำ)"""
+
+
+class ApiTimeoutError(ApiError):
+    """backend ตอบช้ากว่า timeout ของ endpoint นั้น"""
+
+
+class ApiResponseError(ApiError):
+    """backend ตอบกลับด้วย status ผิดพลาด หรือ body ที่อ่านไม่ได้"""
+
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def _build_session() -> requests.Session:
+    retry = Retry(
+        total=MAX_RETRIES,
+        connect=MAX_RETRIES,
+        read=MAX_RETRIES,
+        status=MAX_RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        backoff_jitter=BACKOFF_JITTER,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=RETRY_METHODS,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"Accept": "application/json", "Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"})
+    return session
+
+
+def get_session() -> requests.Session:
+    """คืน Session ที่ใช้ร่วมกันทั้ง process (สร้างครั้งแรกที่ถูกเรียก)"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def reset_session() -> None:
+    """ปิด connection pool เดิม ใช้ตอนเปลี่ยน config หรือในสคริปต์ทดสอบ"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def _error_detail(response: requests.Response) -> str:
+    try:
+        body = response.json()
+    except ValueError:
+        return response.text or response.reason or f"HTTP {response.status_code}"
+    if isinstance(body, dict) and body.get("detail"):
+        return str(body["detail"])
+    return str(body)
+
+
+def _not_sent(e: requests.exceptions.RequestException) -> bool:
+    # requests ห่อ MaxRetryError ของ urllib3 ไว้ใน args[0] โดยมีสาเหตุจริงอยู่ที่ .reason
+    reason = getattr(e.args[0], "reason", None) if e.args else None
+    return isinstance(e, requests.exceptions.ConnectTimeout) or isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+
+def request(method: str, path: str, endpoint: Optional[str] = None, **kwargs: Any) -> requests.Response:
+    """ยิง request ผ่าน Session กลาง แล้วคืน response ที่ status สำเร็จเท่านั้น
+
+    ``endpoint`` ใช้เลือก timeout จาก ``ENDPOINT_TIMEOUTS``; ส่ง ``timeout`` เองก็ได้
+    """
+    kwargs.setdefault("timeout", ENDPOINT_TIMEOUTS.get(endpoint or "", DEFAULT_TIMEOUT))
+    url = f"{API_BASE_URL}{path}"
+    try:
+        with perf_spans.span(f"api.http.{endpoint or method}"):
+            response = get_session().request(method, url, **kwargs)
+    except requests.exceptions.RequestException as e:
+        if _not_sent(e):
+            raise ApiUnreachableError(f"{method} {path} เชื่อมต่อไม่ได้", detail=str(e)) from e
+        if isinstance(e, requests.exceptions.Timeout):
+            raise ApiTimeoutError(f"{method} {path} หมดเวลารอการตอบกลับ", detail=str(e)) from e
+        raise ApiConnectionError(f"{method} {path} เชื่อมต่อไม่ได้", detail=str(e)) from e
+    if response.status_code >= 400:
+        detail = _error_detail(response)
+        raise ApiResponseError(f"{method} {path} ล้มเหลว ({response.status_code}): {detail}", status_code=response.status_code, detail=detail)
+    return response
+
+
+def request_json(method: str, path: str, endpoint: Optional[str] = None, **kwargs: Any) -> Any:
+    response = request(method, path, endpoint=endpoint, **kwargs)
+    if response.status_code == 204 or not response.content:
+        return None
+    try:
+        with perf_spans.span("api.json_decode"):
+            return response.json()
+    except ValueError as e:
+        raise ApiResponseError(f"{method} {path} ตอบกลับด้วยข้อมูลที่ไม่ใช่ JSON", status_code=response.status_code) from e
+
+
+# --- Endpoint helpers ---
+
+@perf_spans.timed("api.fetch_products")
+def fetch_products() -> List[Dict[str, Any]]:
+    return request_json("GET", "/products", endpoint="products") or []
+
+
+@perf_spans.timed("api.fetch_orders")
+def fetch_orders() -> List[Dict[str, Any]]:
+    return request_json("GET", "/orders", endpoint="orders") or []
+
+
+class OrdersPage(NamedTuple):
+    orders: List[Dict[str, Any]]
+    next_cursor: Optional[str]
+
+
+def _order_matches(order: Dict[str, Any], params: Dict[str, Any]) -> bool:
+    order_day = str(order.get("order_date", ""))[:10]
+    if "start_date" in params and order_day < params["start_date"]:
+        return False
+    if "end_date" in params and order_day > params["end_date"]:
+        return False
+    if "order_id" in params and str(order.get("id")) != params["order_id"]:
+        return False
+    if "product" in params:
+        needle = params["product"].casefold()
+        if not any(needle in str(item.get("product_name", "")).casefold() for item in order.get("items", [])):
+            return False
+    return True
+
+
+def _legacy_orders_page(orders: List[Dict[str, Any]], limit: int, cursor: Optional[str], params: Dict[str, Any]) -> OrdersPage:
+    # backend รุ่นเก่าไม่รู้จัก query parameter และคืนออเดอร์ทั้งหมดเป็น list จึงกรอง/แบ่งหน้าเองในฝั่งนี้
+    matched = sorted((o for o in orders if _order_matches(o, params)), key=lambda o: o.get("id", 0), reverse=True)
+    offset = int(cursor or 0)
+    next_offset = offset + limit
+    return OrdersPage(matched[offset:next_offset], str(next_offset) if next_offset < len(matched) else None)
+
+
+@perf_spans.timed("api.fetch_orders_page")
+def fetch_orders_page(
+    limit: int = 25,
+    cursor: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    order_id: Optional[str] = None,
+    product: Optional[str] = None,
+) -> OrdersPage:
+    """ดึงออเดอร์ทีละหน้า (ใหม่สุดก่อน) โดยให้ backend กรองตามช่วงวันที่ (YYYY-MM-DD), id และชื่อสินค้า
+
+    ``cursor`` เป็นค่าที่ได้จาก ``next_cursor`` ของหน้าก่อนหน้า
+    """
+    filters = {"start_date": start_date, "end_date": end_date, "order_id": order_id, "product": product}
+    params: Dict[str, Any] = {k: v for k, v in filters.items() if v}
+    query = dict(params, limit=limit)
+    if cursor:
+        query["cursor"] = cursor
+    data = request_json("GET", "/orders", endpoint="orders", params=query)
+    if isinstance(data, list):
+        return _legacy_orders_page(data, limit, cursor, params)
+    data = data or {}
+    next_cursor = data.get("next_cursor")
+    return OrdersPage(data.get("orders", []), str(next_cursor) if next_cursor is not None else None)
+
+
+@perf_spans.timed("api.fetch_orders_since")
+def fetch_orders_since(since_id: int, limit: int = 1000) -> OrdersPage:
+    """ดึงออเดอร์ที่ id มากกว่า ``since_id`` เรียงจากเก่าไปใหม่ ครั้งละไม่เกิน ``limit`` รายการ
+
+    ถ้ายังมีต่อ ``next_cursor`` คือ id ที่ต้องส่งเป็น ``since_id`` ในรอบถัดไป
+    """
+    data = request_json("GET", "/orders", endpoint="orders", params={"since_id": since_id, "limit": limit})
+    if isinstance(data, list):
+        newer = sorted((o for o in data if o.get("id", 0) > since_id), key=lambda o: o["id"])
+        return OrdersPage(newer, None)
+    data = data or {}
+    next_cursor = data.get("next_cursor")
+    return OrdersPage(data.get("orders", []), str(next_cursor) if next_cursor is not None else None)
+
+
+@perf_spans.timed("api.create_order")
+def create_order(order_items: List[Dict[str, Any]], idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+    headers = {"Idempotency-Key": idempotency_key} if idempotency_key else None
+    return request_json("POST", "/orders", endpoint="create_order", json={"items": order_items}, headers=headers) or {}
+
+
+@perf_spans.timed("api.create_product")
+def create_product(name: str, price: float, category: str) -> Dict[str, Any]:
+    return request_json("POST", "/products", endpoint="product_write", json={"name": name, "price": price, "category": category}) or {}
+
+
+@perf_spans.timed("api.delete_product")
+def delete_product(product_id: Any) -> None:
+    request("DELETE", f"/products/{product_id}", endpoint="product_write")
+
+
+@perf_spans.timed("api.upload_product_image")
+def upload_product_image(product_id: Any, image_file: Any) -> Dict[str, Any]:
+    return request_json("POST", f"/products/{product_id}/upload-image", endpoint="upload_image", files={"file": image_file}) or {}
+
+
+@perf_spans.timed("api.fetch_image")
+def fetch_image(image_url: str) -> bytes:
+    """ดาวน์โหลดไฟล์รูปต้นฉบับ (``image_url`` เป็น path จาก backend หรือ URL เต็มก็ได้)"""
+    if image_url.startswith(("http://", "https://")):
+        if not image_url.startswith(API_BASE_URL):
+            raise ApiError(f"ไม่รองรับรูปจาก {image_url}")
+        image_url = image_url[len(API_BASE_URL):]
+    return request("GET", image_url, endpoint="image").content
+
+
+@perf_spans.timed("api.update_product")
+def update_product(product_id: Any, fields: Dict[str, Any]) -> Dict[str, Any]:
+    return request_json("PUT", f"/products/{product_id}", endpoint="product_write", json=fields) or {}
+
+
+class FeedEvent(NamedTuple):
+    event: str
+    id: Optional[str]
+    data: str
+
+
+def _iter_sse(response: requests.Response) -> Iterator[FeedEvent]:
+    # read1 คืนข้อมูลเท่าที่มาถึงแล้ว (iter_content จะรอจนครบ chunk_size ก่อน)
+    buffer = b""
+    event, event_id, data = "message", None, []
+    while True:
+        chunk = response.raw.read1(8192)
+        if not chunk:
+            return
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for raw_line in lines:
+            line = raw_line.rstrip(b"\r").decode("utf-8")
+            if not line:
+                if data:
+                    yield FeedEvent(event, event_id, "\n".join(data))
+                event, data = "message", []
+                continue
+            if line.startswith(":"):
+                continue
+            field, _, value = line.partition(":")
+            value = value[1:] if value.startswith(" ") else value
+            if field == "event":
+                event = value
+            elif field == "data":
+                data.append(value)
+            elif field == "id":
+                event_id = value
+
+
+def stream_orders(since_id: int) -> Iterator[FeedEvent]:
+    """เปิด feed ออเดอร์ใหม่ ``GET /orders/stream`` (server-sent events) ต่อจาก ``since_id``
+
+    event แรกเป็น ``open`` เมื่อเชื่อมต่อสำเร็จ จากนั้นวนคืน event ไปเรื่อยๆ จนกว่า server จะปิด
+    ถ้า feed ขาดกลางทางจะโยน ``ApiError``
+    """
+    headers = {"Accept": "text/event-stream", "Accept-Encoding": "identity", "Last-Event-ID": str(since_id)}
+    response = request("GET", "/orders/stream", endpoint="order_stream", params={"since_id": since_id}, headers=headers, stream=True)
+    try:
+        yield FeedEvent("open", None, "")
+        yield from _iter_sse(response)
+    except (requests.exceptions.RequestException, Urllib3Error, OSError) as e:
+        # อ่านจาก raw ตรงๆ จึงเจอ exception ของ urllib3 (ProtocolError, ReadTimeoutError) แทนของ requests
+        raise ApiConnectionError("feed ออเดอร์ขาด", detail=str(e)) from e
+    finally:
+        response.close()
@@ -0,0 +1,68 @@
+"""เทียบ latency ระหว่าง ``requests.get`` แบบเดิมกับ ``api_client`` (Session + pool)
+
+รันกับ backend จำลองบนเครื่อง:
+
+    python -m bench.bench_api_client --requests 200 --products 300
+"""
+
+import argparse
+import statistics
+import time
+from typing import Callable, Dict, List
+
+import requests
+
+import api_client
+from bench.standin_api import StandinState, serve
+
+
+def _legacy_get_products(base_url: str) -> list:
+    response = requests.get(f"{base_url}/products")
+    response.raise_for_status()
+    return response.json()
+
+
+def _time_calls(fn: Callable[[], object], count: int) -> List[float]:
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "mean_ms": statistics.fmean(ordered),
+        "p50_ms": ordered[len(ordered) // 2],
+        "p95_ms": ordered[int(len(ordered) * 0.95) - 1],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--products", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = serve(StandinState(products=args.products, orders=0, latency=args.latency))
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    api_client.API_BASE_URL = base_url
+    api_client.reset_session()
+    try:
+        results = {
+            "legacy requests.get": _summary(_time_calls(lambda: _legacy_get_products(base_url), args.requests)),
+            "api_client.fetch_products": _summary(_time_calls(api_client.fetch_products, args.requests)),
+        }
+    finally:
+        server.shutdown()
+
+    print(f"{'helper':<28}{'mean':>10}{'p50':>10}{'p95':>10}")
+    for name, stats in results.items():
+        print(f"{name:<28}{stats['mean_ms']:>9.2f}ms{stats['p50_ms']:>8.2f}ms{stats['p95_ms']:>8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""เวลานำเข้าเมนูทั้งสาขาด้วย ``catalog_bulk`` เทียบจำนวน worker และเวลาส่งออก/นำเข้าซ้ำ
+
+สร้าง ZIP เมนูใหม่ (สินค้า + options + รูป) แล้วนำเข้า backend จำลองที่มี latency ต่อ request
+ทีละรอบด้วยจำนวน worker ต่างกัน จากนั้นส่งออกเป็น ZIP และนำไฟล์นั้นกลับเข้าไป (ต้องไม่มีอะไรเปลี่ยน)
+
+    python -m bench.bench_catalog_bulk --products 300 --latency 0.05 --workers 1 8
+"""
+
+import argparse
+import io
+import json
+import time
+import zipfile
+
+import api_client
+import catalog_bulk
+from bench.bench_images import make_photo
+from bench.standin_api import StandinState, serve
+from bench.synthetic import make_products
+
+
+def make_menu_zip(count: int) -> bytes:
+    buffer = io.BytesIO()
+    records = []
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for product in make_products(count, seed=1):
+            image_name = f"images/{product['id']}.jpg"
+            archive.writestr(image_name, make_photo(product["id"], size=(800, 600)))
+            records.append(dict(catalog_bulk.export_record(product, image_name), id=None, name=f"สาขาใหม่ {product['name']}"))
+        archive.writestr("products.json", json.dumps(records, ensure_ascii=False))
+    return buffer.getvalue()
+
+
+def import_zip(data: bytes, workers: int) -> catalog_bulk.BulkJob:
+    rows, issues = catalog_bulk.read_import("menu.zip", data)
+    changes, plan_issues = catalog_bulk.plan(rows, api_client.fetch_products())
+    assert not issues and not plan_issues, issues + plan_issues
+    job = catalog_bulk.BulkJob([c for c in changes if c.action != catalog_bulk.UNCHANGED], workers=workers)
+    job.run()
+    return job
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="bulk catalog import/export timing")
+    parser.add_argument("--products", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.05, help="latency ต่อ request ของ backend (วินาที)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8])
+    args = parser.parse_args()
+
+    menu = make_menu_zip(args.products)
+    print(f"{args.products} products, import ZIP {len(menu) / 1e6:.1f} MB, backend latency {args.latency * 1000:.0f}ms")
+    for workers in args.workers:
+        state = StandinState(products=0, orders=0, latency=args.latency)
+        server = serve(state)
+        api_client.API_BASE_URL = f"http://127.0.0.1:{server.server_port}"
+        api_client.reset_session()
+        try:
+            start = time.perf_counter()
+            job = import_zip(menu, workers)
+            import_s = time.perf_counter() - start
+
+            exported = io.BytesIO()
+            start = time.perf_counter()
+            export_issues = catalog_bulk.write_export(exported, api_client.fetch_products(), workers=workers)
+            export_s = time.perf_counter() - start
+
+            requests_before = state.request_count
+            start = time.perf_counter()
+            again = import_zip(exported.getvalue(), workers)
+            reimport_s = time.perf_counter() - start
+        finally:
+            server.shutdown()
+        print(f"workers {workers:>2}: import {import_s:6.1f}s {job.summary()}  export {export_s:5.1f}s ({len(export_issues)} issues)  "
+              f"re-import {reimport_s:5.1f}s {again.summary()} uploads "
+              f"{sum('อัปโหลดรูป' in r.message for r in again.results)}, {state.request_count - requests_before} requests")
+
+
+if __name__ == "__main__":
+    main()
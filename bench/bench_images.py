@@ -0,0 +1,101 @@
+"""เทียบการแสดงรูปเมนู: โหลดรูปต้นฉบับทุกครั้ง (แบบเดิม) กับรูปย่อจาก ``image_cache``
+
+อัปโหลดรูป JPEG ขนาดใหญ่ (เหมือนถ่ายจากมือถือ) เข้า backend จำลอง แล้ววัดจำนวน byte และเวลา
+ต่อการ render หน้าเมนูหนึ่งครั้ง พร้อมประมาณเวลาส่งผ่าน Wi-Fi ตามแบนด์วิดท์ที่กำหนด
+รูปย่อวัดหลังผ่านขั้นตอนเดียวกับที่ ``st.image`` ทำกับ bytes (ตรวจรูปแบบ/ย่อ/แปลงใหม่) คือ byte ที่ browser ได้จริง
+
+    python -m bench.bench_images --products 40 --latency 0.02 --mbps 20
+"""
+
+import argparse
+import io
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+from streamlit.elements.lib import image_utils
+
+import api_client
+import image_cache
+from bench.standin_api import StandinState, serve
+
+
+def make_photo(seed: int, size=(3024, 2016)) -> bytes:
+    """รูป JPEG สุ่มที่มีรายละเอียดหลายระดับ ให้ขนาดไฟล์และรูปย่อใกล้เคียงรูปถ่ายจริง"""
+    rng = np.random.default_rng(seed)
+    width, height = size
+    coarse = Image.fromarray(rng.integers(0, 256, (12, 18, 3), dtype=np.uint8)).resize(size, Image.BICUBIC)
+    detail = Image.fromarray(rng.integers(0, 256, (height // 8, width // 8, 3), dtype=np.uint8)).resize(size, Image.BILINEAR)
+    noise = rng.normal(0, 6, (height, width, 3))
+    pixels = np.asarray(coarse, dtype=np.float32) * 0.7 + np.asarray(detail, dtype=np.float32) * 0.3 + noise
+    pixels = np.clip(pixels, 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+# width ที่หน้าเพจส่งให้ st.image: เมนูใช้ use_container_width, หน้า admin ใช้ width=150
+DISPLAY_WIDTHS = {"menu": int(image_utils.WidthBehavior.COLUMN), "admin": 150}
+
+
+def st_image_bytes(data: bytes, width: int) -> bytes:
+    """bytes ที่ ``st.image`` ส่งให้ browser (ขั้นตอนเดียวกับ ``image_utils.image_to_url`` ของ Streamlit 1.47)"""
+    image_format = image_utils._validate_image_format_string(data, "auto")
+    return image_utils._ensure_image_size_and_format(data, width, image_format)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="menu image benchmark")
+    parser.add_argument("--products", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.02, help="latency ต่อ request ของ backend (วินาที)")
+    parser.add_argument("--mbps", type=float, default=20.0, help="แบนด์วิดท์ Wi-Fi ของ tablet ที่ใช้ประมาณเวลาส่ง")
+    args = parser.parse_args()
+
+    state = StandinState(products=args.products, orders=0)
+    server = serve(state)
+    api_client.API_BASE_URL = f"http://127.0.0.1:{server.server_port}"
+    api_client.reset_session()
+    try:
+        for product in list(state.products):
+            api_client.upload_product_image(product["id"], ("photo.jpg", make_photo(product["id"]), "image/jpeg"))
+        products = api_client.fetch_products()
+        state.latency = args.latency
+
+        start = time.perf_counter()
+        original_bytes = sum(len(api_client.fetch_image(p["image_url"])) for p in products)
+        original_s = time.perf_counter() - start
+
+        cache = image_cache.ImageCache(tempfile.mkdtemp(prefix="pos_images_"))
+        # render แรกตอนแคชว่าง: ไม่รอย่อรูป (ใช้ URL ต้นฉบับ) แล้ววัดเวลาจนรูปย่อพร้อมครบ
+        start = time.perf_counter()
+        misses = sum(cache.get(p, "menu") is None for p in products)
+        cold_s = time.perf_counter() - start
+        while cache.pending:
+            time.sleep(0.01)
+        build_s = time.perf_counter() - start
+
+        served = {}
+        for variant, width in DISPLAY_WIDTHS.items():
+            start = time.perf_counter()
+            cached = [cache.get(p, variant) for p in products]
+            sent = [st_image_bytes(data, width) for data in cached]
+            served[variant] = (sum(map(len, cached)), sum(map(len, sent)), time.perf_counter() - start,
+                               sum(a is not b for a, b in zip(cached, sent)))
+    finally:
+        server.shutdown()
+
+    def wifi_s(n_bytes: int) -> float:
+        return n_bytes * 8 / (args.mbps * 1_000_000)
+
+    print(f"{len(products)} products, backend latency {args.latency * 1000:.0f}ms, Wi-Fi {args.mbps:.0f} Mbps")
+    print(f"original per menu render : {original_bytes / 1e6:8.2f} MB  fetch {original_s:6.2f}s  + Wi-Fi ~{wifi_s(original_bytes):6.2f}s")
+    for variant, (cached_bytes, sent_bytes, render_s, reencoded) in served.items():
+        print(f"{variant + ' variant per render':<25}: {sent_bytes / 1e6:8.2f} MB  cache + st.image {render_s:6.3f}s  + Wi-Fi ~{wifi_s(sent_bytes):6.2f}s  "
+              f"({original_bytes / sent_bytes:.0f}x fewer bytes; cached {cached_bytes / 1e6:.2f} MB, st.image re-encoded {reencoded}/{len(products)})")
+    print(f"first render with empty cache: {cold_s:.3f}s ({misses} served from original URL); "
+          f"variants built in background in {build_s:.2f}s ({image_cache.BUILD_WORKERS} workers); cache on disk {cache.total_bytes / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
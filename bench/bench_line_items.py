@@ -0,0 +1,65 @@
+"""เทียบเวลาแปลงออเดอร์เป็นรายการสินค้า: แบบเดิมของ Dashboard (explode + json_normalize + apply)
+กับ ``line_items.flatten_line_items`` (pyarrow compute)
+
+    python -m bench.bench_line_items --items 1000000
+"""
+
+import argparse
+import time
+
+import pandas as pd
+
+from bench.synthetic import make_orders, make_products
+from line_items import flatten_line_items
+from order_store import orders_to_table
+
+AVG_ITEMS_PER_ORDER = 2.5
+
+
+def legacy_flatten(orders_df: pd.DataFrame, products: list) -> pd.DataFrame:
+    """โค้ดเดิมของ pages/dashboard.py ก่อนเปลี่ยนมาใช้ line_items"""
+    all_items_df = orders_df.explode('items')
+    items_detail_df = pd.json_normalize(all_items_df['items'].apply(lambda x: x if isinstance(x, dict) else {}))
+    if 'item_total' not in items_detail_df.columns:
+        items_detail_df['item_total'] = 0
+    items_detail_df['item_total'] = items_detail_df['item_total'].fillna(0)
+    product_category_map = pd.DataFrame(products).set_index('id')['category'].to_dict()
+    items_detail_df['category'] = items_detail_df['product_id'].apply(lambda x: product_category_map.get(x))
+    return items_detail_df
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="line-item flattening benchmark")
+    parser.add_argument("--items", type=int, default=1_000_000, help="จำนวนรายการสินค้าโดยประมาณ")
+    parser.add_argument("--products", type=int, default=300)
+    parser.add_argument("--legacy-ratio", type=float, default=0.1)
+    args = parser.parse_args()
+
+    products = make_products(args.products)
+    orders = make_orders(int(args.items / AVG_ITEMS_PER_ORDER), products, legacy_ratio=args.legacy_ratio)
+    orders_df = pd.DataFrame(orders)
+    orders_table = orders_to_table(orders)
+    del orders
+
+    legacy, legacy_s = _timed(lambda: legacy_flatten(orders_df, products))
+    vectorized, vectorized_s = _timed(lambda: flatten_line_items(orders_table, products).to_pandas())
+
+    print(f"{len(vectorized):,} line items from {orders_table.num_rows:,} orders")
+    print(f"legacy explode/json_normalize/apply : {legacy_s:8.2f}s")
+    print(f"flatten_line_items (pyarrow)        : {vectorized_s:8.2f}s  ({legacy_s / vectorized_s:.1f}x)")
+
+    by_product_legacy = legacy.groupby('product_name')['quantity'].sum().sort_index()
+    by_product_new = vectorized.groupby('product_name', observed=True)['quantity'].sum()
+    by_product_new.index = by_product_new.index.astype(str)
+    by_product_new = by_product_new.sort_index()
+    print("quantity by product matches:", by_product_legacy.astype('int64').equals(by_product_new.astype('int64')))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""หน่วยความจำและเวลาในการส่งออกรายการสินค้า: ดึงทั้งหมดครั้งเดียว (แบบเดิม) เทียบกับ ``order_export``
+
+backend จำลองรันใน process แยก และแต่ละโหมดรันใน process ใหม่ของตัวเอง peak RSS จึงไม่ปนกัน
+ทุกโหมดส่งออกออเดอร์ทั้งหมดในช่วง ``--days`` วันล่าสุด แล้วอ่านไฟล์กลับมาเทียบจำนวนแถวและยอดรวม
+
+    python -m bench.bench_order_export --orders 50000 200000
+"""
+
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import Any, Dict
+
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from bench.bench_pages import ROOT, _peak_rss_mb, _reset_peak_rss, _start_standin
+
+MODES = ["fetch_all_csv", "paged_csv", "paged_parquet", "snapshot_parquet"]
+
+
+def run_worker(mode: str, days: int) -> Dict[str, Any]:
+    # ต้องตั้ง POS_API_BASE_URL / POS_ORDER_STORE_DIR ใน environment ก่อน import โมดูลของแอป
+    import api_client
+    import order_export
+    from line_items import item_unit_price
+    from order_store import store
+
+    end_date = date.today()
+    start_date = end_date - timedelta(days=days)
+    products = api_client.fetch_products()
+    path = os.path.join(tempfile.mkdtemp(prefix="pos_export_"), f"export.{mode.rsplit('_', 1)[1]}")
+    if mode == "snapshot_parquet":
+        store.sync(force=True)
+    _reset_peak_rss()
+    baseline = _peak_rss_mb()
+    start = time.perf_counter()
+    if mode == "fetch_all_csv":
+        # แบบเดิม: GET /orders ทั้งหมดเป็น list แล้ววนสร้างแถวใน Python
+        orders = api_client.fetch_orders()
+        with open(path, "w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.writer(f)
+            writer.writerow(["order_id", "order_date", "product_id", "product_name", "quantity", "unit_price", "item_total"])
+            for order in orders:
+                if not start_date.isoformat() <= order["order_date"][:10] <= end_date.isoformat():
+                    continue
+                for item in order["items"]:
+                    unit = item_unit_price(item)
+                    total = item.get("item_total", unit * item.get("quantity", 0))
+                    writer.writerow([order["id"], order["order_date"], item["product_id"], item["product_name"], item["quantity"], unit, total])
+    else:
+        fmt = mode.rsplit("_", 1)[1]
+        if mode == "snapshot_parquet":
+            chunks = order_export.iter_snapshot_orders(store.table(), start_date, end_date)
+        else:
+            chunks = order_export.iter_api_orders(start_date, end_date)
+        with open(path, "wb") as f:
+            order_export.write_export(f, chunks, "line_items", fmt, products)
+    elapsed = time.perf_counter() - start
+    peak = _peak_rss_mb()
+    table = pq.read_table(path) if path.endswith(".parquet") else pa_csv.read_csv(path)
+    return {
+        "seconds": elapsed,
+        "peak_rss_delta_mb": peak - baseline,
+        "file_mb": os.path.getsize(path) / 1e6,
+        "rows": table.num_rows,
+        "item_total": round(float(table.column("item_total").to_numpy().sum()), 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="line-item export memory and time")
+    parser.add_argument("--orders", type=int, nargs="+", default=[50_000, 200_000])
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--worker", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.days)))
+        return
+
+    standin_args = argparse.Namespace(products=300, latency=0.0, error_rate=0.0, legacy_ratio=0.2, seed=0)
+    for orders in args.orders:
+        proc, base_url = _start_standin(standin_args, orders)
+        try:
+            for mode in args.modes:
+                env = dict(os.environ, POS_API_BASE_URL=base_url, POS_ORDER_STORE_DIR=tempfile.mkdtemp(prefix="pos_export_store_"))
+                out = subprocess.run([sys.executable, "-m", "bench.bench_order_export", "--worker", mode, "--days", str(args.days)],
+                                     cwd=ROOT, env=env, check=True, capture_output=True, text=True)
+                result = json.loads(out.stdout.strip().splitlines()[-1])
+                print(f"{orders:>8} orders  {mode:<17} {result['seconds']:6.1f}s  peak RSS +{result['peak_rss_delta_mb']:6.0f}MB  "
+                      f"file {result['file_mb']:6.1f}MB  rows {result['rows']:>8}  item_total {result['item_total']:,.2f}")
+        finally:
+            proc.kill()
+
+
+if __name__ == "__main__":
+    main()
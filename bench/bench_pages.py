@@ -0,0 +1,262 @@
+"""วัดเวลาและหน่วยความจำต่อ rerun ของทุกหน้า (AppTest แบบ headless) ตามจำนวนออเดอร์
+
+แต่ละขนาดข้อมูลจะรัน backend จำลอง (``bench.standin_api``) เป็น process แยก และแต่ละหน้า
+รันใน process ของตัวเอง หน่วยความจำที่วัดได้จึงเป็นของหน้านั้นล้วนๆ ไม่ปน backend จำลอง
+หรือหน้าอื่น ผลลัพธ์เขียนเป็น JSON เพื่อเทียบระหว่างเวอร์ชัน
+
+    python -m bench.bench_pages --orders 1000 100000 1000000 --runs 5 --output before.json
+    python -m bench.bench_pages --compare before.json after.json
+
+วัดต่อหน้า:
+  * ``cold_ms``   - รันครั้งแรกของ process (รวมโหลด catalog, sync order store ทั้งหมด ฯลฯ)
+  * ``rerun_ms``  - rerun ถัดๆ ไป (สภาพปกติระหว่างใช้งาน)
+    ทั้งสองค่าเป็นเวลาของตัวสคริปต์ ส่วน ``apptest_wall_ms`` รวม overhead ของ AppTest ด้วย
+  * ``peak_rss_mb`` - RSS สูงสุดระหว่างแต่ละรอบ (Linux รีเซ็ตค่า peak ได้ทุกรอบ ที่อื่นเป็นค่าสูงสุดสะสม)
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = {
+    "pos": "pos_frontend.py",
+    "dashboard": os.path.join("pages", "dashboard.py"),
+    "order_history": os.path.join("pages", "order_history.py"),
+    "product_management": os.path.join("pages", "product_management.py"),
+}
+DEFAULT_OUTPUT_DIR = os.path.join(ROOT, ".pos_data", "bench")
+# เทียบผลสองไฟล์: ช้าลงเกินสัดส่วนนี้ถือว่า regression
+REGRESSION_THRESHOLD = 0.10
+
+
+# --- worker: รันหน้าเดียวใน process นี้ ---
+
+def _reset_peak_rss() -> bool:
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _instrument_apptest() -> Dict[str, float]:
+    """จับเวลาตัวสคริปต์เอง (SCRIPT_STARTED -> SHUTDOWN) แยกจาก overhead ของ AppTest
+
+    ``LocalScriptRunner.script_stopped`` เดิมไล่ดู event ทั้งหมดทุก 1ms ระหว่างรอสคริปต์ หน้าที่มี
+    element หลายพันตัวจึงเสียเวลาไปกับการวนนี้ (และแย่ง GIL จากสคริปต์) มากกว่าตัวหน้าเอง
+    จึงเปลี่ยนให้ดูแค่ event ล่าสุด ซึ่งเป็น SHUTDOWN เสมอเมื่อสคริปต์จบ
+    """
+    from streamlit.runtime.scriptrunner.script_runner import ScriptRunnerEvent
+    from streamlit.testing.v1 import local_script_runner
+
+    marks: Dict[str, float] = {}
+    runner_cls = local_script_runner.LocalScriptRunner
+    original_init = runner_cls.__init__
+
+    def record(sender: Any, event: ScriptRunnerEvent, **kwargs: Any) -> None:
+        if event == ScriptRunnerEvent.SCRIPT_STARTED:
+            marks.setdefault("started", time.perf_counter())
+        elif event == ScriptRunnerEvent.SHUTDOWN:
+            marks["stopped"] = time.perf_counter()
+
+    def init(self: Any, *args: Any, **kwargs: Any) -> None:
+        original_init(self, *args, **kwargs)
+        self.on_event.connect(record, weak=False)
+
+    runner_cls.__init__ = init
+    runner_cls.script_stopped = lambda self: bool(self.events) and self.events[-1] == ScriptRunnerEvent.SHUTDOWN
+    return marks
+
+
+def run_worker(page: str, runs: int, timeout: float) -> Dict[str, Any]:
+    # ต้องตั้ง POS_API_BASE_URL / POS_*_DIR ใน environment ก่อน import โมดูลของแอป
+    from streamlit.testing.v1 import AppTest
+
+    marks = _instrument_apptest()
+    app = AppTest.from_file(os.path.join(ROOT, PAGES[page]), default_timeout=timeout)
+    script_ms, wall_ms, peaks, errors = [], [], [], []
+    for _ in range(runs + 1):
+        marks.clear()
+        _reset_peak_rss()
+        start = time.perf_counter()
+        app.run()
+        wall_ms.append((time.perf_counter() - start) * 1000)
+        script_ms.append((marks["stopped"] - marks["started"]) * 1000)
+        peaks.append(_peak_rss_mb())
+        errors.extend(e.value for e in app.exception)
+        errors.extend(e.value for e in app.error)
+    return {
+        "cold_ms": script_ms[0],
+        "rerun_ms": script_ms[1:],
+        "apptest_wall_ms": wall_ms,
+        "cold_peak_rss_mb": peaks[0],
+        "peak_rss_mb": peaks[1:],
+        "errors": sorted(set(map(str, errors))),
+    }
+
+
+# --- ตัวรันหลัก ---
+
+def _start_standin(args: argparse.Namespace, orders: int) -> Tuple[subprocess.Popen, str]:
+    cmd = [
+        sys.executable, "-m", "bench.standin_api", "--port", "0",
+        "--products", str(args.products), "--orders", str(orders), "--latency", str(args.latency),
+        "--error-rate", str(args.error_rate), "--legacy-ratio", str(args.legacy_ratio), "--seed", str(args.seed),
+    ]
+    proc = subprocess.Popen(cmd, cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline()
+    if not line.startswith("stand-in API: "):
+        proc.kill()
+        raise RuntimeError(f"stand-in API failed to start: {line!r}")
+    return proc, line.split(": ", 1)[1].strip()
+
+
+def _run_page(args: argparse.Namespace, page: str, base_url: str) -> Dict[str, Any]:
+    data_dir = tempfile.mkdtemp(prefix="pos_bench_")
+    env = dict(
+        os.environ,
+        POS_API_BASE_URL=base_url,
+        POS_ORDER_STORE_DIR=os.path.join(data_dir, "orders"),
+        POS_ORDER_QUEUE_PATH=os.path.join(data_dir, "order_queue.sqlite3"),
+        POS_IMAGE_CACHE_DIR=os.path.join(data_dir, "images"),
+    )
+    cmd = [sys.executable, "-m", "bench.bench_pages", "--worker", page, "--runs", str(args.runs), "--timeout", str(args.timeout)]
+    try:
+        proc = subprocess.run(cmd, cwd=ROOT, env=env, capture_output=True, text=True)
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+    if proc.returncode != 0:
+        return {"errors": [f"worker exited with {proc.returncode}: {proc.stderr.strip()[-2000:]}"]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def _summarize(result: Dict[str, Any]) -> Dict[str, Any]:
+    reruns = result.get("rerun_ms") or []
+    if reruns:
+        ordered = sorted(reruns)
+        result["median_ms"] = statistics.median(ordered)
+        result["p95_ms"] = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+        result["max_peak_rss_mb"] = max(result["peak_rss_mb"] + [result["cold_peak_rss_mb"]])
+    return result
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _metadata(args: argparse.Namespace) -> Dict[str, Any]:
+    import pandas
+    import pyarrow
+    import streamlit
+
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "streamlit": streamlit.__version__,
+        "pandas": pandas.__version__,
+        "pyarrow": pyarrow.__version__,
+        "params": {k: getattr(args, k) for k in ("orders", "pages", "products", "runs", "latency", "error_rate", "legacy_ratio", "seed")},
+    }
+
+
+def run_suite(args: argparse.Namespace) -> str:
+    results: List[Dict[str, Any]] = []
+    for orders in args.orders:
+        standin, base_url = _start_standin(args, orders)
+        try:
+            for page in args.pages:
+                result = _summarize({"page": page, "orders": orders, **_run_page(args, page, base_url)})
+                results.append(result)
+                if "median_ms" in result:
+                    print(f"{page:<20}{orders:>10,} orders  cold {result['cold_ms']:>9.1f}ms  rerun p50 {result['median_ms']:>8.1f}ms  "
+                          f"p95 {result['p95_ms']:>8.1f}ms  peak RSS {result['max_peak_rss_mb']:>7.1f}MB", flush=True)
+                for error in result["errors"]:
+                    print(f"{page:<20}{orders:>10,} orders  ERROR {error[:300]}", flush=True)
+        finally:
+            standin.kill()
+            standin.wait()
+
+    output = args.output or os.path.join(DEFAULT_OUTPUT_DIR, f"pages-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"meta": _metadata(args), "results": results}, f, ensure_ascii=False, indent=2)
+    print(f"results written to {output}")
+    return output
+
+
+def compare(before_path: str, after_path: str) -> int:
+    """พิมพ์การเปลี่ยนแปลงของ median rerun และ peak RSS คืนจำนวนรายการที่ช้าลงเกินเกณฑ์"""
+    with open(before_path, encoding="utf-8") as f:
+        before = {(r["page"], r["orders"]): r for r in json.load(f)["results"]}
+    with open(after_path, encoding="utf-8") as f:
+        after = json.load(f)["results"]
+    regressions = 0
+    for result in after:
+        old = before.get((result["page"], result["orders"]))
+        if old is None or "median_ms" not in old or "median_ms" not in result:
+            continue
+        change = result["median_ms"] / old["median_ms"] - 1
+        flag = ""
+        if change > REGRESSION_THRESHOLD:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(f"{result['page']:<20}{result['orders']:>10,} orders  rerun p50 {old['median_ms']:>8.1f} -> {result['median_ms']:>8.1f}ms ({change:+.0%})  "
+              f"peak RSS {old['max_peak_rss_mb']:>7.1f} -> {result['max_peak_rss_mb']:>7.1f}MB{flag}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="headless per-page rerun timing and memory")
+    parser.add_argument("--orders", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--pages", nargs="+", choices=sorted(PAGES), default=list(PAGES))
+    parser.add_argument("--products", type=int, default=300)
+    parser.add_argument("--runs", type=int, default=5, help="จำนวน rerun หลังรันครั้งแรก")
+    parser.add_argument("--latency", type=float, default=0.0, help="latency ต่อ request ของ backend จำลอง (วินาที)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--legacy-ratio", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=1800, help="timeout ต่อการรันหนึ่งครั้งของ AppTest (วินาที)")
+    parser.add_argument("--output", help="ไฟล์ JSON ผลลัพธ์ (ค่าเริ่มต้น .pos_data/bench/pages-<เวลา>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="เทียบผลสองไฟล์แทนการรัน")
+    parser.add_argument("--worker", choices=sorted(PAGES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.runs, args.timeout), ensure_ascii=False))
+    elif args.compare:
+        sys.exit(1 if compare(*args.compare) else 0)
+    else:
+        run_suite(args)
+
+
+if __name__ == "__main__":
+    main()
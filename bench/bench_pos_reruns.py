@@ -0,0 +1,106 @@
+"""วัดเวลาต่อ interaction ของหน้า POS เมื่อเมนูมีสินค้า 200+ รายการ
+
+เทียบ 3 แบบ:
+  * full rerun   - รันทั้งหน้า (เดิมทุกการแก้ตะกร้าต้องจ่ายเท่านี้ และการกดเพิ่มลงตะกร้ายังเป็นแบบนี้)
+  * cart edit    - rerun เฉพาะ fragment ``render_cart``
+  * option pick  - rerun เฉพาะ fragment ``render_product`` ของสินค้าหนึ่งชิ้น
+
+AppTest รันทั้งสคริปต์ทุกครั้ง (สั่ง rerun เฉพาะ fragment ไม่ได้) จึงจับเวลา fragment โดยสร้างสคริปต์
+ชั่วคราวที่โหลดเฉพาะ import/ฟังก์ชันจาก ``pos_frontend.py`` แล้วเรียก fragment ตัวนั้นตัวเดียว
+
+    python -m bench.bench_pos_reruns --products 250 --cart 8 --runs 15
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from typing import List
+
+from streamlit.testing.v1 import AppTest
+
+import api_client
+from bench.standin_api import StandinState, serve
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+POS_PAGE = os.path.join(ROOT, "pos_frontend.py")
+
+
+FRAGMENT_SCRIPT = """
+import ast
+
+with open({page_path!r}, encoding="utf-8") as f:
+    tree = ast.parse(f.read())
+tree.body = [n for n in tree.body if isinstance(n, (ast.Import, ast.ImportFrom, ast.FunctionDef))]
+namespace = {{}}
+exec(compile(tree, {page_path!r}, "exec"), namespace)
+{call}
+"""
+
+
+def _fragment_app(tmp_dir: str, name: str, call: str) -> AppTest:
+    # โหลดเฉพาะ import/ฟังก์ชันของหน้า POS แล้วเรียก fragment ตัวเดียว
+    path = os.path.join(tmp_dir, f"{name}.py")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(FRAGMENT_SCRIPT.format(page_path=POS_PAGE, call=call))
+    return AppTest.from_file(path, default_timeout=120)
+
+
+def _check(app: AppTest) -> AppTest:
+    # สคริปต์ที่ error ก็ยังรันจบเร็ว ต้องหยุด bench ไม่ให้รายงานเวลาของหน้าที่พัง
+    if app.exception:
+        raise RuntimeError("\n".join(e.message for e in app.exception))
+    return app
+
+
+def _time_runs(app: AppTest, runs: int) -> List[float]:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        _check(app.run())
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def _report(name: str, samples: List[float]) -> None:
+    ordered = sorted(samples)
+    print(f"{name:<14}{statistics.median(ordered):>10.1f}ms{ordered[-1]:>10.1f}ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="POS per-interaction rerun timing")
+    parser.add_argument("--products", type=int, default=250)
+    parser.add_argument("--cart", type=int, default=8, help="จำนวนรายการในตะกร้า")
+    parser.add_argument("--runs", type=int, default=15)
+    args = parser.parse_args()
+
+    server = serve(StandinState(products=args.products, orders=0))
+    api_client.API_BASE_URL = f"http://127.0.0.1:{server.server_port}"
+    api_client.reset_session()
+    tmp_dir = tempfile.mkdtemp(prefix="pos_bench_")
+    try:
+        full = _check(AppTest.from_file(POS_PAGE, default_timeout=120).run())
+        for i in range(args.cart):
+            _check(full.button(key=f"add_{i + 1}").click().run())
+        cart_state = full.session_state.cart
+        cart_total = full.session_state.cart_total
+
+        cart = _fragment_app(tmp_dir, "cart_fragment", 'namespace["render_cart"]()')
+        cart.session_state.cart = cart_state
+        cart.session_state.cart_total = cart_total
+        product = _fragment_app(tmp_dir, "product_fragment", 'namespace["render_product"](namespace["get_catalog_index"]().products[0])')
+
+        print(f"{args.products} products, {args.cart} cart lines, {args.runs} runs")
+        print(f"{'interaction':<14}{'median':>12}{'max':>12}")
+        _report("full rerun", _time_runs(full, args.runs))
+        _report("cart edit", _time_runs(cart, args.runs))
+        _report("option pick", _time_runs(product, args.runs))
+    finally:
+        server.shutdown()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
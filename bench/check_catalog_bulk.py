@@ -0,0 +1,49 @@
+"""ตรวจว่า "ลบสินค้าที่ไม่มีในไฟล์" ของ ``catalog_bulk.plan`` ไม่ลบสินค้าที่แถวในไฟล์อ้างถึงแต่มีปัญหา
+
+แต่ละกรณีเป็นไฟล์ CSV ที่มีแถวเสีย (อ่านไม่ได้ หรือ plan ปฏิเสธ) ต้องไม่มี ``delete`` ในแผนเลย
+และไฟล์ที่ไม่มีปัญหาต้องยังลบสินค้าที่ไม่มีในไฟล์ได้ตามปกติ (ไม่ต้องมี backend)
+
+    python -m bench.check_catalog_bulk
+"""
+
+import catalog_bulk
+
+PRODUCTS = [
+    {"id": 1, "name": "Latte", "price": 60.0, "category": "Coffee", "options": []},
+    {"id": 2, "name": "Mocha", "price": 65.0, "category": "Coffee", "options": []},
+    {"id": 3, "name": "Tea", "price": 40.0, "category": "Tea", "options": []},
+    {"id": 4, "name": "Tea", "price": 45.0, "category": "Tea", "options": []},
+]
+HEADER = "id,name,price,category,options,image\n"
+
+CASES = {
+    "price typo": "1,Latte,abc,Coffee,,\n2,Mocha,65,Coffee,,\n",
+    "missing name": "1,,60,Coffee,,\n2,Mocha,65,Coffee,,\n",
+    "duplicate name": ",Latte,60,Coffee,,\n,latte,61,Coffee,,\n2,Mocha,65,Coffee,,\n",
+    "ambiguous name": ",Tea,40,Tea,,\n2,Mocha,65,Coffee,,\n",
+    "same id twice": "1,Latte,60,Coffee,,\n1,Latte Hot,60,Coffee,,\n",
+}
+
+
+def plan_csv(body: str):
+    rows, issues = catalog_bulk.read_import("products.csv", (HEADER + body).encode("utf-8"))
+    changes, plan_issues = catalog_bulk.plan(rows, PRODUCTS, delete_missing=True, read_issues=issues)
+    return changes, issues + plan_issues
+
+
+def main() -> None:
+    for name, body in CASES.items():
+        changes, issues = plan_csv(body)
+        deletes = [c.name for c in changes if c.action == catalog_bulk.DELETE]
+        assert issues, f"{name}: expected an issue"
+        assert not deletes, f"{name}: planned deletes {deletes}"
+        print(f"{name:<15} {len(issues)} issue(s), no deletes")
+
+    changes, issues = plan_csv("1,Latte,60,Coffee,,\n2,Mocha,65,Coffee,,\n")
+    deletes = sorted(c.product_id for c in changes if c.action == catalog_bulk.DELETE)
+    assert not issues and deletes == [3, 4], (issues, deletes)
+    print(f"clean file      deletes {deletes}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""ตรวจ feed ออเดอร์สดกับ backend จำลอง: ความหน่วงจนถึง snapshot, การต่อใหม่ และการตามส่วนที่ขาด
+
+ขั้นตอน:
+  1. โหลดออเดอร์เริ่มต้นแล้วเปิด feed; backend สร้างออเดอร์สุ่มต่อเนื่องและตัด feed ทุก ``--stream-lifetime`` วินาที
+     (ต่อใหม่จาก Last-Event-ID ต้องไม่ดึงทาง REST)
+  2. หยุด feed นานพอให้ออเดอร์ที่พลาดเกิน ``replay_limit`` แล้วเปิดใหม่ (ต้องได้ ``gap`` และตามทาง REST ครั้งเดียว)
+  3. เทียบออเดอร์และยอดขายใน store/rollup กับข้อมูลของ backend (ต้องครบและไม่ซ้ำ)
+
+    python -m bench.check_order_feed --rate 20 --seconds 20
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from datetime import date
+
+import api_client
+from bench.standin_api import StandinState, serve
+from order_store import OrderStore
+from sales_rollup import SalesRollup
+from snapshot_store import SnapshotStore
+
+
+def wait_for(condition, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="live order feed check against the stand-in API")
+    parser.add_argument("--orders", type=int, default=20_000)
+    parser.add_argument("--rate", type=float, default=20.0, help="ออเดอร์ใหม่ต่อวินาที")
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--stream-lifetime", type=float, default=5.0)
+    args = parser.parse_args()
+
+    state = StandinState(products=100, orders=args.orders, replay_limit=200, stream_lifetime=args.stream_lifetime, heartbeat=2)
+    server = serve(state)
+    api_client.API_BASE_URL = f"http://127.0.0.1:{server.server_port}"
+    api_client.reset_session()
+    store = OrderStore(os.path.join(tempfile.mkdtemp(prefix="pos_feed_"), "orders"))
+    rollup = SalesRollup()
+    # ไม่ poll ระหว่างทดสอบ (หลังโหลดครั้งแรก) ออเดอร์ใหม่ทุกใบต้องมาทาง feed หรือการตามส่วนที่ขาดเท่านั้น
+    snapshots = SnapshotStore(orders_source=store, rollup=rollup, catalog_interval=3600, orders_interval=3600)
+
+    published = {}
+    publish = snapshots._publish_orders
+
+    def record_publish() -> None:
+        publish()
+        published.setdefault(store.high_water_mark, time.monotonic())
+
+    snapshots._publish_orders = record_publish
+    try:
+        snapshots.ensure_worker()
+        assert snapshots.orders(wait=60) is not None, "first load timed out"
+        assert wait_for(lambda: snapshots.live, 10), "feed did not connect"
+        print(f"initial load: {store.high_water_mark} orders, feed {snapshots.feed.status}")
+
+        # 1. ออเดอร์สดต่อเนื่อง + feed ถูกตัดเป็นระยะ
+        created = {}
+        original_add = state.add_order
+
+        def add_order(payload):
+            order = original_add(payload)
+            created[order["id"]] = time.monotonic()
+            return order
+
+        state.add_order = add_order
+        generator_stop = threading.Event()
+        state.generate_orders(args.rate, generator_stop)
+        rest_before = state.request_count
+        reconnects_before = snapshots.feed.reconnects
+        time.sleep(args.seconds)
+        generator_stop.set()
+        last_id = max(created)
+        assert wait_for(lambda: store.high_water_mark >= last_id, 10), "feed fell behind"
+        latencies = [(published[i] - created[i]) * 1000 for i in created if i in published]
+        # request ระหว่างนี้ = การต่อ feed ใหม่เท่านั้น (ไม่มี GET /orders)
+        print(f"live: {len(created)} orders in {args.seconds:.0f}s, create->snapshot p50 {statistics.median(latencies):.0f}ms "
+              f"max {max(latencies):.0f}ms; feed reconnects {snapshots.feed.reconnects - reconnects_before}, "
+              f"backend requests {state.request_count - rest_before} (gaps {snapshots.feed.gaps})")
+
+        # 2. feed หยุดนานจนพลาดเกิน replay_limit
+        snapshots.feed.stop()
+        assert wait_for(lambda: snapshots.feed._thread is None or not snapshots.feed._thread.is_alive(), 10)
+        for _ in range(state.replay_limit * 3):
+            state.add_random_order()
+        gaps_before = snapshots.feed.gaps
+        snapshots.feed.start()
+        last_id = state.orders[-1]["id"]
+        assert wait_for(lambda: store.high_water_mark >= last_id, 20), "gap catch-up failed"
+        print(f"outage of {state.replay_limit * 3} orders: gaps {snapshots.feed.gaps - gaps_before}, caught up to {store.high_water_mark}")
+    finally:
+        snapshots.stop()
+        server.shutdown()
+
+    # 3. ความถูกต้อง
+    ids = store.table().column("id").to_pylist()
+    expected = [o["id"] for o in state.orders]
+    assert ids == expected, f"store has {len(ids)} orders ({len(set(ids))} unique), backend {len(expected)}"
+    revenue = rollup.query(date(2000, 1, 1), date(2100, 1, 1)).total_revenue
+    expected_revenue = sum(o["total_amount"] for o in state.orders)
+    assert abs(revenue - expected_revenue) < 1e-6 * max(1.0, expected_revenue), (revenue, expected_revenue)
+    reopened = OrderStore(store.root)
+    assert reopened.high_water_mark == store.high_water_mark and reopened.table().num_rows == len(expected)
+    print(f"consistent: {len(ids)} orders, revenue {revenue:,.2f}, reopened from disk OK")
+
+
+if __name__ == "__main__":
+    main()
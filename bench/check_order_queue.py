@@ -0,0 +1,108 @@
+"""ทดสอบคิวออเดอร์กับ backend จำลองที่ตอบผิดพลาดและทำ response หายแบบสุ่ม
+
+ตรวจว่า: checkout (enqueue) ไม่ขึ้นกับ latency ของ backend, ออเดอร์ทุกใบถูกส่งสำเร็จในที่สุด,
+backend ได้รับออเดอร์ใบละครั้งเดียว และออเดอร์ที่ backend ปฏิเสธถูกทำเครื่องหมาย failed
+รันสองรอบ: backend ที่ตัดซ้ำด้วย ``Idempotency-Key`` (ส่งใหม่อัตโนมัติ) และ backend ที่ไม่สน header
+(ออเดอร์ที่ไม่รู้ผลต้องถูกพักเป็น unconfirmed แล้วตรวจกับ backend เหมือนที่แคชเชียร์ทำ)
+
+    python -m bench.check_order_queue --orders 200 --error-rate 0.3 --drop-rate 0.2 --latency 0.05
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import api_client
+import order_queue
+from bench.standin_api import StandinState, serve
+
+
+def wait_idle(outbox: order_queue.OrderQueue, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        counts = outbox.counts()
+        if counts[order_queue.PENDING] == 0 and counts[order_queue.SENDING] == 0:
+            return
+        time.sleep(0.1)
+    raise AssertionError(f"queue did not drain: {outbox.counts()}")
+
+
+def run(args: argparse.Namespace, idempotent: bool) -> None:
+    state = StandinState(products=20, orders=0, latency=args.latency, error_rate=args.error_rate, drop_rate=args.drop_rate, idempotent=idempotent)
+    server = serve(state)
+    api_client.API_BASE_URL = f"http://127.0.0.1:{server.server_port}"
+    api_client.reset_session()
+
+    tmp_dir = tempfile.mkdtemp(prefix="pos_queue_")
+    outbox = order_queue.OrderQueue(os.path.join(tmp_dir, "queue.sqlite3"), poll_interval=0.05, idempotent=idempotent)
+    reconciled = 0
+    try:
+        enqueue_ms = []
+        for i in range(args.orders):
+            start = time.perf_counter()
+            outbox.enqueue([{"product_id": i % 20 + 1, "quantity": 1, "selected_options": []}])
+            enqueue_ms.append((time.perf_counter() - start) * 1000)
+        rejected_key = outbox.enqueue([{"product_id": 9999, "quantity": 1, "selected_options": []}])
+        wait_idle(outbox, args.timeout)
+        # แคชเชียร์ตรวจออเดอร์ unconfirmed กับประวัติออเดอร์: มีแล้วยืนยัน ไม่มีส่งใหม่
+        while outbox.counts()[order_queue.UNCONFIRMED]:
+            for queued in outbox.list_orders([order_queue.UNCONFIRMED], limit=args.orders):
+                reconciled += 1
+                if queued.idempotency_key in state.created_keys:
+                    outbox.confirm_sent(queued.idempotency_key)
+                else:
+                    outbox.retry(queued.idempotency_key)
+            wait_idle(outbox, args.timeout)
+        counts = outbox.counts()
+        failed = outbox.list_orders([order_queue.FAILED])
+    finally:
+        outbox.close()
+        server.shutdown()
+
+    mode = "idempotent backend" if idempotent else "non-idempotent backend"
+    print(f"[{mode}] checkout (enqueue) median {statistics.median(enqueue_ms):.2f}ms, max {max(enqueue_ms):.2f}ms; backend latency {args.latency * 1000:.0f}ms")
+    print(f"[{mode}] queue: {counts}; backend received {len(state.orders)} orders from {state.request_count} requests; {reconciled} unconfirmed reconciled")
+    assert counts[order_queue.SENT] == args.orders, "not every order was delivered"
+    assert len(state.created_keys) == len(set(state.created_keys)), "backend created duplicate orders"
+    assert len(state.orders) == args.orders, "backend received duplicate or missing orders"
+    assert [f.idempotency_key for f in failed] == [rejected_key], "rejected order should be marked failed"
+    assert idempotent or reconciled, "ambiguous failures should have been parked as unconfirmed"
+
+
+def check_restart() -> None:
+    # process ตายระหว่างส่ง: แถว sending ส่งใหม่อัตโนมัติเฉพาะเมื่อ backend ตัดซ้ำให้
+    for idempotent, expected in ((True, order_queue.PENDING), (False, order_queue.UNCONFIRMED)):
+        path = os.path.join(tempfile.mkdtemp(prefix="pos_queue_"), "queue.sqlite3")
+        outbox = order_queue.OrderQueue(path, idempotent=idempotent)
+        outbox.ensure_worker = lambda: None  # ไม่ส่งจริง ค้างไว้ที่ sending เหมือน process ตาย
+        outbox.enqueue([{"product_id": 1, "quantity": 1, "selected_options": []}])
+        outbox._claim_batch()
+        outbox._conn.close()
+        reopened = order_queue.OrderQueue(path, idempotent=idempotent)
+        status = reopened.counts()
+        reopened._conn.close()
+        assert status[expected] == 1, (idempotent, status)
+    print("restart: in-flight orders requeued with an idempotent backend, parked as unconfirmed otherwise")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="order queue check against a flaky stand-in API")
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--error-rate", type=float, default=0.3)
+    parser.add_argument("--drop-rate", type=float, default=0.2)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+    order_queue.BACKOFF_BASE = 0.05
+    order_queue.BACKOFF_MAX = 0.5
+
+    run(args, idempotent=True)
+    run(args, idempotent=False)
+    check_restart()
+    print("OK: every order delivered exactly once, rejected order kept as failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""ตรวจ ``python -m order_store resync`` ขณะที่แอปเปิด store โฟลเดอร์เดียวกันอยู่
+
+ขั้นตอน:
+  1. store ของ "แอป" sync ออเดอร์และมีออเดอร์จาก feed ค้างในหน่วยความจำ
+  2. backend แก้ออเดอร์ย้อนหลัง แล้วรัน resync จากอีก process
+  3. แอป sync ต่อ: ต้องโหลดข้อมูลใหม่ (ไม่บันทึก manifest ที่อ้าง part ที่ถูกลบ) และตรงกับ backend
+  4. resync ขณะ backend ล่ม: ต้องโยน ``ApiError`` และข้อมูลเดิมต้องอยู่ครบ
+
+    python -m bench.check_order_store --orders 20000
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+import api_client
+from bench.bench_pages import ROOT
+from bench.standin_api import StandinState, serve
+from order_store import OrderStore
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="cross-process order store resync check")
+    parser.add_argument("--orders", type=int, default=20_000)
+    args = parser.parse_args()
+
+    state = StandinState(products=50, orders=args.orders)
+    server = serve(state)
+    api_client.API_BASE_URL = f"http://127.0.0.1:{server.server_port}"
+    api_client.reset_session()
+    root = os.path.join(tempfile.mkdtemp(prefix="pos_store_"), "orders")
+    app = OrderStore(root)
+    try:
+        # 1.
+        app.sync(force=True)
+        app.append_live([state.add_random_order() for _ in range(3)])
+        generation = app.generation
+
+        # 2.
+        state.orders[0]["total_amount"] += 1000
+        env = dict(os.environ, POS_API_BASE_URL=api_client.API_BASE_URL)
+        subprocess.run([sys.executable, "-m", "order_store", "resync", "--dir", root], cwd=ROOT, env=env, check=True, capture_output=True)
+
+        # 3.
+        state.add_random_order()
+        app.sync(force=True)
+        assert app.generation != generation, "app did not notice the resync"
+        table = app.table()
+        assert table.column("id").to_pylist() == [o["id"] for o in state.orders]
+        assert table.column("total_amount")[0].as_py() == state.orders[0]["total_amount"]
+        assert OrderStore(root).table().num_rows == table.num_rows
+        print(f"external resync: app reloaded {table.num_rows} orders, corrected order picked up, reopen OK")
+
+        # 4.
+        state.error_rate = 1.0
+        try:
+            app.resync()
+        except api_client.ApiError as e:
+            print(f"resync with backend down: {type(e).__name__}")
+        else:
+            raise AssertionError("resync should fail while the backend is down")
+        assert OrderStore(root).table().num_rows == table.num_rows and app.table().num_rows == table.num_rows
+        assert os.listdir(os.path.dirname(root)) == ["orders"], "staging directory left behind"
+        print(f"local store intact: {table.num_rows} orders")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""ตรวจว่า ``sales_rollup`` ให้ผลตรงกับการสแกนออเดอร์ทั้งหมดแบบเดิมของ Dashboard
+
+สร้างข้อมูลสุ่ม (รวมรายการแบบข้อมูลเก่า และรายการเก่าที่ไม่มี ``product_id``) ป้อนเข้า rollup แบบแบ่งหลายรอบเพื่อทดสอบการอัปเดตทีละส่วน
+แล้วเทียบ KPI, ยอดขายรายวัน, สินค้าขายดี และยอดขายตามหมวดหมู่กับการสแกนตรงในหลายช่วงวันที่
+
+    python -m bench.check_rollup --orders 20000 --batches 5 --ranges 50
+"""
+
+import argparse
+import random
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from bench.synthetic import make_orders, make_products
+from line_items import flatten_line_items
+from order_store import orders_to_table
+from sales_rollup import SalesRollup
+
+
+class _TableStore:
+    """ของแทน OrderStore ที่มีแค่ส่วนที่ rollup ใช้"""
+
+    def __init__(self):
+        self.generation = 0
+        self._table = None
+
+    def append(self, table: pa.Table) -> None:
+        self._table = table if self._table is None else pa.concat_tables([self._table, table])
+
+    def table(self) -> pa.Table:
+        return self._table
+
+
+def raw_scan(orders_df: pd.DataFrame, line_items_df: pd.DataFrame, products: list, start_date, end_date):
+    """การคำนวณแบบเดิมของ pages/dashboard.py (mask + resample + groupby ทุกครั้ง)"""
+    range_start, range_end = pd.Timestamp(start_date), pd.Timestamp(end_date) + pd.Timedelta(days=1)
+    filtered = orders_df.loc[(orders_df['order_date'] >= range_start) & (orders_df['order_date'] < range_end)]
+    items = line_items_df.loc[(line_items_df['order_date'] >= range_start) & (line_items_df['order_date'] < range_end)]
+    daily = filtered.set_index('order_date').resample('D')['total_amount'].sum().reset_index()
+    top = items.groupby('product_name', observed=True)['quantity'].sum()
+    category_map = {p['id']: p['category'] for p in products}
+    items = items.assign(category=items['product_id'].map(category_map)).dropna(subset=['category'])
+    categories = items.groupby('category')['item_total'].sum()
+    return filtered['total_amount'].sum(), len(filtered), daily, top, categories
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="check sales rollup against a raw scan")
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--batches", type=int, default=5)
+    parser.add_argument("--ranges", type=int, default=50)
+    parser.add_argument("--days", type=int, default=365)
+    args = parser.parse_args()
+
+    products = make_products(120)
+    orders = make_orders(args.orders, products, days=args.days, legacy_ratio=0.1)
+    # รายการเก่าที่ไม่มี product_id กระจายอยู่ทุกรอบ ต้องถูกนับรวมข้ามรอบเหมือนการสแกนตรง
+    for order in orders[::max(1, args.orders // 200)]:
+        order["items"][0]["product_id"] = None
+    table = orders_to_table(orders)
+    store, rollup = _TableStore(), SalesRollup()
+    for chunk in np.array_split(np.arange(table.num_rows), args.batches):
+        store.append(table.slice(int(chunk[0]), len(chunk)))
+        rollup.update(store)
+
+    orders_df = table.drop_columns(["items"]).to_pandas()
+    line_items_df = flatten_line_items(table).to_pandas()
+    first_day = orders_df['order_date'].min().date()
+    rng = random.Random(1)
+    raw_s = rollup_s = 0.0
+    for _ in range(args.ranges):
+        start = first_day + timedelta(days=rng.randrange(args.days))
+        end = start + timedelta(days=rng.randrange(1, 60))
+        t0 = time.perf_counter()
+        revenue, count, daily, top, categories = raw_scan(orders_df, line_items_df, products, start, end)
+        t1 = time.perf_counter()
+        result = rollup.query(start, end, products)
+        t2 = time.perf_counter()
+        raw_s += t1 - t0
+        rollup_s += t2 - t1
+
+        assert count == result.total_orders, (start, end, count, result.total_orders)
+        assert np.isclose(revenue, result.total_revenue), (start, end)
+        assert np.allclose(daily['total_amount'].to_numpy(), result.daily_sales['total_amount'].to_numpy())
+        assert (daily['order_date'].to_numpy() == result.daily_sales['order_date'].to_numpy()).all()
+        rolled_top = result.top_products.set_index('product_name')['quantity']
+        assert top.astype('int64').sort_index().to_dict() == rolled_top.astype('int64').sort_index().to_dict()
+        rolled_categories = result.category_sales.set_index('category')['item_total'].sort_index()
+        assert np.allclose(categories.sort_index().to_numpy(), rolled_categories.to_numpy())
+
+    print(f"{args.ranges} date ranges match over {args.orders:,} orders in {args.batches} batches")
+    print(f"raw scan avg {raw_s / args.ranges * 1000:.1f}ms, rollup avg {rollup_s / args.ranges * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
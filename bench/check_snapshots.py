@@ -0,0 +1,70 @@
+"""ตรวจว่าจำนวน request ไป backend และหน่วยความจำไม่โตตามจำนวน session ที่เปิดอยู่
+
+เปิด session จำลอง (AppTest) ของหน้า POS, ประวัติการสั่งซื้อ และ Dashboard อย่างละ N ชุดใน process เดียว
+(เหมือน Streamlit server ที่มีหลายเครื่องเปิดอยู่) แล้ว rerun วนไปเรื่อยๆ ตามเวลาที่กำหนด
+นับ request ที่ backend จำลองได้รับต่อนาที และ RSS ที่เพิ่มขึ้นต่อ session
+
+    python -m bench.check_snapshots --sessions 1 4 12 --seconds 20
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench.bench_pages import PAGES, ROOT, _peak_rss_mb
+from bench.standin_api import StandinState, serve
+
+SESSION_PAGES = ["pos", "order_history", "dashboard"]
+
+
+def run_sessions(sessions: int, seconds: float) -> None:
+    # ทำงานใน process ใหม่ต่อจำนวน session: ต้องตั้ง environment ก่อน import โมดูลของแอป
+    state = StandinState(products=200, orders=20_000, legacy_ratio=0.1)
+    server = serve(state)
+    data_dir = tempfile.mkdtemp(prefix="pos_snapshots_")
+    os.environ.update(
+        POS_API_BASE_URL=f"http://127.0.0.1:{server.server_port}",
+        POS_ORDER_STORE_DIR=os.path.join(data_dir, "orders"),
+        POS_ORDER_QUEUE_PATH=os.path.join(data_dir, "order_queue.sqlite3"),
+        POS_IMAGE_CACHE_DIR=os.path.join(data_dir, "images"),
+        POS_SNAPSHOT_CATALOG_INTERVAL="5",
+        POS_SNAPSHOT_ORDERS_INTERVAL="5",
+    )
+    from streamlit.testing.v1 import AppTest
+
+    apps = [AppTest.from_file(os.path.join(ROOT, PAGES[page]), default_timeout=120) for page in SESSION_PAGES for _ in range(sessions)]
+    for app in apps:
+        app.run()
+    rss_before = _peak_rss_mb()
+    requests_before = state.request_count
+    reruns = 0
+    start = time.monotonic()
+    while time.monotonic() - start < seconds:
+        for app in apps:
+            app.run()
+            reruns += 1
+    elapsed = time.monotonic() - start
+    per_minute = (state.request_count - requests_before) / elapsed * 60
+    errors = sorted({str(e.value) for app in apps for e in app.exception})
+    print(f"{sessions:>3} sessions x {len(SESSION_PAGES)} pages: {reruns:>5} reruns in {elapsed:.0f}s, "
+          f"backend {per_minute:6.1f} req/min, peak RSS {rss_before:.0f} -> {_peak_rss_mb():.0f}MB{'  ERRORS ' + str(errors) if errors else ''}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="backend request rate vs number of sessions")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 12])
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        run_sessions(args.worker, args.seconds)
+        return
+    for sessions in args.sessions:
+        subprocess.run([sys.executable, "-m", "bench.check_snapshots", "--worker", str(sessions), "--seconds", str(args.seconds)], cwd=ROOT, check=True)
+
+
+if __name__ == "__main__":
+    main()
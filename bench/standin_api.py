@@ -0,0 +1,393 @@
+"""Backend จำลองสำหรับทดสอบ/วัดผล โดยไม่ต้องรัน POS backend ตัวจริง
+
+รองรับ endpoint ชุดเดียวกับที่หน้าเพจเรียกใช้ เก็บข้อมูลไว้ในหน่วยความจำ
+และหน่วงเวลาตอบกลับได้ตาม ``latency`` เพื่อจำลองเครือข่ายจริง
+
+``GET /orders/stream`` เป็น feed ออเดอร์ใหม่แบบ server-sent events (ดู ``order_feed``) และ
+``--order-rate`` สร้างออเดอร์สุ่มต่อเนื่องเพื่อให้มีอะไรไหลใน feed
+
+    python -m bench.standin_api --port 8000 --products 300 --orders 1000 --order-rate 2
+"""
+
+import argparse
+import bisect
+import gzip
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime
+from email import policy as email_policy
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from bench.synthetic import make_item, make_orders, make_products
+
+
+class StandinState:
+    """ข้อมูลในหน่วยความจำของ backend จำลอง ใช้ lock ตัวเดียวคุมทั้งหมด"""
+
+    def __init__(
+        self,
+        products: int = 50,
+        orders: int = 200,
+        latency: float = 0.0,
+        seed: int = 0,
+        etags: bool = True,
+        error_rate: float = 0.0,
+        drop_rate: float = 0.0,
+        legacy_ratio: float = 0.0,
+        days: int = 90,
+        replay_limit: int = 10_000,
+        stream_lifetime: float = 0.0,
+        heartbeat: float = 15.0,
+        idempotent: bool = True,
+    ):
+        """``error_rate``: สัดส่วน request ที่ตอบ 503 โดยไม่ทำอะไร
+        ``drop_rate``: สัดส่วน POST /orders ที่บันทึกออเดอร์แล้วแต่ตอบ 503 (จำลอง response หาย)
+        ``legacy_ratio``/``days``: ส่งต่อให้ ``bench.synthetic.make_orders``
+        ``replay_limit``: feed ส่งออเดอร์ที่พลาดไปย้อนหลังได้ไม่เกินเท่านี้ ถ้าเกินจะส่ง ``gap``
+        ``stream_lifetime``: ตัด feed หลังเปิดไว้ครบเท่านี้วินาที (0 = ไม่ตัด) ใช้ทดสอบการต่อใหม่
+        ``idempotent``: ``False`` = ไม่สน header ``Idempotency-Key`` (POST ซ้ำได้ออเดอร์ซ้ำ)"""
+        self.lock = threading.Lock()
+        self.orders_changed = threading.Condition(self.lock)
+        self.replay_limit = replay_limit
+        self.stream_lifetime = stream_lifetime
+        self.heartbeat = heartbeat
+        self.latency = latency
+        self.etags = etags
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.idempotent = idempotent
+        # Idempotency-Key ของออเดอร์ที่ถูกสร้าง ตามลำดับ (ใช้นับออเดอร์ซ้ำ)
+        self.created_keys: List[Optional[str]] = []
+        self.rng = random.Random(seed)
+        self.products = make_products(products, seed)
+        self.orders = make_orders(orders, self.products, seed, days=days, legacy_ratio=legacy_ratio)
+        self.images: Dict[int, bytes] = {}
+        self.idempotency: Dict[str, Dict[str, Any]] = {}
+        self.request_count = 0
+
+    def chance(self, rate: float) -> bool:
+        with self.lock:
+            return rate > 0 and self.rng.random() < rate
+
+    def next_id(self, rows: List[Dict[str, Any]]) -> int:
+        return max((r["id"] for r in rows), default=0) + 1
+
+    def find_product(self, product_id: int) -> Optional[Dict[str, Any]]:
+        return next((p for p in self.products if p["id"] == product_id), None)
+
+    def add_order(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        items = []
+        for raw in payload.get("items", []):
+            product = self.find_product(int(raw["product_id"]))
+            if product is None:
+                raise LookupError(f"ไม่พบสินค้า id {raw['product_id']}")
+            options = raw.get("selected_options", [])
+            unit = product["price"] + sum(o.get("price", 0) for o in options)
+            quantity = int(raw.get("quantity", 1))
+            items.append({
+                "product_id": product["id"], "product_name": product["name"], "quantity": quantity,
+                "price_per_unit": unit, "item_total": unit * quantity, "selected_options": options,
+            })
+        order = {
+            "id": self.next_id(self.orders), "order_date": datetime.now().isoformat(),
+            "total_amount": sum(it["item_total"] for it in items), "status": "completed", "items": items,
+        }
+        self.orders.append(order)
+        self.orders_changed.notify_all()
+        return order
+
+    def add_random_order(self) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            if not self.products:
+                return None
+            items = [make_item(self.rng, self.rng.choice(self.products)) for _ in range(self.rng.randint(1, 4))]
+            return self.add_order({"items": items})
+
+    def generate_orders(self, rate: float, stop: Optional[threading.Event] = None) -> threading.Thread:
+        """สร้างออเดอร์สุ่มเฉลี่ย ``rate`` ใบต่อวินาทีใน background thread จนกว่าจะ set ``stop``"""
+        stop = stop or threading.Event()
+
+        def run() -> None:
+            while not stop.wait(self.rng.expovariate(rate)):
+                self.add_random_order()
+
+        thread = threading.Thread(target=run, name="standin-orders", daemon=True)
+        thread.start()
+        return thread
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    state: StandinState
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    # --- response helpers ---
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json", headers: Optional[Dict[str, str]] = None) -> None:
+        if content_type == "application/json" and "gzip" in self.headers.get("Accept-Encoding", "") and len(body) > 1024:
+            body = gzip.compress(body, compresslevel=5)
+            headers = dict(headers or {}, **{"Content-Encoding": "gzip"})
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _json(self, status: int, data: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        self._send(status, json.dumps(data, ensure_ascii=False).encode("utf-8"), headers=headers)
+
+    def _error(self, status: int, detail: str) -> None:
+        self._json(status, {"detail": detail})
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _dispatch(self) -> None:
+        state = self.state
+        with state.lock:
+            state.request_count += 1
+        if state.latency:
+            time.sleep(state.latency)
+        if state.chance(state.error_rate):
+            self._body()
+            return self._error(503, "Service Unavailable (simulated)")
+        path = self.path.split("?", 1)[0]
+        for method, pattern, name in ROUTES:
+            match = re.fullmatch(pattern, path)
+            if method == self.command and match:
+                getattr(self, name)(*match.groups())
+                return
+        self._error(404, "Not Found")
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = _dispatch
+
+    # --- endpoints ---
+
+    def list_products(self) -> None:
+        with self.state.lock:
+            body = json.dumps(self.state.products, ensure_ascii=False).encode("utf-8")
+        if not self.state.etags:
+            return self._send(200, body)
+        etag = '"%s"' % hashlib.blake2b(body, digest_size=8).hexdigest()
+        if self.headers.get("If-None-Match") == etag:
+            return self._send(304, b"", headers={"ETag": etag})
+        self._send(200, body, headers={"ETag": etag})
+
+    def create_product(self) -> None:
+        payload = json.loads(self._body() or b"{}")
+        with self.state.lock:
+            product = {"id": self.state.next_id(self.state.products), "image_url": None, "options": [], **payload}
+            self.state.products.append(product)
+        self._json(200, product)
+
+    def update_product(self, product_id: str) -> None:
+        payload = json.loads(self._body() or b"{}")
+        with self.state.lock:
+            product = self.state.find_product(int(product_id))
+            if product is None:
+                return self._error(404, "ไม่พบสินค้า")
+            product.update(payload)
+        self._json(200, product)
+
+    def delete_product(self, product_id: str) -> None:
+        with self.state.lock:
+            product = self.state.find_product(int(product_id))
+            if product is None:
+                return self._error(404, "ไม่พบสินค้า")
+            self.state.products.remove(product)
+        self._json(200, {"ok": True})
+
+    def upload_image(self, product_id: str) -> None:
+        raw = self._body()
+        message = BytesParser(policy=email_policy.HTTP).parsebytes(
+            f"Content-Type: {self.headers.get('Content-Type', '')}\r\n\r\n".encode("latin-1") + raw
+        )
+        part = next((p for p in message.iter_parts() if p.get_param("name", header="content-disposition") == "file"), None) if message.is_multipart() else None
+        if part is None:
+            return self._error(422, "ต้องส่งไฟล์ในฟิลด์ 'file'")
+        with self.state.lock:
+            product = self.state.find_product(int(product_id))
+            if product is None:
+                return self._error(404, "ไม่พบสินค้า")
+            self.state.images[product["id"]] = part.get_payload(decode=True)
+            # URL เดิมทุกครั้งเหมือน backend ที่เขียนทับไฟล์ ฝั่ง client จึงต้อง invalidate เอง
+            product["image_url"] = f"/static/images/{product['id']}.png"
+        self._json(200, product)
+
+    def get_image(self, product_id: str) -> None:
+        with self.state.lock:
+            body = self.state.images.get(int(product_id))
+        if body is None:
+            return self._error(404, "ไม่พบรูปภาพ")
+        self._send(200, body, content_type="application/octet-stream")
+
+    def list_orders(self) -> None:
+        query = {k: v[-1] for k, v in parse_qs(urlsplit(self.path).query).items()}
+        if "limit" not in query:
+            with self.state.lock:
+                body = json.dumps(self.state.orders, ensure_ascii=False).encode("utf-8")
+            return self._send(200, body)
+        if "since_id" in query:
+            return self._orders_since(int(query["since_id"]), max(1, min(int(query["limit"]), 5000)))
+        # โหมดแบ่งหน้า: keyset บน id จากใหม่ไปเก่า, cursor = id ตัวสุดท้ายของหน้าก่อน
+        limit = max(1, min(int(query["limit"]), 500))
+        before = int(query["cursor"]) if query.get("cursor") else None
+        needle = query.get("product", "").casefold()
+        page = []
+        with self.state.lock:
+            for order in reversed(self.state.orders):
+                if before is not None and order["id"] >= before:
+                    continue
+                day = order["order_date"][:10]
+                if query.get("start_date") and day < query["start_date"]:
+                    continue
+                if query.get("end_date") and day > query["end_date"]:
+                    continue
+                if query.get("order_id") and str(order["id"]) != query["order_id"]:
+                    continue
+                if needle and not any(needle in it["product_name"].casefold() for it in order["items"]):
+                    continue
+                page.append(order)
+                if len(page) > limit:
+                    break
+            has_more = len(page) > limit
+            page = page[:limit]
+            body = json.dumps({"orders": page, "next_cursor": page[-1]["id"] if has_more else None}, ensure_ascii=False).encode("utf-8")
+        self._send(200, body)
+
+    def _orders_since(self, since_id: int, limit: int) -> None:
+        # ออเดอร์ถูกเก็บเรียงตาม id อยู่แล้ว จึงหาจุดเริ่มด้วย bisect ได้
+        with self.state.lock:
+            start = bisect.bisect_right(self.state.orders, since_id, key=lambda o: o["id"])
+            page = self.state.orders[start:start + limit]
+            has_more = start + limit < len(self.state.orders)
+            body = json.dumps({"orders": page, "next_cursor": page[-1]["id"] if has_more else None}, ensure_ascii=False).encode("utf-8")
+        self._send(200, body)
+
+    def _chunk(self, data: bytes) -> None:
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+    def stream_orders(self) -> None:
+        # ส่งออเดอร์ที่ id มากกว่า since_id (หรือ Last-Event-ID ตอนต่อใหม่) แล้วส่งออเดอร์ใหม่ทันทีที่เข้ามา
+        state = self.state
+        query = {k: v[-1] for k, v in parse_qs(urlsplit(self.path).query).items()}
+        since_id = int(self.headers.get("Last-Event-ID") or query.get("since_id") or 0)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self.close_connection = True
+        deadline = time.monotonic() + state.stream_lifetime if state.stream_lifetime else None
+        try:
+            with state.lock:
+                missed = len(state.orders) - bisect.bisect_right(state.orders, since_id, key=lambda o: o["id"])
+            if missed > state.replay_limit:
+                self._chunk(b"event: gap\ndata: {}\n\n")
+            else:
+                while deadline is None or time.monotonic() < deadline:
+                    with state.lock:
+                        start = bisect.bisect_right(state.orders, since_id, key=lambda o: o["id"])
+                        if start == len(state.orders):
+                            timeout = state.heartbeat if deadline is None else min(state.heartbeat, max(0.0, deadline - time.monotonic()))
+                            state.orders_changed.wait(timeout)
+                            start = bisect.bisect_right(state.orders, since_id, key=lambda o: o["id"])
+                        new = state.orders[start:]
+                    if new:
+                        since_id = new[-1]["id"]
+                    events = "".join(f"id: {o['id']}\nevent: order\ndata: {json.dumps(o, ensure_ascii=False)}\n\n" for o in new)
+                    self._chunk(events.encode("utf-8") if events else b": ping\n\n")
+            self._chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def create_order(self) -> None:
+        payload = json.loads(self._body() or b"{}")
+        key = self.headers.get("Idempotency-Key")
+        with self.state.lock:
+            order = self.state.idempotency.get(key) if key and self.state.idempotent else None
+            if order is None:
+                try:
+                    order = self.state.add_order(payload)
+                except LookupError as e:
+                    return self._error(400, str(e))
+                self.state.created_keys.append(key)
+                if key:
+                    self.state.idempotency[key] = order
+        if self.state.chance(self.state.drop_rate):
+            return self._error(503, "response lost (simulated)")
+        self._json(200, order)
+
+
+ROUTES = [
+    ("GET", r"/products", "list_products"),
+    ("HEAD", r"/products", "list_products"),
+    ("POST", r"/products", "create_product"),
+    ("PUT", r"/products/(\d+)", "update_product"),
+    ("DELETE", r"/products/(\d+)", "delete_product"),
+    ("POST", r"/products/(\d+)/upload-image", "upload_image"),
+    ("GET", r"/static/images/(\d+)\.\w+", "get_image"),
+    ("GET", r"/orders", "list_orders"),
+    ("GET", r"/orders/stream", "stream_orders"),
+    ("POST", r"/orders", "create_order"),
+]
+
+
+def serve(state: StandinState, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """เปิด server ใน background thread แล้วคืน server (ดูพอร์ตจาก ``server.server_port``)"""
+    handler = type("BoundStandinHandler", (StandinHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="รัน backend จำลองของ POS")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--products", type=int, default=50)
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.0, help="หน่วงเวลาต่อ request (วินาที)")
+    parser.add_argument("--no-etag", action="store_true", help="ไม่ส่ง ETag เพื่อทดสอบการ fallback ไปใช้ TTL")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="สัดส่วน request ที่ตอบ 503")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="สัดส่วนออเดอร์ที่บันทึกแล้วแต่ response หาย")
+    parser.add_argument("--legacy-ratio", type=float, default=0.0, help="สัดส่วนรายการสินค้าในรูปแบบข้อมูลเก่า")
+    parser.add_argument("--days", type=int, default=90, help="ช่วงวันที่ของออเดอร์ที่สร้าง")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--order-rate", type=float, default=0.0, help="สร้างออเดอร์สุ่มกี่ใบต่อวินาที (ส่งออกทาง /orders/stream)")
+    parser.add_argument("--replay-limit", type=int, default=10_000, help="ออเดอร์ย้อนหลังสูงสุดที่ feed ส่งให้ตอนต่อใหม่")
+    parser.add_argument("--stream-lifetime", type=float, default=0.0, help="ตัด feed ทุกกี่วินาที (0 = ไม่ตัด)")
+    args = parser.parse_args()
+    state = StandinState(
+        args.products, args.orders, args.latency, seed=args.seed, etags=not args.no_etag,
+        error_rate=args.error_rate, drop_rate=args.drop_rate, legacy_ratio=args.legacy_ratio, days=args.days,
+        replay_limit=args.replay_limit, stream_lifetime=args.stream_lifetime,
+    )
+    server = serve(state, args.host, args.port)
+    if args.order_rate:
+        state.generate_orders(args.order_rate)
+    # --port 0 ให้ระบบเลือกพอร์ต ตัวรัน benchmark อ่าน URL จากบรรทัดนี้
+    print(f"stand-in API: http://{args.host}:{server.server_port}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
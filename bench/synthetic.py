@@ -0,0 +1,76 @@
+"""สร้างข้อมูลสินค้าและออเดอร์สุ่มตาม schema ของ backend จริง สำหรับ backend จำลองและ benchmark
+
+รายการสินค้าในออเดอร์มีได้ 3 รูปแบบ (สัดส่วนรูปแบบเก่ากำหนดด้วย ``legacy_ratio``):
+  * ปัจจุบัน   - ``price_per_unit`` + ``item_total``
+  * เก่าแบบที่ 1 - มีแค่ ``price_per_item`` (ไม่มี ``item_total``)
+  * เก่าแบบที่ 2 - มีแค่ ``item_total`` ราคาต่อหน่วยต้องคำนวณจาก ``item_total / quantity``
+
+สุ่มด้วย seed คงที่ รันซ้ำได้ข้อมูลชุดเดิมทุกครั้ง
+"""
+
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+CATEGORIES = ["กาแฟ", "ชา", "นมสด", "เบเกอรี่", "น้ำผลไม้", "ของทานเล่น"]
+OPTION_GROUPS = [
+    {"name": "ความหวาน", "choices": [{"name": "หวานน้อย", "price": 0.0}, {"name": "หวานปกติ", "price": 0.0}, {"name": "หวานมาก", "price": 0.0}]},
+    {"name": "ขนาด", "choices": [{"name": "เล็ก", "price": 0.0}, {"name": "กลาง", "price": 10.0}, {"name": "ใหญ่", "price": 20.0}]},
+    {"name": "ท็อปปิ้ง", "choices": [{"name": "ไข่มุก", "price": 10.0}, {"name": "วิปครีม", "price": 15.0}, {"name": "บุก", "price": 10.0}]},
+]
+
+
+def make_products(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    products = []
+    for i in range(1, count + 1):
+        category = CATEGORIES[i % len(CATEGORIES)]
+        products.append({
+            "id": i,
+            "name": f"{category} เมนู {i}",
+            "price": float(rng.randrange(35, 120)),
+            "category": category,
+            "image_url": None,
+            "options": [g for g in OPTION_GROUPS if rng.random() < 0.6],
+        })
+    return products
+
+
+def _pick_options(rng: random.Random, product: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # แคชเชียร์เลือก option บางกลุ่มเท่านั้น กลุ่มละหนึ่งตัวเลือก
+    return [dict(rng.choice(group["choices"])) for group in product["options"] if rng.random() < 0.5]
+
+
+def make_item(rng: random.Random, product: Dict[str, Any], legacy_ratio: float = 0.0) -> Dict[str, Any]:
+    quantity = rng.randint(1, 3)
+    options = _pick_options(rng, product)
+    unit = product["price"] + sum(o["price"] for o in options)
+    item = {"product_id": product["id"], "product_name": product["name"], "quantity": quantity, "selected_options": options}
+    if legacy_ratio and rng.random() < legacy_ratio:
+        if rng.random() < 0.5:
+            item["price_per_item"] = unit
+        else:
+            item["item_total"] = unit * quantity
+    else:
+        item["price_per_unit"] = unit
+        item["item_total"] = unit * quantity
+    return item
+
+
+def make_orders(count: int, products: List[Dict[str, Any]], seed: int = 0, days: int = 90, legacy_ratio: float = 0.0) -> List[Dict[str, Any]]:
+    """สร้างออเดอร์ ``count`` ใบ กระจายเวลาเท่าๆ กันตลอด ``days`` วันล่าสุด id เรียงจากเก่าไปใหม่"""
+    rng = random.Random(seed)
+    start = datetime.now() - timedelta(days=days)
+    step = timedelta(days=days) / max(count, 1)
+    orders = []
+    for i in range(1, count + 1):
+        items = [make_item(rng, rng.choice(products), legacy_ratio) for _ in range(rng.randint(1, 4))]
+        total = sum(it.get("item_total", it.get("price_per_item", 0.0) * it["quantity"]) for it in items)
+        orders.append({
+            "id": i,
+            "order_date": (start + step * i).isoformat(),
+            "total_amount": total,
+            "status": "completed",
+            "items": items,
+        })
+    return orders
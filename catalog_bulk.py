@@ -0,0 +1,479 @@
+"""นำเข้า/ส่งออก catalog ทีละมากๆ (สินค้า, กลุ่ม option, ตัวเลือก และรูป)
+
+รูปแบบไฟล์ที่รับ:
+  * JSON - list ของสินค้าแบบเดียวกับ ``GET /products`` (``id`` ไม่บังคับ)
+  * CSV  - หนึ่งแถวต่อสินค้า คอลัมน์ ``id,name,price,category,options,image`` โดย ``options`` เป็น JSON
+  * ZIP  - ``products.json`` หรือ ``products.csv`` พร้อมไฟล์รูป ช่อง ``image`` คือ path ของรูปใน ZIP
+
+``plan`` จับคู่แต่ละแถวกับสินค้าเดิม (ตาม ``id`` ถ้ามี ไม่งั้นตามชื่อ) แล้วเก็บเฉพาะฟิลด์ที่ต่างกัน
+คอลัมน์/คีย์ที่ไม่มีในไฟล์ถือว่าไม่แตะค่าเดิม ``BulkJob`` ส่งแต่ละแถวผ่าน thread pool ขนาดจำกัด
+(ภายในแถวทำตามลำดับ: สร้าง -> options -> รูป) และเก็บผลทีละแถวให้หน้าเพจแสดงความคืบหน้า
+รูปของสินค้าที่มีรูปอยู่แล้วจะถูกดาวน์โหลดมาเทียบก่อน อัปโหลดเฉพาะเมื่อไฟล์ต่างกัน
+
+``write_export`` เขียน ZIP ที่นำกลับเข้ามาได้ทีละไฟล์ (ดึงรูปพร้อมกันแต่ค้างในหน่วยความจำไม่เกิน
+ไม่กี่รูป) ใช้สำรอง catalog หรือย้ายเมนูไปสาขาอื่น
+
+    python -m catalog_bulk export backup.zip
+    python -m catalog_bulk import menu.zip --apply
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import posixpath
+import threading
+import unicodedata
+import zipfile
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Any, BinaryIO, Callable, Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import api_client
+import perf_spans
+from catalog_cache import CatalogCache, catalog
+from image_cache import ImageCache, images as product_images
+
+MAX_WORKERS = min(int(os.environ.get("POS_BULK_WORKERS", "8")), api_client.POOL_SIZE)
+CSV_COLUMNS = ["id", "name", "price", "category", "options", "image"]
+IMAGE_TYPES = {".png": "image/png", ".jpg": "image/jpeg", ".jpeg": "image/jpeg"}
+
+CREATE, UPDATE, DELETE, UNCHANGED = "create", "update", "delete", "unchanged"
+DONE, ERROR = "done", "error"
+
+
+class ImportRow(NamedTuple):
+    row: int
+    product_id: Optional[int]
+    fields: Dict[str, Any]
+    image_name: Optional[str]
+    image: Optional[bytes]
+
+
+class RowIssue(NamedTuple):
+    row: int
+    message: str
+
+
+class Change(NamedTuple):
+    row: int
+    action: str
+    product_id: Optional[Any]
+    name: str
+    fields: Dict[str, Any]
+    image_name: Optional[str]
+    image: Optional[bytes]
+    current_image_url: Optional[str]
+
+
+class RowResult(NamedTuple):
+    row: int
+    action: str
+    name: str
+    status: str
+    message: str
+
+
+# --- อ่านไฟล์ ---
+
+def _normalize_options(options: Any) -> List[Dict[str, Any]]:
+    if not isinstance(options, list):
+        raise ValueError("options ต้องเป็น list ของกลุ่ม")
+    groups = []
+    for group in options:
+        if not isinstance(group, dict) or not str(group.get("name", "")).strip():
+            raise ValueError("กลุ่ม option ต้องมีชื่อ")
+        choices = []
+        for choice in group.get("choices") or []:
+            if not isinstance(choice, dict) or not str(choice.get("name", "")).strip():
+                raise ValueError(f"ตัวเลือกในกลุ่ม '{group['name']}' ต้องมีชื่อ")
+            choices.append({"name": str(choice["name"]).strip(), "price": round(float(choice.get("price") or 0), 2)})
+        groups.append({"name": str(group["name"]).strip(), "choices": choices})
+    return groups
+
+
+def _parse_record(row: int, record: Dict[str, Any], images: Optional[Dict[str, bytes]]) -> ImportRow:
+    # ค่าว่าง/ไม่มีคีย์ = ไม่แตะค่าเดิม ยกเว้น options ที่เป็น list ว่างได้ (ลบ options ทั้งหมด)
+    fields: Dict[str, Any] = {}
+    name = str(record.get("name") or "").strip()
+    if not name:
+        raise ValueError("ต้องมีชื่อสินค้า")
+    fields["name"] = name
+    if record.get("price") not in (None, ""):
+        price = round(float(record["price"]), 2)
+        if price < 0:
+            raise ValueError("ราคาติดลบไม่ได้")
+        fields["price"] = price
+    if str(record.get("category") or "").strip():
+        fields["category"] = str(record["category"]).strip()
+    options = record.get("options")
+    if isinstance(options, str):
+        options = json.loads(options) if options.strip() else None
+    if options is not None:
+        fields["options"] = _normalize_options(options)
+    product_id = int(record["id"]) if record.get("id") not in (None, "") else None
+    image_name = str(record.get("image") or "").strip() or None
+    image = None
+    if image_name:
+        if images is None:
+            raise ValueError(f"อ้างถึงรูป '{image_name}' แต่ไฟล์ที่นำเข้าไม่ใช่ ZIP")
+        if posixpath.splitext(image_name)[1].lower() not in IMAGE_TYPES:
+            raise ValueError(f"รูป '{image_name}' ต้องเป็น {', '.join(IMAGE_TYPES)}")
+        image = images.get(posixpath.normpath(image_name))
+        if image is None:
+            raise ValueError(f"ไม่พบรูป '{image_name}' ใน ZIP")
+    return ImportRow(row, product_id, fields, image_name, image)
+
+
+def _records_from_json(data: bytes) -> List[Dict[str, Any]]:
+    records = json.loads(data.decode("utf-8-sig"))
+    if isinstance(records, dict):
+        records = records.get("products")
+    if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+        raise ValueError("JSON ต้องเป็น list ของสินค้า")
+    return records
+
+
+def _records_from_csv(data: bytes) -> List[Dict[str, Any]]:
+    reader = csv.DictReader(io.StringIO(data.decode("utf-8-sig")))
+    if not reader.fieldnames or "name" not in reader.fieldnames:
+        raise ValueError(f"CSV ต้องมีหัวคอลัมน์ ({', '.join(CSV_COLUMNS)})")
+    # ตัดค่าที่เกินจำนวนหัวคอลัมน์ (DictReader เก็บไว้ใต้คีย์ None)
+    return [{k: v for k, v in record.items() if k is not None} for record in reader]
+
+
+def read_import(file_name: str, data: bytes) -> Tuple[List[ImportRow], List[RowIssue]]:
+    """อ่านไฟล์นำเข้า คืนแถวที่ใช้ได้และปัญหาของแถวที่ใช้ไม่ได้ (แถวเริ่มที่ 1)
+
+    ไฟล์ทั้งไฟล์อ่านไม่ได้จะโยน ``ValueError``
+    """
+    images: Optional[Dict[str, bytes]] = None
+    extension = os.path.splitext(file_name)[1].lower()
+    if extension == ".zip":
+        try:
+            archive = zipfile.ZipFile(io.BytesIO(data))
+        except zipfile.BadZipFile as e:
+            raise ValueError(f"เปิดไฟล์ ZIP ไม่ได้: {e}") from e
+        with archive:
+            names = [n for n in archive.namelist() if not n.endswith("/")]
+            manifest = next((n for base in ("products.json", "products.csv") for n in names if posixpath.basename(n) == base), None)
+            if manifest is None:
+                raise ValueError("ใน ZIP ต้องมี products.json หรือ products.csv")
+            root = posixpath.dirname(manifest)
+            images = {
+                posixpath.normpath(posixpath.relpath(n, root) if root else n): archive.read(n)
+                for n in names if posixpath.splitext(n)[1].lower() in IMAGE_TYPES
+            }
+            data, extension = archive.read(manifest), posixpath.splitext(manifest)[1]
+    if extension == ".json":
+        records = _records_from_json(data)
+    elif extension == ".csv":
+        records = _records_from_csv(data)
+    else:
+        raise ValueError("รองรับเฉพาะไฟล์ .csv, .json หรือ .zip")
+
+    rows: List[ImportRow] = []
+    issues: List[RowIssue] = []
+    for number, record in enumerate(records, start=1):
+        try:
+            rows.append(_parse_record(number, record, images))
+        except (ValueError, TypeError) as e:
+            issues.append(RowIssue(number, str(e)))
+    return rows, issues
+
+
+# --- เทียบกับ catalog ปัจจุบัน ---
+
+def _name_key(name: str) -> str:
+    return unicodedata.normalize("NFC", name).strip().casefold()
+
+
+def _current_fields(product: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "name": product.get("name", ""),
+        "price": round(float(product.get("price") or 0), 2),
+        "category": product.get("category", ""),
+        "options": _normalize_options(product.get("options") or []),
+    }
+
+
+def plan(
+    rows: List[ImportRow],
+    products: List[Dict[str, Any]],
+    delete_missing: bool = False,
+    read_issues: Sequence[RowIssue] = (),
+) -> Tuple[List[Change], List[RowIssue]]:
+    """รายการเปลี่ยนแปลงที่ต้องทำเพื่อให้ catalog ตรงกับไฟล์ (รวมแถวที่ไม่เปลี่ยนเพื่อแสดงผล)
+
+    ``read_issues`` คือแถวที่ ``read_import`` อ่านไม่ได้ ถ้ามีแถวที่มีปัญหาแม้แต่แถวเดียว (ทั้งตอนอ่านและตอนเทียบ)
+    จะไม่ลบสินค้าที่ไม่มีในไฟล์ เพราะแถวนั้นอาจหมายถึงสินค้าที่มีอยู่ (เช่นพิมพ์ราคาผิด หรือชื่อซ้ำ)
+    """
+    by_id = {str(p["id"]): p for p in products}
+    by_name: Dict[str, List[Dict[str, Any]]] = {}
+    for product in products:
+        by_name.setdefault(_name_key(product.get("name", "")), []).append(product)
+
+    changes: List[Change] = []
+    issues: List[RowIssue] = []
+    matched_ids = set()
+    seen_names: Dict[str, int] = {}
+    for row in rows:
+        key = _name_key(row.fields["name"])
+        if key in seen_names:
+            issues.append(RowIssue(row.row, f"ชื่อซ้ำกับแถวที่ {seen_names[key]}"))
+            continue
+        seen_names[key] = row.row
+        if row.product_id is not None and str(row.product_id) in by_id:
+            product = by_id[str(row.product_id)]
+        else:
+            candidates = by_name.get(key, [])
+            if len(candidates) > 1:
+                issues.append(RowIssue(row.row, f"มีสินค้าชื่อ '{row.fields['name']}' หลายรายการ ต้องระบุ id"))
+                continue
+            product = candidates[0] if candidates else None
+        if product is None:
+            missing = [f for f in ("price", "category") if f not in row.fields]
+            if missing:
+                issues.append(RowIssue(row.row, f"สินค้าใหม่ต้องมี {', '.join(missing)}"))
+                continue
+            changes.append(Change(row.row, CREATE, None, row.fields["name"], dict(row.fields), row.image_name, row.image, None))
+            continue
+        if str(product["id"]) in matched_ids:
+            issues.append(RowIssue(row.row, f"จับคู่กับสินค้า id {product['id']} ซ้ำกับแถวอื่น"))
+            continue
+        matched_ids.add(str(product["id"]))
+        current = _current_fields(product)
+        fields = {k: v for k, v in row.fields.items() if current.get(k) != v}
+        action = UPDATE if fields or row.image is not None else UNCHANGED
+        changes.append(Change(row.row, action, product["id"], row.fields["name"], fields, row.image_name, row.image, product.get("image_url")))
+    if delete_missing and (issues or read_issues):
+        issues.append(RowIssue(0, "ไม่ลบสินค้าที่ไม่มีในไฟล์ เพราะมีแถวที่มีปัญหา แก้ไฟล์แล้วนำเข้าใหม่"))
+    elif delete_missing:
+        for product in products:
+            if str(product["id"]) not in matched_ids:
+                changes.append(Change(0, DELETE, product["id"], product.get("name", ""), {}, None, None, None))
+    return changes, issues
+
+
+# --- นำไปใช้ ---
+
+def _upload_image(product_id: Any, change: Change) -> None:
+    extension = posixpath.splitext(change.image_name or "")[1].lower()
+    file_name = posixpath.basename(change.image_name or f"{product_id}{extension}")
+    api_client.upload_product_image(product_id, (file_name, change.image, IMAGE_TYPES.get(extension, "application/octet-stream")))
+
+
+def _same_image(image_url: Optional[str], image: bytes) -> bool:
+    if not image_url:
+        return False
+    try:
+        current = api_client.fetch_image(image_url)
+    except api_client.ApiError:
+        return False
+    return hashlib.blake2b(current).digest() == hashlib.blake2b(image).digest()
+
+
+@perf_spans.timed("bulk.apply_row")
+def apply_change(change: Change) -> Tuple[RowResult, bool]:
+    """ทำการเปลี่ยนแปลงของแถวเดียว คืนผลและบอกว่าอัปโหลดรูปใหม่หรือไม่"""
+    if change.action == UNCHANGED:
+        return RowResult(change.row, change.action, change.name, DONE, "ไม่มีการเปลี่ยนแปลง"), False
+    done: List[str] = []
+    uploaded = False
+    try:
+        product_id = change.product_id
+        if change.action == DELETE:
+            api_client.delete_product(product_id)
+            done.append("ลบแล้ว")
+        elif change.action == CREATE:
+            fields = change.fields
+            created = api_client.create_product(fields["name"], fields["price"], fields["category"])
+            product_id = created["id"]
+            done.append(f"สร้างแล้ว (id {product_id})")
+            if fields.get("options"):
+                api_client.update_product(product_id, {"options": fields["options"]})
+                done.append("options")
+        elif change.fields:
+            api_client.update_product(product_id, change.fields)
+            done.append("แก้ไข " + ", ".join(change.fields))
+        if change.image is not None:
+            if change.action != CREATE and _same_image(change.current_image_url, change.image):
+                done.append("รูปเหมือนเดิม")
+            else:
+                _upload_image(product_id, change)
+                uploaded = True
+                done.append("อัปโหลดรูป")
+    except (api_client.ApiError, KeyError) as e:
+        # ส่วนที่ทำไปแล้วในแถวนี้ไม่ถูกย้อนกลับ นำเข้าไฟล์เดิมซ้ำจะทำเฉพาะส่วนที่ยังขาด
+        detail = e.detail if isinstance(e, api_client.ApiError) else f"backend ไม่ได้คืน {e}"
+        return RowResult(change.row, change.action, change.name, ERROR, "; ".join(done + [detail])), uploaded
+    return RowResult(change.row, change.action, change.name, DONE, ", ".join(done)), uploaded
+
+
+class BulkJob:
+    """ชุดการเปลี่ยนแปลงที่กำลังทำใน thread เบื้องหลัง อ่านความคืบหน้าจาก ``results`` ได้ตลอด"""
+
+    def __init__(
+        self,
+        changes: List[Change],
+        workers: int = MAX_WORKERS,
+        catalog_source: CatalogCache = catalog,
+        image_cache: ImageCache = product_images,
+    ):
+        self.changes = changes
+        self.workers = max(1, workers)
+        self.catalog_source = catalog_source
+        self.image_cache = image_cache
+        self.results: List[Optional[RowResult]] = [None] * len(changes)
+        self.completed = 0
+        self.finished = threading.Event()
+        self._cancel = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "BulkJob":
+        self._thread = threading.Thread(target=self.run, name="catalog-bulk", daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self) -> None:
+        """แถวที่ยังไม่เริ่มจะไม่ถูกทำ แถวที่กำลังทำอยู่จะทำจนจบ"""
+        self._cancel.set()
+
+    def _run_one(self, change: Change) -> Tuple[RowResult, bool]:
+        if self._cancel.is_set():
+            return RowResult(change.row, change.action, change.name, ERROR, "ยกเลิก"), False
+        return apply_change(change)
+
+    def run(self) -> None:
+        uploaded_ids = set()
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="catalog-bulk") as pool:
+                futures = {pool.submit(self._run_one, c): i for i, c in enumerate(self.changes)}
+                for future in as_completed(futures):
+                    index = futures[future]
+                    result, uploaded = future.result()
+                    self.results[index] = result
+                    self.completed += 1
+                    if uploaded and self.changes[index].product_id is not None:
+                        uploaded_ids.add(self.changes[index].product_id)
+        finally:
+            self.catalog_source.invalidate()
+            for product_id in uploaded_ids:
+                self.image_cache.invalidate_product(product_id)
+            self.finished.set()
+
+    def summary(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for result in self.results:
+            if result is not None:
+                counts[result.status] = counts.get(result.status, 0) + 1
+        return counts
+
+
+# --- ส่งออก ---
+
+def export_record(product: Dict[str, Any], image_name: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        "id": product.get("id"),
+        "name": product.get("name", ""),
+        "price": product.get("price", 0),
+        "category": product.get("category", ""),
+        "options": product.get("options") or [],
+        "image": image_name,
+    }
+
+
+def iter_csv(records: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """CSV ทีละบรรทัด (options เป็น JSON ในคอลัมน์เดียว) เปิดใน Excel ได้เพราะขึ้นต้นด้วย BOM"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS)
+    buffer.write("\ufeff")
+    writer.writeheader()
+    for record in records:
+        writer.writerow(dict(record, options=json.dumps(record["options"], ensure_ascii=False), image=record.get("image") or ""))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _bounded_map(fn: Callable[[Any], Any], items: Iterable[Any], workers: int) -> Iterator[Tuple[Any, Future]]:
+    # เหมือน pool.map แต่ส่งงานล่วงหน้าไม่เกิน 2 เท่าของจำนวน worker ผลที่ค้างในหน่วยความจำจึงมีจำกัด
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="catalog-export") as pool:
+        pending: Deque[Tuple[Any, Future]] = deque()
+        for item in items:
+            pending.append((item, pool.submit(fn, item)))
+            if len(pending) >= workers * 2:
+                yield pending.popleft()
+        while pending:
+            yield pending.popleft()
+
+
+def _image_name(product: Dict[str, Any]) -> str:
+    extension = posixpath.splitext(product["image_url"].split("?", 1)[0])[1].lower()
+    return f"images/{product['id']}{extension if extension in IMAGE_TYPES else '.jpg'}"
+
+
+@perf_spans.timed("bulk.export")
+def write_export(out: BinaryIO, products: List[Dict[str, Any]], include_images: bool = True, workers: int = MAX_WORKERS) -> List[RowIssue]:
+    """เขียน ZIP (products.json + รูป) ลง ``out`` คืนรายการรูปที่ดาวน์โหลดไม่ได้ (ลำดับสินค้าเริ่มที่ 1)"""
+    issues: List[RowIssue] = []
+    image_names: Dict[int, str] = {}
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        with_images = [(n, p) for n, p in enumerate(products, start=1) if include_images and p.get("image_url")]
+        for (number, product), future in _bounded_map(lambda item: api_client.fetch_image(item[1]["image_url"]), with_images, workers):
+            try:
+                data = future.result()
+            except api_client.ApiError as e:
+                issues.append(RowIssue(number, f"ดาวน์โหลดรูปของ '{product.get('name')}' ไม่ได้: {e.detail}"))
+                continue
+            # รูปถูกบีบอัดมาแล้ว เก็บแบบไม่บีบซ้ำ
+            archive.writestr(_image_name(product), data, compress_type=zipfile.ZIP_STORED)
+            image_names[number] = _image_name(product)
+        manifest = [export_record(p, image_names.get(n)) for n, p in enumerate(products, start=1)]
+        archive.writestr("products.json", json.dumps(manifest, ensure_ascii=False, indent=1))
+        archive.writestr("products.csv", "".join(iter_csv(manifest)))
+    return issues
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="นำเข้า/ส่งออก catalog สินค้าทีละมากๆ")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("path", help="ไฟล์ .zip/.csv/.json ที่จะนำเข้า หรือไฟล์ .zip ที่จะส่งออก")
+    parser.add_argument("--apply", action="store_true", help="นำเข้าจริง (ไม่ใส่จะแสดงแค่รายการที่จะเปลี่ยน)")
+    parser.add_argument("--delete-missing", action="store_true", help="ลบสินค้าที่ไม่มีในไฟล์")
+    parser.add_argument("--no-images", action="store_true", help="ส่งออกโดยไม่รวมรูป")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    args = parser.parse_args()
+    products = api_client.fetch_products()
+
+    if args.command == "export":
+        with open(args.path, "wb") as f:
+            issues = write_export(f, products, include_images=not args.no_images, workers=args.workers)
+        for issue in issues:
+            print(f"สินค้าลำดับ {issue.row}: {issue.message}")
+        print(f"ส่งออก {len(products)} รายการไปที่ {args.path}")
+        return
+
+    with open(args.path, "rb") as f:
+        rows, issues = read_import(os.path.basename(args.path), f.read())
+    changes, plan_issues = plan(rows, products, delete_missing=args.delete_missing, read_issues=issues)
+    for issue in sorted(issues + plan_issues):
+        print(f"แถว {issue.row}: {issue.message}")
+    pending = [c for c in changes if c.action != UNCHANGED]
+    counts = {a: sum(c.action == a for c in changes) for a in (CREATE, UPDATE, DELETE, UNCHANGED)}
+    print(", ".join(f"{a} {n}" for a, n in counts.items()))
+    if not args.apply or not pending:
+        return
+    job = BulkJob(pending, workers=args.workers)
+    job.run()
+    for result in job.results:
+        if result is not None and result.status == ERROR:
+            print(f"แถว {result.row} ({result.name}): {result.message}")
+    print(", ".join(f"{status} {n}" for status, n in job.summary().items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""แคชรายการสินค้า (catalog) ที่ใช้ร่วมกันทุก session ใน process เดียวกัน
+
+ระหว่างช่วงที่ข้อมูลยังสด การอ่าน catalog ไม่มีการเรียก backend เลย เมื่อหมดช่วงแล้ว
+จะ revalidate ด้วย ``If-None-Match``/``If-Modified-Since`` ถ้า backend ส่ง
+``ETag``/``Last-Modified`` มา (ได้ 304 ก็ใช้ข้อมูลเดิมต่อโดยไม่ต้อง parse JSON ใหม่)
+ถ้า backend ไม่มี validator จะดึงใหม่ทั้งก้อนเมื่อครบ TTL
+
+ข้อมูลที่คืนให้ถูกแชร์ข้ามทุก session ห้ามแก้ไขในที่ ต้อง ``copy.deepcopy`` ก่อนเสมอ
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import api_client
+import perf_spans
+
+logger = logging.getLogger(__name__)
+
+# ช่วงที่ถือว่าข้อมูลยังสด (วินาที) เมื่อ backend รองรับ validator การ revalidate ถูกมาก จึงตั้งสั้นได้
+REVALIDATE_INTERVAL = float(os.environ.get("POS_CATALOG_REVALIDATE", "15"))
+# ถ้า backend ไม่ส่ง ETag/Last-Modified จะดึงใหม่ทั้งหมดเมื่อครบ TTL นี้
+FALLBACK_TTL = float(os.environ.get("POS_CATALOG_TTL", "60"))
+
+
+class CatalogSnapshot(NamedTuple):
+    version: int
+    products: List[Dict[str, Any]]
+
+
+class CatalogCache:
+    def __init__(self, revalidate_interval: float = REVALIDATE_INTERVAL, fallback_ttl: float = FALLBACK_TTL):
+        self.revalidate_interval = revalidate_interval
+        self.fallback_ttl = fallback_ttl
+        self._lock = threading.Lock()
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._etag: Optional[str] = None
+        self._last_modified: Optional[str] = None
+        self._digest: Optional[str] = None
+        self._fetched_at = 0.0
+        self.last_error: Optional[api_client.ApiError] = None
+        # ตั้งโดย snapshot_store เมื่อมี thread เบื้องหลัง revalidate ให้ทุกกี่วินาที
+        self.background_interval: Optional[float] = None
+
+    @property
+    def version(self) -> int:
+        snapshot = self._snapshot
+        return snapshot.version if snapshot else 0
+
+    def _fresh_for(self) -> float:
+        if self.background_interval:
+            # thread เบื้องหลังดึงให้ก่อนหมดช่วงนี้เสมอ การอ่านจะดึงเองก็ต่อเมื่อ thread ค้าง หรือหลัง invalidate()
+            return self.background_interval * 3
+        has_validator = self._etag is not None or self._last_modified is not None
+        return self.revalidate_interval if has_validator else self.fallback_ttl
+
+    def _is_fresh(self) -> bool:
+        return self._snapshot is not None and time.monotonic() - self._fetched_at < self._fresh_for()
+
+    def get_snapshot(self) -> CatalogSnapshot:
+        """คืน catalog ปัจจุบัน โยน ``ApiError`` เฉพาะตอนที่ยังไม่เคยโหลดสำเร็จเลย"""
+        if self._is_fresh():
+            return self._snapshot
+        with self._lock:
+            # session อื่นอาจโหลดให้แล้วระหว่างรอ lock
+            if self._is_fresh():
+                return self._snapshot
+            try:
+                self._revalidate()
+                self.last_error = None
+            except api_client.ApiError as e:
+                self.last_error = e
+                if self._snapshot is None:
+                    raise
+                logger.warning("catalog revalidation failed, serving stale copy: %s", e)
+                # เลื่อนการลองใหม่ออกไปหนึ่งรอบ จะได้ไม่ยิง backend ที่ล่มอยู่ทุก rerun
+                self._fetched_at = time.monotonic()
+            return self._snapshot
+
+    def refresh(self) -> CatalogSnapshot:
+        """revalidate ทันทีโดยไม่สนช่วงที่ยังสด (ใช้โดย thread เบื้องหลัง) โยน ``ApiError`` ถ้าล้มเหลว"""
+        with self._lock:
+            try:
+                self._revalidate()
+            except api_client.ApiError as e:
+                self.last_error = e
+                raise
+            self.last_error = None
+            return self._snapshot
+
+    def get_products(self) -> List[Dict[str, Any]]:
+        return self.get_snapshot().products
+
+    @perf_spans.timed("catalog.revalidate")
+    def _revalidate(self) -> None:
+        headers = {}
+        if self._snapshot is not None:
+            if self._etag:
+                headers["If-None-Match"] = self._etag
+            if self._last_modified:
+                headers["If-Modified-Since"] = self._last_modified
+        response = api_client.request("GET", "/products", endpoint="products", headers=headers)
+        self._fetched_at = time.monotonic()
+        if response.status_code == 304 and self._snapshot is not None:
+            return
+        self._etag = response.headers.get("ETag")
+        self._last_modified = response.headers.get("Last-Modified")
+        # backend ที่ไม่มี validator: ถ้า body เหมือนเดิมก็ไม่ต้อง parse และไม่เปลี่ยน version
+        digest = hashlib.blake2b(response.content, digest_size=16).hexdigest()
+        if digest == self._digest and self._snapshot is not None:
+            return
+        try:
+            with perf_spans.span("api.json_decode"):
+                products = response.json()
+        except ValueError as e:
+            raise api_client.ApiResponseError("GET /products ตอบกลับด้วยข้อมูลที่ไม่ใช่ JSON", status_code=response.status_code) from e
+        self._digest = digest
+        self._snapshot = CatalogSnapshot(self.version + 1, products or [])
+
+    def invalidate(self) -> None:
+        """บังคับให้การอ่านครั้งถัดไปดึง catalog ใหม่ทั้งหมด (เรียกหลังแก้ไขสินค้า)"""
+        with self._lock:
+            self._fetched_at = 0.0
+            self._etag = None
+            self._last_modified = None
+            self._digest = None
+
+
+catalog = CatalogCache()
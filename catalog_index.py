@@ -0,0 +1,143 @@
+"""ดัชนีเมนูในหน่วยความจำ สร้างครั้งเดียวต่อ version ของ catalog แล้วแชร์ทุก session
+
+  * หมวดหมู่ -> รายการสินค้า และ product id -> สินค้า
+  * ค้นหาชื่อสินค้าแบบ prefix/substring และแบบใกล้เคียง (fuzzy) ที่ใช้กับภาษาไทยได้
+
+ภาษาไทยไม่เว้นวรรคระหว่างคำ จึงค้นด้วย bigram ของตัวอักษร (ไม่ตัดคำ) เช่นพิมพ์ "ไทย"
+ก็เจอ "ชาไทย" ก่อนเทียบจะ normalize ข้อความ (NFC, ตัวพิมพ์เล็ก) และตัดวรรณยุกต์/การันต์ออก
+พิมพ์ "ชาเขียวนม" หรือสะกดวรรณยุกต์ผิดก็ยังเจอ
+
+ดัชนีและ list ที่คืนให้ถูกแชร์ข้าม session ห้ามแก้ไขในที่
+"""
+
+import re
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional, Tuple
+
+from catalog_cache import CatalogCache, catalog
+
+ALL_CATEGORIES = "แสดงทั้งหมด"
+SEARCH_LIMIT = 50
+# ความคล้ายขั้นต่ำ (0-1) ระหว่างคำค้นกับช่วงที่ใกล้ที่สุดในชื่อสินค้า ถึงจะนับเป็นผลค้นหาแบบใกล้เคียง
+FUZZY_MIN_RATIO = 0.7
+
+# ไม้ไต่คู้ ไม้เอก-ไม้จัตวา การันต์ นิคหิต ยามักการ
+_THAI_MARKS = re.compile("[\u0e47-\u0e4e]")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    text = unicodedata.normalize("NFC", text or "").casefold()
+    text = _THAI_MARKS.sub("", text)
+    return _SPACES.sub(" ", text).strip()
+
+
+def _grams(text: str) -> List[str]:
+    compact = text.replace(" ", "")
+    if len(compact) < 2:
+        return [compact] if compact else []
+    return [compact[i:i + 2] for i in range(len(compact) - 1)]
+
+
+def _partial_ratio(query: str, name: str) -> float:
+    """ความคล้ายของ ``query`` กับช่วงของ ``name`` ที่ยาวเท่ากันและคล้ายที่สุด"""
+    if len(name) <= len(query):
+        return SequenceMatcher(None, query, name).ratio()
+    matcher = SequenceMatcher(None, query)
+    best = 0.0
+    for start in range(len(name) - len(query) + 1):
+        matcher.set_seq2(name[start:start + len(query)])
+        best = max(best, matcher.ratio())
+    return best
+
+
+class CatalogIndex:
+    def __init__(self, version: int, products: List[Dict[str, Any]]):
+        self.version = version
+        self.products = products
+        self.by_id: Dict[Any, Dict[str, Any]] = {p["id"]: p for p in products}
+        by_category: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for p in products:
+            by_category[p.get("category")].append(p)
+        self.by_category = dict(by_category)
+        self.categories: List[str] = sorted(c for c in self.by_category if c)
+        self._names = [normalize(p.get("name", "")) for p in products]
+        # bigram -> ตำแหน่งสินค้า (ตัวอักษรเดี่ยวก็เก็บไว้สำหรับคำค้นตัวเดียว)
+        self._postings: Dict[str, set] = defaultdict(set)
+        for position, name in enumerate(self._names):
+            compact = name.replace(" ", "")
+            for gram in set(_grams(name)) | set(compact):
+                self._postings[gram].add(position)
+
+    def products_in(self, category: str = ALL_CATEGORIES) -> List[Dict[str, Any]]:
+        if category == ALL_CATEGORIES:
+            return self.products
+        return self.by_category.get(category, [])
+
+    def _rank(self, position: int, query: str) -> Optional[Tuple[int, float]]:
+        name = self._names[position]
+        if name == query:
+            return (0, 0.0)
+        if name.startswith(query):
+            return (1, 0.0)
+        if any(word.startswith(query) for word in name.split(" ")):
+            return (2, 0.0)
+        if query in name or query.replace(" ", "") in name.replace(" ", ""):
+            return (3, float(name.find(query)))
+        return None
+
+    def search(self, text: str, category: str = ALL_CATEGORIES, limit: int = SEARCH_LIMIT) -> List[Dict[str, Any]]:
+        """ค้นหาสินค้าจากชื่อ เรียงจากตรงกันมากไปน้อย (ตรงทั้งคำ > ขึ้นต้น > มีอยู่ในชื่อ) ถ้าไม่เจอเลยจึงใช้ผลแบบใกล้เคียง"""
+        query = normalize(text)
+        if not query:
+            return self.products_in(category)
+        grams = _grams(query)
+        hits = Counter()
+        for gram in grams:
+            hits.update(self._postings.get(gram, ()))
+        in_category = None if category == ALL_CATEGORIES else category
+
+        ranked = []
+        near = []
+        for position, count in hits.items():
+            if in_category is not None and self.products[position].get("category") != in_category:
+                continue
+            rank = self._rank(position, query) if count >= len(grams) else None
+            if rank is not None:
+                ranked.append((rank, len(self._names[position]), position))
+            else:
+                near.append((-count, position))
+        ranked.sort()
+        if not ranked and near:
+            # ไม่มีชื่อไหนมีคำค้นอยู่ (เช่นพิมพ์ผิด) จึงเทียบแบบใกล้เคียงกับสินค้าที่มี bigram ตรงมากที่สุดไม่กี่รายการ
+            fuzzy = []
+            for _, position in sorted(near)[:limit * 2]:
+                ratio = _partial_ratio(query, self._names[position])
+                if ratio >= FUZZY_MIN_RATIO:
+                    fuzzy.append(((4, -ratio), len(self._names[position]), position))
+            fuzzy.sort()
+            ranked = fuzzy
+        return [self.products[position] for _, _, position in ranked[:limit]]
+
+
+_lock = threading.Lock()
+_index: Optional[CatalogIndex] = None
+
+
+def get_index(source: CatalogCache = catalog) -> CatalogIndex:
+    """ดัชนีของ catalog ปัจจุบัน สร้างใหม่เฉพาะเมื่อ version ของ catalog เปลี่ยน
+
+    โยน ``api_client.ApiError`` ต่อเมื่อ catalog ยังไม่เคยโหลดสำเร็จ (เหมือน ``get_snapshot``)
+    """
+    global _index
+    snapshot = source.get_snapshot()
+    index = _index
+    if index is not None and index.version == snapshot.version:
+        return index
+    with _lock:
+        if _index is None or _index.version != snapshot.version:
+            _index = CatalogIndex(snapshot.version, snapshot.products)
+        return _index
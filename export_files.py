@@ -0,0 +1,62 @@
+"""ไฟล์ส่งออกชั่วคราวที่หน้าเพจเตรียมไว้ให้ดาวน์โหลด
+
+ทุกไฟล์อยู่ใน ``EXPORT_DIR`` session ที่เตรียมไฟล์ใหม่จะลบไฟล์เก่าของตัวเองทันที ส่วนไฟล์ของ session
+ที่ปิดไปแล้ว ``sweep`` จะลบเมื่อเก่ากว่า ``MAX_AGE`` วินาที (เรียกตอนสร้างไฟล์ใหม่และตอน render หน้า
+ส่งออก อย่างมากทุก ``SWEEP_INTERVAL`` วินาที)
+"""
+
+import logging
+import os
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+EXPORT_DIR = os.environ.get("POS_EXPORT_DIR", os.path.join(tempfile.gettempdir(), "pos_exports"))
+MAX_AGE = float(os.environ.get("POS_EXPORT_MAX_AGE", "3600"))
+SWEEP_INTERVAL = 300.0
+
+_sweep_lock = threading.Lock()
+_last_sweep = 0.0
+
+
+def new_path(prefix: str, suffix: str) -> str:
+    """สร้างไฟล์ว่างใหม่ใน ``EXPORT_DIR`` แล้วคืน path"""
+    sweep()
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix=prefix, suffix=suffix, dir=EXPORT_DIR)
+    os.close(fd)
+    return path
+
+
+def remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def sweep(max_age: float = MAX_AGE, force: bool = False) -> int:
+    """ลบไฟล์ส่งออกที่เก่ากว่า ``max_age`` วินาที คืนจำนวนที่ลบ"""
+    global _last_sweep
+    with _sweep_lock:
+        if not force and time.monotonic() - _last_sweep < SWEEP_INTERVAL:
+            return 0
+        _last_sweep = time.monotonic()
+    cutoff = time.time() - max_age
+    removed = 0
+    try:
+        entries = list(os.scandir(EXPORT_DIR))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except OSError:
+            pass
+    if removed:
+        logger.info("removed %d stale export files", removed)
+    return removed
@@ -0,0 +1,244 @@
+"""แคชรูปสินค้าในเครื่องพร้อมรูปย่อหลายขนาด (variant) สำหรับแต่ละหน้าจอ
+
+รูปต้นฉบับถูกดาวน์โหลดจาก backend แค่ครั้งเดียวต่อรูป แล้วย่อด้วย Pillow เป็นทุก variant
+ใน ``VARIANTS`` (ไม่ขยายรูปเล็กให้ใหญ่ขึ้น) เก็บเป็นไฟล์ใน ``.pos_data/images``
+variant เป็น JPEG (PNG เฉพาะรูปที่โปร่งใสจริง) และไม่กว้างเกินที่หน้าจอแสดง ``st.image`` จึงส่ง bytes
+ให้ browser ตรงๆ ถ้าเป็นรูปแบบอื่น (เช่น WebP) หรือกว้างกว่า ``width`` Streamlit จะแปลง/ย่อใหม่ทุก render
+ชื่อไฟล์ผูกกับ product id และ hash ของ ``image_url`` ถ้า URL เปลี่ยนก็เป็นรูปใหม่โดยอัตโนมัติ
+ส่วนกรณี backend เขียนทับรูปที่ URL เดิม ต้องเรียก ``invalidate_product`` หลังอัปโหลด
+
+ขนาดรวมบนดิสก์ถูกจำกัดด้วย ``MAX_BYTES`` ไฟล์ที่ไม่ได้ใช้นานที่สุดจะถูกลบก่อน (LRU)
+
+การดาวน์โหลดและย่อรูปไม่เกิดระหว่าง render หน้า: ถ้ายังไม่มีในแคช ``get`` จะคืน ``None`` ทันที
+(หน้าจอใช้ URL ต้นฉบับไปก่อน) แล้วสร้าง variant ใน thread pool ``BUILD_WORKERS`` ตัว
+``snapshot_store`` เรียก ``prefetch`` ทุกครั้งที่ catalog เปลี่ยน รูปส่วนใหญ่จึงพร้อมก่อนมีคนเปิดหน้าเมนู
+"""
+
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from PIL import Image, ImageOps
+
+import api_client
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.environ.get("POS_IMAGE_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".pos_data", "images"))
+MAX_BYTES = int(float(os.environ.get("POS_IMAGE_CACHE_MB", "200")) * 1024 * 1024)
+# รูปที่ดึงไม่สำเร็จ จะไม่ลองใหม่จนกว่าจะครบเวลานี้ (วินาที) กันหน้าเมนูยิง backend ทุก rerun
+FAILURE_TTL = 60.0
+JPEG_QUALITY = 80
+VARIANT_SUFFIX = ".img"
+# ย่อรูปกิน CPU เป็นหลัก ไม่ต้องใช้ thread เยอะ
+BUILD_WORKERS = int(os.environ.get("POS_IMAGE_WORKERS", "2"))
+
+# ขนาดกล่องสูงสุด (กว้าง, สูง) ของแต่ละ variant: menu แสดงเต็มคอลัมน์ (use_container_width) เผื่อจอ tablet
+# ความละเอียดสูง, admin แสดงที่ width=150 ซึ่ง st.image ย่อรูปที่กว้างกว่านั้นทุก render
+VARIANTS: Dict[str, Tuple[int, int]] = {
+    "menu": (480, 480),
+    "admin": (150, 150),
+}
+
+
+def _cache_key(product_id: Any, image_url: str) -> str:
+    return f"{product_id}-{hashlib.blake2b(image_url.encode(), digest_size=6).hexdigest()}"
+
+
+def make_variants(original: bytes) -> Dict[str, bytes]:
+    """ย่อรูปต้นฉบับเป็นทุก variant ใน ``VARIANTS`` คืน bytes แบบ JPEG (หรือ PNG ถ้ารูปโปร่งใส)"""
+    with Image.open(io.BytesIO(original)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+        if image.mode == "RGBA" and image.getchannel("A").getextrema()[0] == 255:
+            # มี alpha แต่ทึบทั้งรูป ใช้ JPEG ได้
+            image = image.convert("RGB")
+        variants = {}
+        for name, box in VARIANTS.items():
+            resized = image.copy()
+            resized.thumbnail(box, Image.LANCZOS)
+            buffer = io.BytesIO()
+            if resized.mode == "RGBA":
+                resized.save(buffer, format="PNG", optimize=True)
+            else:
+                resized.save(buffer, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+            variants[name] = buffer.getvalue()
+        return variants
+
+
+class ImageCache:
+    def __init__(self, cache_dir: str = CACHE_DIR, max_bytes: int = MAX_BYTES, workers: int = BUILD_WORKERS):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._failures: Dict[str, float] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="image-cache")
+        # key ที่อยู่ในคิวของ executor แล้ว กันส่งงานรูปเดียวกันซ้ำทุก rerun
+        self._queued: Set[str] = set()
+        # ชื่อไฟล์ -> ขนาด เรียงจากใช้ล่าสุดนานที่สุดไปใหม่สุด
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self) -> None:
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith(".webp"):
+                # variant แบบ WebP ของรุ่นก่อน st.image ต้องแปลงใหม่ทุก render จึงทิ้งแล้วสร้างใหม่
+                os.remove(entry.path)
+            elif entry.is_file() and entry.name.endswith(VARIANT_SUFFIX):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name, stat.st_size))
+        for _, name, size in sorted(entries):
+            self._index[name] = size
+            self._total_bytes += size
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.cache_dir, name)
+
+    def _read(self, name: str) -> Optional[bytes]:
+        with self._lock:
+            if name not in self._index:
+                return None
+            self._index.move_to_end(name)
+        try:
+            with open(self._path(name), "rb") as f:
+                data = f.read()
+            # mtime ใช้เรียงลำดับ LRU ใหม่ตอนเริ่ม process
+            os.utime(self._path(name))
+            return data
+        except OSError:
+            self._forget(name)
+            return None
+
+    def _write(self, name: str, data: bytes) -> None:
+        tmp_path = self._path(f".{name}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, self._path(name))
+        with self._lock:
+            self._total_bytes += len(data) - self._index.pop(name, 0)
+            self._index[name] = len(data)
+        self._evict()
+
+    def _forget(self, name: str) -> None:
+        with self._lock:
+            self._total_bytes -= self._index.pop(name, 0)
+
+    def _evict(self) -> None:
+        while True:
+            with self._lock:
+                if self._total_bytes <= self.max_bytes or len(self._index) <= len(VARIANTS):
+                    return
+                name, size = self._index.popitem(last=False)
+                self._total_bytes -= size
+            try:
+                os.remove(self._path(name))
+            except OSError:
+                pass
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def get(self, product: Dict[str, Any], variant: str, wait: bool = False) -> Optional[bytes]:
+        """คืนรูปของสินค้าขนาด ``variant`` หรือ ``None`` ถ้าไม่มีรูป/ดึงไม่ได้/ยังสร้างไม่เสร็จ
+
+        ถ้ายังไม่มีในแคชจะสร้างเบื้องหลังแล้วคืน ``None`` ทันที เว้นแต่ ``wait=True`` (ใช้ในสคริปต์)
+        """
+        image_url = product.get("image_url")
+        if not image_url:
+            return None
+        key = _cache_key(product.get("id"), image_url)
+        data = self._read(f"{key}-{variant}{VARIANT_SUFFIX}")
+        if data is not None:
+            return data
+        if wait:
+            return self._build(key, product.get("id"), image_url).get(variant)
+        self._schedule(key, product.get("id"), image_url)
+        return None
+
+    def prefetch(self, products: Iterable[Dict[str, Any]]) -> int:
+        """ส่งงานสร้าง variant ของสินค้าที่ยังไม่มีในแคชเข้า pool คืนจำนวนรูปที่ส่ง"""
+        scheduled = 0
+        for product in products:
+            image_url = product.get("image_url")
+            if not image_url:
+                continue
+            key = _cache_key(product.get("id"), image_url)
+            with self._lock:
+                cached = all(f"{key}-{name}{VARIANT_SUFFIX}" in self._index for name in VARIANTS)
+            if not cached and self._schedule(key, product.get("id"), image_url):
+                scheduled += 1
+        return scheduled
+
+    @property
+    def pending(self) -> int:
+        """จำนวนรูปที่รอสร้างอยู่ในคิว"""
+        with self._lock:
+            return len(self._queued)
+
+    def _schedule(self, key: str, product_id: Any, image_url: str) -> bool:
+        with self._lock:
+            if key in self._queued or time.monotonic() < self._failures.get(key, 0.0):
+                return False
+            self._queued.add(key)
+        self._executor.submit(self._build_queued, key, product_id, image_url)
+        return True
+
+    def _build_queued(self, key: str, product_id: Any, image_url: str) -> None:
+        try:
+            self._build(key, product_id, image_url)
+        except Exception:
+            logger.exception("building image variants for product %s failed", product_id)
+        finally:
+            with self._lock:
+                self._queued.discard(key)
+
+    def _build(self, key: str, product_id: Any, image_url: str) -> Dict[str, bytes]:
+        # งานอื่นที่สร้างรูปเดียวกันอยู่จะถูกรอ แล้วอ่านจากแคช ไม่ดึงซ้ำ
+        with self._key_lock(key):
+            cached = {name: self._read(f"{key}-{name}{VARIANT_SUFFIX}") for name in VARIANTS}
+            if all(data is not None for data in cached.values()):
+                return cached
+            if time.monotonic() < self._failures.get(key, 0.0):
+                return {}
+            try:
+                variants = make_variants(api_client.fetch_image(image_url))
+            except (api_client.ApiError, OSError, ValueError) as e:
+                logger.warning("image for product %s unavailable: %s", product_id, e)
+                self._failures[key] = time.monotonic() + FAILURE_TTL
+                return {}
+            self._failures.pop(key, None)
+            for variant_name, variant_data in variants.items():
+                self._write(f"{key}-{variant_name}{VARIANT_SUFFIX}", variant_data)
+            return variants
+
+    def invalidate_product(self, product_id: Any) -> None:
+        """ลบรูปทุก variant ของสินค้า (เรียกหลังอัปโหลดรูปใหม่ทับ URL เดิม)"""
+        prefix = f"{product_id}-"
+        with self._lock:
+            names = [name for name in self._index if name.startswith(prefix)]
+            self._failures = {k: v for k, v in self._failures.items() if not k.startswith(prefix)}
+        for name in names:
+            self._forget(name)
+            try:
+                os.remove(self._path(name))
+            except OSError:
+                pass
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+
+images = ImageCache()
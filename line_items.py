@@ -0,0 +1,69 @@
+"""แปลงออเดอร์ (ตาราง Arrow จาก ``order_store``) เป็นตารางรายการสินค้าแบบแบนในรอบเดียว
+
+ทำงานด้วย pyarrow compute ทั้งหมด ไม่มี loop ระดับ Python ต่อรายการ:
+  * แตก ``items`` ด้วย ``list_flatten`` และจับคู่กลับหาออเดอร์ด้วย ``list_parent_indices``
+  * รองรับข้อมูลเก่า: ราคาต่อหน่วยใช้ ``price_per_unit`` -> ``price_per_item`` -> ``item_total / quantity``
+    และถ้าไม่มี ``item_total`` จะคำนวณจากราคาต่อหน่วย x จำนวน
+  * จับคู่หมวดหมู่จาก catalog ด้วย ``index_in`` + ``take``
+"""
+
+from typing import Any, Dict, List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+LINE_ITEM_COLUMNS = ["order_id", "order_date", "product_id", "product_name", "category", "quantity", "unit_price", "item_total"]
+
+
+def item_unit_price(item: Dict[str, Any]) -> float:
+    """ราคาต่อหน่วยของรายการสินค้าหนึ่งรายการ (dict จาก API) ด้วยลำดับสำรองเดียวกับ ``flatten_line_items``"""
+    price = item.get("price_per_unit")
+    if price is None:
+        # key เก่า (ถ้าเคยมี)
+        price = item.get("price_per_item")
+    if price is None:
+        # ถ้าไม่มีจริงๆ ให้คำนวณจากยอดรวมของรายการ
+        quantity = item.get("quantity", 1)
+        price = item.get("item_total", 0) / quantity if quantity > 0 else 0
+    return price
+
+
+def _category_column(product_ids: pa.ChunkedArray, products: List[Dict[str, Any]]) -> pa.Array:
+    if not products:
+        return pa.nulls(len(product_ids), pa.string())
+    catalog_ids = pa.array([p.get("id") for p in products], type=pa.int64())
+    catalog_categories = pa.array([p.get("category") for p in products], type=pa.string())
+    positions = pc.index_in(product_ids, value_set=catalog_ids)
+    return pc.take(catalog_categories, positions)
+
+
+def flatten_line_items(orders: pa.Table, products: Optional[List[Dict[str, Any]]] = None) -> pa.Table:
+    """คืนตาราง Arrow หนึ่งแถวต่อหนึ่งรายการสินค้า ตามคอลัมน์ใน ``LINE_ITEM_COLUMNS``"""
+    items = orders.column("items")
+    parents = pc.list_parent_indices(items)
+    flat = pc.list_flatten(items)
+    # รายการที่เป็น null (ข้อมูลเสีย) ไม่นับ
+    valid = pc.is_valid(flat)
+    flat = pc.filter(flat, valid)
+    parents = pc.filter(parents, valid)
+
+    def field(name: str) -> pa.ChunkedArray:
+        return pc.struct_field(flat, name)
+
+    quantity = pc.fill_null(field("quantity"), 0)
+    item_total = field("item_total")
+    derived_unit = pc.if_else(pc.greater(quantity, 0), pc.divide(pc.fill_null(item_total, 0.0), pc.cast(quantity, pa.float64())), 0.0)
+    unit_price = pc.coalesce(field("price_per_unit"), field("price_per_item"), derived_unit)
+    item_total = pc.coalesce(item_total, pc.multiply(unit_price, pc.cast(quantity, pa.float64())))
+    product_id = field("product_id")
+
+    return pa.table({
+        "order_id": pc.take(orders.column("id"), parents),
+        "order_date": pc.take(orders.column("order_date"), parents),
+        "product_id": product_id,
+        "product_name": pc.dictionary_encode(field("product_name")),
+        "category": pc.dictionary_encode(_category_column(product_id, products or [])),
+        "quantity": quantity,
+        "unit_price": unit_price,
+        "item_total": item_total,
+    })
@@ -0,0 +1,172 @@
+"""ส่งออกออเดอร์/รายการสินค้ารายเดือนเป็น CSV หรือ Parquet โดยใช้หน่วยความจำคงที่
+
+ออเดอร์ถูกอ่านทีละ ``CHUNK_ORDERS`` รายการ (จาก snapshot ในเครื่อง หรือแบ่งหน้าจาก API ถ้ายังไม่มี
+snapshot) แปลงเป็นตาราง Arrow แล้วแปลงรายการสินค้าด้วย ``line_items.flatten_line_items`` (ใช้ราคาต่อหน่วย
+สำรองแบบเดียวกับ Dashboard) แต่ละก้อนถูกเขียนต่อท้ายไฟล์ทันที (Parquet หนึ่ง row group ต่อก้อน)
+ไม่มีจุดไหนถือออเดอร์ทั้งเดือนไว้พร้อมกัน ``iter_export`` คืน byte ของไฟล์ทีละก้อนเป็น generator
+
+    python -m order_export 2026-09 --kind line_items --format parquet -o line_items-2026-09.parquet
+"""
+
+import argparse
+import calendar
+import sys
+from datetime import date
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+import api_client
+import perf_spans
+from line_items import flatten_line_items
+from order_store import orders_to_table
+
+CHUNK_ORDERS = 10_000
+KINDS = ("orders", "line_items")
+FORMATS = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+
+def month_range(year: int, month: int) -> Tuple[date, date]:
+    """วันแรกและวันสุดท้ายของเดือน (รวมทั้งสองวัน)"""
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def iter_snapshot_orders(table: pa.Table, start_date: date, end_date: date, chunk: int = CHUNK_ORDERS) -> Iterator[pa.Table]:
+    """ออเดอร์ในช่วงวันที่จากตารางของ ``order_store`` ทีละก้อน (เรียงตาม id) ก้อนละไม่เกิน ``chunk`` แถว"""
+    order_date = table.column("order_date")
+    mask = pc.and_(
+        pc.greater_equal(order_date, pd.Timestamp(start_date)),
+        pc.less(order_date, pd.Timestamp(end_date) + pd.Timedelta(days=1)),
+    )
+    # เก็บแค่ตำแหน่งแถว (8 byte ต่อออเดอร์) ไม่ได้คัดลอกข้อมูลออเดอร์ทั้งช่วง
+    positions = np.flatnonzero(pc.fill_null(mask, False).to_numpy(zero_copy_only=False))
+    for offset in range(0, len(positions), chunk):
+        yield table.take(positions[offset:offset + chunk])
+
+
+def iter_api_orders(start_date: date, end_date: date, chunk: int = CHUNK_ORDERS) -> Iterator[pa.Table]:
+    """ออเดอร์ในช่วงวันที่จาก backend ทีละหน้า (ใหม่ไปเก่า ตามลำดับของ ``fetch_orders_page``)"""
+    cursor = None
+    while True:
+        page = api_client.fetch_orders_page(limit=chunk, cursor=cursor, start_date=start_date.isoformat(), end_date=end_date.isoformat())
+        if page.orders:
+            yield orders_to_table(page.orders)
+        if page.next_cursor is None or not page.orders:
+            return
+        cursor = page.next_cursor
+
+
+def _orders_rows(orders: pa.Table) -> pa.Table:
+    return pa.table({
+        "order_id": orders.column("id"),
+        "order_date": orders.column("order_date"),
+        "status": orders.column("status"),
+        "total_amount": orders.column("total_amount"),
+        "item_count": pc.fill_null(pc.list_value_length(orders.column("items")), 0),
+    })
+
+
+def _line_item_rows(orders: pa.Table, products: Optional[List[Dict[str, Any]]]) -> pa.Table:
+    # dictionary ของแต่ละก้อนไม่เหมือนกัน แปลงเป็น string เพื่อให้ทุกก้อนมี schema เดียวกัน
+    items = flatten_line_items(orders, products)
+    for name in ("product_name", "category"):
+        items = items.set_column(items.schema.get_field_index(name), name, pc.cast(items.column(name), pa.string()))
+    return items
+
+
+class _ChunkSink:
+    # file-like ขั้นต่ำที่ writer ของ pyarrow ต้องการ เก็บ byte ที่ถูกเขียนไว้จนกว่าจะถูกดึงออกไป
+    def __init__(self):
+        self.parts: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data: Any) -> int:
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def take(self) -> bytes:
+        data, self.parts = b"".join(self.parts), []
+        return data
+
+
+def iter_export(
+    order_chunks: Iterator[pa.Table],
+    kind: str = "line_items",
+    fmt: str = "csv",
+    products: Optional[List[Dict[str, Any]]] = None,
+) -> Iterator[bytes]:
+    """แปลงออเดอร์ทีละก้อนเป็นแถวของ ``kind`` แล้วคืน byte ของไฟล์ ``fmt`` ทีละก้อน"""
+    if kind not in KINDS or fmt not in FORMATS:
+        raise ValueError(f"kind ต้องเป็น {KINDS} และ fmt ต้องเป็น {tuple(FORMATS)}")
+    sink = _ChunkSink()
+    writer = None
+    try:
+        if fmt == "csv":
+            # BOM ให้ Excel เปิดภาษาไทยได้ถูก
+            sink.write(b"\xef\xbb\xbf")
+        for orders in order_chunks:
+            with perf_spans.span("export.chunk"):
+                rows = _orders_rows(orders) if kind == "orders" else _line_item_rows(orders, products)
+                if writer is None:
+                    writer = pa_csv.CSVWriter(sink, rows.schema) if fmt == "csv" else pq.ParquetWriter(sink, rows.schema, compression="zstd")
+                writer.write_table(rows)
+            yield sink.take()
+        if writer is None:
+            # ไม่มีออเดอร์ในช่วงนี้ก็ยังได้ไฟล์ที่มีแค่หัวคอลัมน์/schema
+            empty = _orders_rows(orders_to_table([])) if kind == "orders" else _line_item_rows(orders_to_table([]), products)
+            writer = pa_csv.CSVWriter(sink, empty.schema) if fmt == "csv" else pq.ParquetWriter(sink, empty.schema, compression="zstd")
+            writer.write_table(empty)
+    finally:
+        if writer is not None:
+            writer.close()
+    yield sink.take()
+
+
+@perf_spans.timed("export.write")
+def write_export(out: BinaryIO, order_chunks: Iterator[pa.Table], kind: str = "line_items", fmt: str = "csv", products: Optional[List[Dict[str, Any]]] = None) -> int:
+    """เขียนไฟล์ส่งออกลง ``out`` คืนจำนวน byte ที่เขียน"""
+    written = 0
+    for data in iter_export(order_chunks, kind, fmt, products):
+        out.write(data)
+        written += len(data)
+    return written
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="ส่งออกออเดอร์หรือรายการสินค้ารายเดือน")
+    parser.add_argument("month", help="เดือนที่จะส่งออก YYYY-MM")
+    parser.add_argument("--kind", choices=KINDS, default="line_items")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="csv")
+    parser.add_argument("-o", "--output", help="ไฟล์ปลายทาง (ไม่ระบุ = stdout)")
+    args = parser.parse_args()
+    year, month = (int(part) for part in args.month.split("-"))
+    start_date, end_date = month_range(year, month)
+    # ดึงจาก backend ทีละหน้า ไม่ต้องมี order store ในเครื่อง
+    chunks = iter_api_orders(start_date, end_date)
+    products = api_client.fetch_products() if args.kind == "line_items" else None
+    if args.output:
+        with open(args.output, "wb") as f:
+            written = write_export(f, chunks, args.kind, args.format, products)
+        print(f"เขียน {written / 1e6:.1f} MB ไปที่ {args.output}", file=sys.stderr)
+    else:
+        write_export(sys.stdout.buffer, chunks, args.kind, args.format, products)
+
+
+if __name__ == "__main__":
+    main()
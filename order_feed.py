@@ -0,0 +1,117 @@
+"""รับออเดอร์ใหม่แบบสดจาก backend ผ่าน server-sent events (``GET /orders/stream``)
+
+protocol ของ feed:
+  * client ส่ง id ออเดอร์ล่าสุดที่มีแล้วเป็น ``since_id`` (query และ header ``Last-Event-ID``)
+  * event ``order`` - ``id`` คือ id ออเดอร์, ``data`` คือ JSON ออเดอร์แบบเดียวกับ ``GET /orders``
+    server ส่งออเดอร์ที่ใหม่กว่า ``since_id`` ที่พลาดไปก่อน แล้วตามด้วยออเดอร์ใหม่ทันทีที่เข้ามา
+  * event ``gap`` - server ส่งย้อนหลังจาก ``since_id`` ไม่ได้ (ขาดไปนานเกินไป) client ต้องดึงส่วนที่ขาดเอง
+  * comment (``: ping``) เป็น heartbeat ถ้าเงียบนานเกิน read timeout ของ ``order_stream`` ถือว่า feed ขาด
+
+``OrderFeed`` มี thread หนึ่งตัวอ่าน feed แล้วส่งออเดอร์ให้ ``on_orders`` ถ้าขาดจะต่อใหม่แบบ backoff
+จาก id ล่าสุด (server ส่งที่พลาดไปให้เอง ไม่ต้องดึงทาง REST) ดึงทาง REST ผ่าน ``on_gap`` เฉพาะเมื่อได้ ``gap``
+ถ้า backend ไม่มี endpoint นี้ (404/405/501) feed จะหยุด และ ``snapshot_store`` กลับไป poll ตามรอบเดิม
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import api_client
+
+logger = logging.getLogger(__name__)
+
+FEED_ENABLED = os.environ.get("POS_ORDER_FEED", "1").lower() not in ("0", "false", "no")
+RECONNECT_BASE = 1.0
+RECONNECT_MAX = 60.0
+UNSUPPORTED_STATUSES = (404, 405, 501)
+
+CONNECTING, LIVE, RECONNECTING, UNSUPPORTED, STOPPED = "connecting", "live", "reconnecting", "unsupported", "stopped"
+
+
+class OrderFeed:
+    def __init__(
+        self,
+        since: Callable[[], int],
+        on_orders: Callable[[List[Dict[str, Any]]], None],
+        on_gap: Callable[[], None],
+    ):
+        """``since`` คืน high-water mark ปัจจุบัน, ``on_gap`` ต้องดึงออเดอร์ที่ขาดให้เสร็จก่อนคืนค่า
+        (ดึงไม่สำเร็จให้โยน ``ApiError`` feed จะรอ backoff ก่อนต่อใหม่)"""
+        self.since = since
+        self.on_orders = on_orders
+        self.on_gap = on_gap
+        self.status = STOPPED
+        self.last_error: Optional[api_client.ApiError] = None
+        self.last_event_at: Optional[float] = None
+        self.reconnects = 0
+        self.gaps = 0
+        self._last_id = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+
+    @property
+    def connected(self) -> bool:
+        return self.status == LIVE
+
+    def start(self) -> None:
+        """เริ่ม thread อ่าน feed (ถ้ายังไม่ได้เริ่ม) มีได้ตัวเดียวต่อ feed ไม่เริ่มใหม่ถ้า backend ไม่รองรับ"""
+        with self._thread_lock:
+            if self.status != UNSUPPORTED and (self._thread is None or not self._thread.is_alive()):
+                self._stop.clear()
+                self.status = CONNECTING
+                self._thread = threading.Thread(target=self._run, name="order-feed", daemon=True)
+                self._thread.start()
+
+    def stop(self) -> None:
+        # thread ค้างอยู่ที่การอ่าน feed จะหยุดเมื่อได้ event หรือ heartbeat ถัดไป
+        self._stop.set()
+        self.status = STOPPED
+
+    def _consume(self) -> None:
+        since_id = max(self.since(), self._last_id)
+        for event in api_client.stream_orders(since_id):
+            if self._stop.is_set():
+                return
+            self.status = LIVE
+            self.last_event_at = time.time()
+            if event.event == "order":
+                order = json.loads(event.data)
+                self._last_id = max(self._last_id, order["id"])
+                self.on_orders([order])
+            elif event.event == "gap":
+                self.gaps += 1
+                logger.info("order feed: gap after id %d, catching up over REST", since_id)
+                self.on_gap()
+                return
+
+    def _run(self) -> None:
+        attempt = 0
+        while not self._stop.is_set():
+            try:
+                self._consume()
+                attempt = 0
+            except api_client.ApiError as e:
+                if e.status_code in UNSUPPORTED_STATUSES:
+                    logger.info("order feed not supported by backend (%s), polling instead", e.status_code)
+                    self.status = UNSUPPORTED
+                    return
+                self.last_error = e
+                attempt += 1
+                logger.warning("order feed disconnected: %s", e)
+            except (ValueError, KeyError) as e:
+                self.last_error = api_client.ApiResponseError("feed ส่งข้อมูลที่อ่านไม่ได้", detail=str(e))
+                attempt += 1
+                logger.warning("order feed sent bad data: %s", e)
+            if self._stop.is_set():
+                break
+            self.status = RECONNECTING
+            self.reconnects += 1
+            # server ปิด feed ตามปกติก็เว้นสักครู่ กันวนต่อใหม่ถี่ๆ ถ้า server ปิดทันทีทุกครั้ง
+            delay = min(RECONNECT_MAX, RECONNECT_BASE * 2 ** (attempt - 1)) if attempt else RECONNECT_BASE
+            self._stop.wait(delay * random.uniform(0.5, 1.0))
+        self.status = STOPPED
@@ -0,0 +1,267 @@
+"""คิวออเดอร์ในเครื่อง (SQLite WAL) สำหรับ checkout ที่ไม่ต้องรอ backend
+
+ตอนกดยืนยันการสั่งซื้อ ออเดอร์จะถูกบันทึกลงคิวพร้อม idempotency key ที่สร้างฝั่ง client
+แล้วคืนให้แคชเชียร์ทันที worker เบื้องหลังหนึ่งตัวต่อ process จะส่งออเดอร์ที่ค้างอยู่ทีละชุด
+ถ้า backend ปฏิเสธ (4xx อื่นๆ) จะถูกทำเครื่องหมาย ``failed`` ให้แคชเชียร์ตัดสินใจ
+
+การส่งซ้ำขึ้นกับสัญญาของ backend (``POS_BACKEND_IDEMPOTENT``):
+  * backend ที่รองรับ ``Idempotency-Key`` ต้องคืนออเดอร์เดิม (หรือ 409) เมื่อได้ key ที่เคยสร้างแล้ว
+    ตั้ง ``POS_BACKEND_IDEMPOTENT=1`` แล้วทุกความล้มเหลวชั่วคราว (เชื่อมต่อไม่ได้, timeout, 429/5xx)
+    จะถูกส่งใหม่ด้วย key เดิมแบบ backoff + jitter รวมถึงออเดอร์ที่ค้าง ``sending`` ตอนเริ่ม process
+  * ค่าเริ่มต้นถือว่า backend ไม่รองรับ: ส่งใหม่อัตโนมัติเฉพาะกรณีที่แน่ใจว่า backend ไม่ได้สร้างออเดอร์
+    (เปิด connection ไม่ได้ หรือ 429) กรณีที่ไม่รู้ผล (timeout, connection ขาดหลังส่ง, 5xx, ค้าง ``sending``)
+    จะถูกพักไว้เป็น ``unconfirmed`` ให้แคชเชียร์ตรวจกับประวัติออเดอร์ก่อนยืนยันหรือส่งใหม่
+
+ทุกครั้งที่ส่งจะแนบ key เดิมใน header ``Idempotency-Key`` และแต่ละ key ถูกส่งโดย worker ได้ทีละครั้งเท่านั้น
+"""
+
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+import api_client
+
+logger = logging.getLogger(__name__)
+
+QUEUE_PATH = os.environ.get("POS_ORDER_QUEUE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".pos_data", "order_queue.sqlite3"))
+BATCH_SIZE = 20
+POLL_INTERVAL = 2.0
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 120.0
+# ออเดอร์ที่ส่งสำเร็จแล้วเก็บไว้ดูย้อนหลังเท่านี้ worker ลบทิ้งทุก PURGE_INTERVAL วินาที
+SENT_RETENTION = 7 * 24 * 3600
+PURGE_INTERVAL = 3600.0
+IDEMPOTENT_BACKEND = os.environ.get("POS_BACKEND_IDEMPOTENT", "0").lower() in ("1", "true", "yes")
+
+PENDING, SENDING, SENT, FAILED, UNCONFIRMED = "pending", "sending", "sent", "failed", "unconfirmed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    idempotency_key TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    order_id INTEGER,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+"""
+
+
+class QueuedOrder(NamedTuple):
+    idempotency_key: str
+    items: List[Dict[str, Any]]
+    status: str
+    attempts: int
+    created_at: float
+    order_id: Optional[int]
+    last_error: Optional[str]
+
+
+def _not_created(error: api_client.ApiError) -> bool:
+    # request ไม่ถึง backend หรือ backend บอกชัดว่าไม่ได้ทำอะไร
+    return isinstance(error, api_client.ApiUnreachableError) or error.status_code == 429
+
+
+def _is_ambiguous(error: api_client.ApiError) -> bool:
+    # ไม่รู้ว่า backend สร้างออเดอร์ไปแล้วหรือยัง
+    if isinstance(error, (api_client.ApiConnectionError, api_client.ApiTimeoutError)):
+        return True
+    return error.status_code is None or error.status_code >= 500
+
+
+def _backoff(attempts: int) -> float:
+    return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+
+
+class OrderQueue:
+    def __init__(
+        self,
+        path: str = QUEUE_PATH,
+        batch_size: int = BATCH_SIZE,
+        poll_interval: float = POLL_INTERVAL,
+        idempotent: bool = IDEMPOTENT_BACKEND,
+    ):
+        self.path = path
+        self.idempotent = idempotent
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # ใช้ connection เดียวตลอดอายุ process: การปิด connection สุดท้ายของไฟล์ WAL จะทำ checkpoint
+        # ซึ่งช้ากว่าตัว INSERT หลายสิบเท่า ทุกการเรียกจึงผ่าน lock ตัวเดียว (แต่ละคำสั่งสั้นมาก)
+        self._db_lock = threading.RLock()
+        self._conn = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            # ออเดอร์ที่ค้างสถานะ sending จาก process ก่อนหน้าที่ตายกลางทาง อาจถึง backend แล้ว
+            # ส่งใหม่ด้วย key เดิมได้เฉพาะเมื่อ backend ตัดซ้ำให้ ไม่อย่างนั้นพักไว้ให้แคชเชียร์ตรวจ
+            requeue = PENDING if idempotent else UNCONFIRMED
+            conn.execute("UPDATE outbox SET status = ?, next_attempt_at = ? WHERE status = ?", (requeue, time.time(), SENDING))
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        with self._db_lock:
+            yield self._conn
+
+    # --- ฝั่งหน้า POS ---
+
+    def enqueue(self, order_items: List[Dict[str, Any]]) -> str:
+        """บันทึกออเดอร์ลงคิวแล้วคืน idempotency key ทันที (ไม่รอ backend)"""
+        key = str(uuid.uuid4())
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO outbox (idempotency_key, payload, status, next_attempt_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, json.dumps(order_items, ensure_ascii=False), PENDING, now, now, now),
+            )
+        self.ensure_worker()
+        self._wakeup.set()
+        return key
+
+    def counts(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+        counts = {PENDING: 0, SENDING: 0, SENT: 0, FAILED: 0, UNCONFIRMED: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def list_orders(self, statuses: List[str], limit: int = 50) -> List[QueuedOrder]:
+        placeholders = ",".join("?" * len(statuses))
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT idempotency_key, payload, status, attempts, created_at, order_id, last_error FROM outbox "
+                f"WHERE status IN ({placeholders}) ORDER BY created_at LIMIT ?",
+                (*statuses, limit),
+            ).fetchall()
+        return [QueuedOrder(r[0], json.loads(r[1]), r[2], r[3], r[4], r[5], r[6]) for r in rows]
+
+    def retry(self, key: str) -> None:
+        """ส่งออเดอร์ที่ failed/unconfirmed ใหม่ (ด้วย key เดิม)"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE outbox SET status = ?, next_attempt_at = ?, updated_at = ? WHERE idempotency_key = ? AND status IN (?, ?)",
+                (PENDING, time.time(), time.time(), key, FAILED, UNCONFIRMED),
+            )
+        self.ensure_worker()
+        self._wakeup.set()
+
+    def confirm_sent(self, key: str) -> None:
+        """แคชเชียร์ตรวจแล้วว่าออเดอร์ unconfirmed เข้าระบบแล้ว"""
+        with self._connect() as conn:
+            conn.execute("UPDATE outbox SET status = ?, updated_at = ? WHERE idempotency_key = ? AND status = ?", (SENT, time.time(), key, UNCONFIRMED))
+
+    def discard(self, key: str) -> None:
+        """ลบออเดอร์ที่ failed/unconfirmed ออกจากคิว (เช่น แคชเชียร์ยกเลิกการขายนั้น)"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM outbox WHERE idempotency_key = ? AND status IN (?, ?)", (key, FAILED, UNCONFIRMED))
+
+    def purge_sent(self, older_than: float = SENT_RETENTION) -> int:
+        """ลบออเดอร์ที่ส่งสำเร็จนานกว่า ``older_than`` วินาที คืนจำนวนที่ลบ"""
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM outbox WHERE status = ? AND updated_at < ?", (SENT, time.time() - older_than)).rowcount
+
+    # --- worker ---
+
+    def _claim_batch(self) -> List[QueuedOrder]:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(
+                    "SELECT idempotency_key, payload, status, attempts, created_at, order_id, last_error FROM outbox "
+                    "WHERE status = ? AND next_attempt_at <= ? ORDER BY created_at LIMIT ?",
+                    (PENDING, now, self.batch_size),
+                ).fetchall()
+                conn.executemany("UPDATE outbox SET status = ?, updated_at = ? WHERE idempotency_key = ?", [(SENDING, now, r[0]) for r in rows])
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        return [QueuedOrder(r[0], json.loads(r[1]), SENDING, r[3], r[4], r[5], r[6]) for r in rows]
+
+    def _submit(self, order: QueuedOrder) -> None:
+        attempts = order.attempts + 1
+        now = time.time()
+        try:
+            created = api_client.create_order(order.items, idempotency_key=order.idempotency_key)
+        except api_client.ApiError as e:
+            if e.status_code == 409:
+                # backend แจ้งว่ามีออเดอร์ของ key นี้แล้ว ถือว่าส่งสำเร็จ
+                update = (SENT, attempts, now, None, None)
+            elif _not_created(e) or (self.idempotent and _is_ambiguous(e)):
+                update = (PENDING, attempts, now + _backoff(attempts), None, e.detail)
+            elif _is_ambiguous(e):
+                update = (UNCONFIRMED, attempts, now, None, e.detail)
+            else:
+                update = (FAILED, attempts, now, None, e.detail)
+        except Exception as e:
+            logger.exception("unexpected error submitting order %s", order.idempotency_key)
+            update = (FAILED, attempts, now, None, str(e))
+        else:
+            update = (SENT, attempts, now, created.get("id"), None)
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, order_id = ?, last_error = ?, updated_at = ? WHERE idempotency_key = ?",
+                (*update, now, order.idempotency_key),
+            )
+
+    def drain_once(self) -> int:
+        """ส่งออเดอร์ที่ถึงเวลาส่งหนึ่งชุด คืนจำนวนที่พยายามส่ง"""
+        batch = self._claim_batch()
+        for order in batch:
+            self._submit(order)
+        return len(batch)
+
+    def _run(self) -> None:
+        next_purge = 0.0
+        while not self._stop.is_set():
+            try:
+                if time.monotonic() >= next_purge:
+                    next_purge = time.monotonic() + PURGE_INTERVAL
+                    purged = self.purge_sent()
+                    if purged:
+                        logger.info("order queue: purged %d sent orders", purged)
+                if self.drain_once():
+                    continue
+            except Exception:
+                logger.exception("order queue worker error")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def ensure_worker(self) -> None:
+        """เริ่ม worker เบื้องหลัง (ถ้ายังไม่ได้เริ่ม) มีได้ตัวเดียวต่อ process"""
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._stop.clear()
+                self._worker = threading.Thread(target=self._run, name="order-queue-worker", daemon=True)
+                self._worker.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        if self._worker is not None:
+            self._worker.join(timeout)
+
+    def close(self) -> None:
+        self.stop()
+        with self._db_lock:
+            self._conn.close()
+
+
+outbox = OrderQueue()
@@ -0,0 +1,419 @@
+"""ที่เก็บออเดอร์ในเครื่องแบบ Parquet สำหรับ Dashboard
+
+แทนที่จะดึงออเดอร์ทั้งหมดใหม่ทุกครั้ง store จะจำ high-water mark (id ออเดอร์ล่าสุดที่มีแล้ว)
+และดึงเฉพาะออเดอร์ที่ใหม่กว่านั้นมาเขียนต่อเป็นไฟล์ part ใหม่ ค่าใช้จ่ายในการ refresh
+จึงขึ้นกับจำนวนออเดอร์ใหม่ ไม่ใช่ประวัติทั้งหมด
+
+ออเดอร์จาก feed สด (``order_feed``) ถูกต่อท้ายในหน่วยความจำด้วย ``append_live`` ทันที และเขียนลงดิสก์
+เป็น part เมื่อสะสมครบ ``LIVE_FLUSH_ROWS`` รายการหรือ ``LIVE_FLUSH_INTERVAL`` วินาที (หรือก่อน sync)
+ถ้า process ตายก่อนเขียน ออเดอร์ชุดนั้นจะถูกดึงใหม่ตาม high-water mark บนดิสก์ในการ sync ครั้งถัดไป
+
+แอปกับคำสั่งด้านล่างใช้โฟลเดอร์เดียวกันได้พร้อมกัน: ทุกการเขียน (และการอ่าน part จากดิสก์) ถือ lock file
+``.lock`` ในโฟลเดอร์ และถ้า manifest บนดิสก์ถูกเปลี่ยนโดย process อื่น store จะโหลดข้อมูลใหม่ทั้งหมด
+(เพิ่ม ``generation``) ก่อนทำงานต่อ ``resync`` ดึงข้อมูลลงโฟลเดอร์ชั่วคราวก่อนแล้วค่อยสลับ manifest
+ถ้า backend ล่มกลางทาง ข้อมูลเดิมจะยังอยู่ครบ
+
+    python -m order_store sync      # ดึงออเดอร์ใหม่
+    python -m order_store compact   # รวมไฟล์ part ให้เหลือไฟล์เดียว
+    python -m order_store resync    # ดึงใหม่ทั้งหมดแทนข้อมูลในเครื่อง (เมื่อ backend แก้ข้อมูลย้อนหลัง)
+
+ตารางที่ได้จาก store ถูกแชร์ข้ามทุก session ห้ามแก้ไขในที่
+"""
+
+import argparse
+import contextlib
+import functools
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+import api_client
+
+try:
+    import fcntl
+except ImportError:  # Windows: มีแค่ lock ภายใน process ห้ามรันคำสั่งด้านบนขณะที่แอปเปิดอยู่
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+STORE_DIR = os.environ.get("POS_ORDER_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".pos_data", "orders"))
+SYNC_INTERVAL = float(os.environ.get("POS_ORDER_SYNC_INTERVAL", "30"))
+FETCH_BATCH = 1000
+FLUSH_ROWS = 100_000
+ROW_GROUP_SIZE = 64 * 1024
+LIVE_FLUSH_ROWS = 5000
+LIVE_FLUSH_INTERVAL = float(os.environ.get("POS_ORDER_LIVE_FLUSH_INTERVAL", "300"))
+# เมื่อไฟล์ part เยอะเกินนี้จะ compact ให้อัตโนมัติหลัง sync
+AUTO_COMPACT_PARTS = 64
+MANIFEST = "manifest.json"
+LOCK_FILE = ".lock"
+
+OPTION_TYPE = pa.struct([("name", pa.string()), ("price", pa.float64())])
+ITEM_TYPE = pa.struct([
+    ("product_id", pa.int64()),
+    ("product_name", pa.string()),
+    ("quantity", pa.int64()),
+    ("price_per_unit", pa.float64()),
+    ("price_per_item", pa.float64()),  # key ของข้อมูลเก่า
+    ("item_total", pa.float64()),
+    ("selected_options", pa.list_(OPTION_TYPE)),
+])
+ORDER_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("order_date", pa.timestamp("us")),
+    ("total_amount", pa.float64()),
+    ("status", pa.string()),
+    ("items", pa.list_(ITEM_TYPE)),
+])
+_RAW_SCHEMA = ORDER_SCHEMA.set(1, pa.field("order_date", pa.string()))
+
+
+def orders_to_table(orders: List[Dict[str, Any]]) -> pa.Table:
+    """แปลง JSON ออเดอร์จาก API ให้เป็นตารางตาม ``ORDER_SCHEMA`` (field ที่ไม่รู้จักจะถูกทิ้ง)"""
+    table = pa.Table.from_pylist(orders, schema=_RAW_SCHEMA)
+    dates = pd.to_datetime(table.column("order_date").to_pandas(), format="ISO8601")
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    return table.set_column(1, "order_date", pa.Array.from_pandas(dates, type=pa.timestamp("us")))
+
+
+def _row_to_order(row: Dict[str, Any]) -> Dict[str, Any]:
+    # ให้หน้าตาเหมือน JSON จาก API: วันที่เป็นข้อความ และไม่มี key ที่ไม่มีค่า (รูปแบบข้อมูลเก่าแต่ละแบบ)
+    row["order_date"] = row["order_date"].isoformat()
+    row["items"] = [{k: v for k, v in item.items() if v is not None} for item in row["items"] or []]
+    return row
+
+
+def query_orders_page(
+    table: pa.Table,
+    limit: int = 25,
+    cursor: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    order_id: Optional[str] = None,
+    product: Optional[str] = None,
+) -> api_client.OrdersPage:
+    """แบ่งหน้า/กรองออเดอร์จากตารางในเครื่อง ด้วยเงื่อนไขเดียวกับ ``api_client.fetch_orders_page``
+
+    ตารางเรียงตาม id จากเก่าไปใหม่ (ต่อท้ายตาม high-water mark) หน้าแรกจึงเป็นแถวท้ายสุด
+    """
+    ids = table.column("id")
+    conditions = []
+    if cursor:
+        conditions.append(pc.less(ids, int(cursor)))
+    if start_date:
+        conditions.append(pc.greater_equal(table.column("order_date"), pd.Timestamp(start_date)))
+    if end_date:
+        conditions.append(pc.less(table.column("order_date"), pd.Timestamp(end_date) + pd.Timedelta(days=1)))
+    if order_id:
+        if not order_id.strip().isdigit():
+            return api_client.OrdersPage([], None)
+        conditions.append(pc.equal(ids, int(order_id)))
+    if product:
+        items = table.column("items")
+        names = pc.utf8_lower(pc.struct_field(pc.list_flatten(items), "product_name"))
+        matched_rows = pc.unique(pc.filter(pc.list_parent_indices(items), pc.fill_null(pc.match_substring(names, product.lower()), False)))
+        conditions.append(pc.is_in(pa.array(np.arange(table.num_rows)), value_set=matched_rows))
+    if conditions:
+        mask = pc.fill_null(functools.reduce(pc.and_, conditions), False)
+        positions = np.flatnonzero(mask.to_numpy(zero_copy_only=False))
+    else:
+        positions = np.arange(table.num_rows)
+    page_positions = positions[-limit:][::-1]
+    orders = [_row_to_order(row) for row in table.take(page_positions).to_pylist()]
+    next_cursor = str(orders[-1]["id"]) if len(positions) > limit else None
+    return api_client.OrdersPage(orders, next_cursor)
+
+
+class OrderStore:
+    def __init__(self, root: str = STORE_DIR, sync_interval: float = SYNC_INTERVAL):
+        self.root = root
+        self.sync_interval = sync_interval
+        self._lock = threading.RLock()
+        self._lock_file = None
+        self._lock_depth = 0
+        self._manifest: Optional[Dict[str, Any]] = None
+        # stat ของ manifest ตอนที่อ่าน/เขียนล่าสุด ถ้าไม่ตรงกับบนดิสก์แปลว่า process อื่นแก้ไข
+        self._manifest_stat: Optional[Tuple[int, int, int]] = None
+        self._table: Optional[pa.Table] = None
+        self._last_sync = 0.0
+        # ออเดอร์จาก feed ที่อยู่ใน self._table แล้วแต่ยังไม่ได้เขียนเป็น part
+        self._live: List[pa.Table] = []
+        self._live_rows = 0
+        self._live_since = 0.0
+        self._live_high_water_mark = 0
+        # version เพิ่มทุกครั้งที่ข้อมูลเปลี่ยน; generation เพิ่มเมื่อข้อมูลเดิมถูกแทนที่ (resync)
+        # ถ้า generation ไม่เปลี่ยน แถวเดิมของ table() จะอยู่ที่เดิมและมีแถวใหม่ต่อท้ายเท่านั้น
+        self.version = 0
+        self.generation = 0
+
+    # --- lock / manifest ---
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        """lock ทั้งภายใน process และข้าม process (lock file) ซ้อนกันได้ในเธรดเดียวกัน"""
+        with self._lock:
+            if self._lock_depth == 0 and fcntl is not None:
+                os.makedirs(self.root, exist_ok=True)
+                self._lock_file = open(os.path.join(self.root, LOCK_FILE), "a")
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                if self._lock_depth == 1:
+                    self._check_manifest()
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0 and self._lock_file is not None:
+                    self._lock_file.close()  # ปลด flock ไปด้วย
+                    self._lock_file = None
+
+    def _stat_manifest(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(os.path.join(self.root, MANIFEST))
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def _check_manifest(self) -> None:
+        # manifest ถูกเขียนแบบ os.replace ทุกครั้ง ถ้า process อื่น sync/compact/resync ไป stat จะเปลี่ยน
+        if self._manifest is not None and self._stat_manifest() != self._manifest_stat:
+            logger.info("order store: %s changed by another process, reloading", self.root)
+            self._manifest = None
+            self._reload()
+
+    def _reload(self) -> None:
+        # part บนดิสก์ถูกแทนที่: โหลดตารางใหม่ เก็บไว้เฉพาะออเดอร์จาก feed ที่ใหม่กว่า high-water mark บนดิสก์
+        disk_high_water_mark = self._load_manifest()["high_water_mark"]
+        live = [t.filter(pc.greater(t.column("id"), disk_high_water_mark)) for t in self._live]
+        self._live = [t for t in live if t.num_rows]
+        self._live_rows = sum(t.num_rows for t in self._live)
+        if not self._live:
+            self._live_high_water_mark = 0
+        self._table = None
+        self.version += 1
+        self.generation += 1
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        if self._manifest is None:
+            path = os.path.join(self.root, MANIFEST)
+            self._manifest_stat = self._stat_manifest()
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    self._manifest = json.load(f)
+            else:
+                self._manifest = {"high_water_mark": 0, "parts": [], "next_part": 1}
+        return self._manifest
+
+    def _save_manifest(self, manifest: Dict[str, Any]) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = os.path.join(self.root, MANIFEST + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, os.path.join(self.root, MANIFEST))
+        self._manifest = manifest
+        self._manifest_stat = self._stat_manifest()
+
+    @property
+    def high_water_mark(self) -> int:
+        return max(self._load_manifest()["high_water_mark"], self._live_high_water_mark)
+
+    # --- ingestion ---
+
+    def _write_part(self, manifest: Dict[str, Any], table: pa.Table) -> str:
+        os.makedirs(self.root, exist_ok=True)
+        name = f"part-{manifest['next_part']:06d}.parquet"
+        tmp_path = os.path.join(self.root, name + ".tmp")
+        pq.write_table(table, tmp_path, row_group_size=ROW_GROUP_SIZE, compression="zstd")
+        os.replace(tmp_path, os.path.join(self.root, name))
+        return name
+
+    def sync(self, force: bool = False) -> int:
+        """ดึงออเดอร์ที่ใหม่กว่า high-water mark มาต่อท้าย คืนจำนวนออเดอร์ใหม่
+
+        ถ้าเพิ่ง sync ไปไม่ถึง ``sync_interval`` วินาทีจะข้ามไป เว้นแต่ ``force=True``
+        """
+        with self._locked():
+            if not force and time.monotonic() - self._last_sync < self.sync_interval:
+                return 0
+            self.flush_live()
+            manifest = dict(self._load_manifest())
+            fetched: List[Dict[str, Any]] = []
+            since_id = manifest["high_water_mark"]
+            appended = 0
+            try:
+                while True:
+                    page = api_client.fetch_orders_since(since_id, limit=FETCH_BATCH)
+                    fetched.extend(page.orders)
+                    if page.orders:
+                        since_id = max(since_id, max(o["id"] for o in page.orders))
+                    if page.next_cursor is None or not page.orders:
+                        break
+                    # sync ครั้งแรกอาจมีหลักล้านออเดอร์ จึงเขียนเป็น part ทีละก้อนแทนการถือ JSON ไว้ทั้งหมด
+                    if len(fetched) >= FLUSH_ROWS:
+                        manifest = self._append(manifest, fetched, since_id)
+                        appended += len(fetched)
+                        fetched = []
+            finally:
+                # backend ล่มก็ไม่ลองใหม่ทุก rerun ให้รอรอบถัดไป
+                self._last_sync = time.monotonic()
+            if fetched:
+                manifest = self._append(manifest, fetched, since_id)
+                appended += len(fetched)
+            if appended and len(manifest["parts"]) > AUTO_COMPACT_PARTS:
+                self.compact()
+            return appended
+
+    def _append(self, manifest: Dict[str, Any], fetched: List[Dict[str, Any]], since_id: int) -> Dict[str, Any]:
+        new_table = orders_to_table(fetched)
+        manifest = dict(manifest)
+        manifest["parts"] = manifest["parts"] + [self._write_part(manifest, new_table)]
+        manifest["next_part"] += 1
+        manifest["high_water_mark"] = since_id
+        self._save_manifest(manifest)
+        if self._table is not None:
+            self._table = pa.concat_tables([self._table, new_table])
+        self.version += 1
+        logger.info("order store: appended %d orders (high-water mark %d)", len(fetched), since_id)
+        return manifest
+
+    def append_live(self, orders: List[Dict[str, Any]]) -> int:
+        """ต่อท้ายออเดอร์จาก feed ในหน่วยความจำ (ข้ามออเดอร์ที่ id ไม่เกิน high-water mark) คืนจำนวนที่ต่อ"""
+        with self._locked():
+            high_water_mark = self.high_water_mark
+            new_orders = sorted((o for o in orders if o["id"] > high_water_mark), key=lambda o: o["id"])
+            if not new_orders:
+                return 0
+            new_table = orders_to_table(new_orders)
+            self._table = pa.concat_tables([self.table(), new_table])
+            if not self._live:
+                self._live_since = time.monotonic()
+            self._live.append(new_table)
+            self._live_rows += new_table.num_rows
+            self._live_high_water_mark = new_orders[-1]["id"]
+            self.version += 1
+            if self._live_rows >= LIVE_FLUSH_ROWS or time.monotonic() - self._live_since >= LIVE_FLUSH_INTERVAL:
+                self.flush_live()
+            return len(new_orders)
+
+    def flush_live(self) -> None:
+        """เขียนออเดอร์จาก feed ที่ค้างในหน่วยความจำเป็น part เดียว แล้วเลื่อน high-water mark บนดิสก์"""
+        with self._locked():
+            if not self._live:
+                return
+            live = pa.concat_tables(self._live).combine_chunks()
+            manifest = dict(self._load_manifest())
+            manifest["parts"] = manifest["parts"] + [self._write_part(manifest, live)]
+            manifest["next_part"] += 1
+            manifest["high_water_mark"] = self._live_high_water_mark
+            self._save_manifest(manifest)
+            # แต่ละ batch ของ feed เป็น chunk เล็กๆ ของตัวเอง รวมเป็น chunk เดียวโดยที่ลำดับแถวไม่เปลี่ยน
+            table = self.table()
+            self._table = pa.concat_tables([table.slice(0, table.num_rows - live.num_rows), live])
+            self._live, self._live_rows = [], 0
+            if len(manifest["parts"]) > AUTO_COMPACT_PARTS:
+                self.compact()
+
+    # --- reading ---
+
+    def table(self) -> pa.Table:
+        with self._lock:
+            if self._table is None:
+                # ถือ lock file ระหว่างอ่าน กัน process อื่น compact ลบ part ทิ้งกลางทาง
+                with self._locked():
+                    parts = [pq.read_table(os.path.join(self.root, name), schema=ORDER_SCHEMA) for name in self._load_manifest()["parts"]]
+                    self._table = pa.concat_tables(parts + self._live) if parts or self._live else ORDER_SCHEMA.empty_table()
+            return self._table
+
+    # --- maintenance ---
+
+    def compact(self) -> None:
+        """รวมไฟล์ part ทั้งหมดเป็นไฟล์เดียว (ข้อมูลไม่เปลี่ยน)"""
+        with self._locked():
+            self.flush_live()
+            manifest = dict(self._load_manifest())
+            old_parts = manifest["parts"]
+            if len(old_parts) <= 1:
+                return
+            table = self.table().combine_chunks()
+            manifest["parts"] = [self._write_part(manifest, table)]
+            manifest["next_part"] += 1
+            self._save_manifest(manifest)
+            for name in old_parts:
+                try:
+                    os.remove(os.path.join(self.root, name))
+                except FileNotFoundError:
+                    pass
+            self._table = table
+            logger.info("order store: compacted %d parts", len(old_parts))
+
+    def resync(self) -> int:
+        """ดึงออเดอร์ทั้งหมดใหม่แทนข้อมูลในเครื่อง ใช้เมื่อ backend แก้ไขออเดอร์ย้อนหลัง
+
+        ดึงลงโฟลเดอร์ชั่วคราวข้างๆ ``root`` ก่อน (ไม่ถือ lock ระหว่างดึง) แล้วย้าย part เข้ามาและแทนที่
+        manifest ในครั้งเดียว ถ้าดึงไม่สำเร็จจะโยน ``ApiError`` โดยที่ข้อมูลเดิมไม่ถูกแตะ
+        """
+        parent = os.path.dirname(os.path.abspath(self.root))
+        os.makedirs(parent, exist_ok=True)
+        staging = OrderStore(tempfile.mkdtemp(prefix=os.path.basename(self.root) + ".resync-", dir=parent))
+        try:
+            count = staging.sync(force=True)
+            staging.compact()
+            staged = staging._load_manifest()
+            with self._locked():
+                manifest = dict(self._load_manifest())
+                old_parts = manifest["parts"]
+                manifest["parts"] = []
+                os.makedirs(self.root, exist_ok=True)
+                for name in staged["parts"]:
+                    # ใช้เลข part ถัดไปของ store นี้ ชื่อจึงไม่ชนกับ part เดิมที่ยังถูกอ้างอยู่
+                    target = f"part-{manifest['next_part']:06d}.parquet"
+                    os.replace(os.path.join(staging.root, name), os.path.join(self.root, target))
+                    manifest["parts"].append(target)
+                    manifest["next_part"] += 1
+                manifest["high_water_mark"] = staged["high_water_mark"]
+                self._save_manifest(manifest)
+                for name in old_parts:
+                    try:
+                        os.remove(os.path.join(self.root, name))
+                    except FileNotFoundError:
+                        pass
+                self._reload()
+        finally:
+            shutil.rmtree(staging.root, ignore_errors=True)
+        logger.info("order store: resynced %d orders", count)
+        return count
+
+
+store = OrderStore()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="จัดการที่เก็บออเดอร์ในเครื่องของ Dashboard")
+    parser.add_argument("command", choices=["sync", "compact", "resync"])
+    parser.add_argument("--dir", default=STORE_DIR, help="โฟลเดอร์ที่เก็บไฟล์ Parquet")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    target = OrderStore(args.dir)
+    if args.command == "sync":
+        print(f"ออเดอร์ใหม่ {target.sync(force=True)} รายการ (high-water mark {target.high_water_mark})")
+    elif args.command == "compact":
+        target.compact()
+        print("compact เสร็จ")
+    else:
+        print(f"ดึงข้อมูลใหม่ทั้งหมด {target.resync()} รายการ")
+
+
+if __name__ == "__main__":
+    main()
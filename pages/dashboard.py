@@ -1,50 +1,63 @@
 # pages/4_📊_Dashboard.py (Patched for backward compatibility)
 
 import streamlit as st
-import requests
-import pandas as pd
 import plotly.express as px
 from datetime import datetime, timedelta
 
-API_BASE_URL = "http://localhost:8000"
+import api_client
+import perf_spans
+from catalog_cache import catalog
+from sales_rollup import rollup as sales_rollup
+from snapshot_store import snapshots
 
-@st.cache_data(ttl=300)
-def get_all_orders():
-    try:
-        response = requests.get(f"{API_BASE_URL}/orders"); response.raise_for_status(); return response.json()
-    except requests.exceptions.RequestException: st.error("ไม่สามารถดึงข้อมูลออเดอร์ได้"); return []
-
-@st.cache_data(ttl=3600)
-def get_all_products():
-    try:
-        response = requests.get(f"{API_BASE_URL}/products"); response.raise_for_status(); return response.json()
-    except requests.exceptions.RequestException: st.error("ไม่สามารถดึงข้อมูลสินค้าได้"); return []
+# ครั้งแรกของ process ต้องรอ sync ออเดอร์ทั้งหมด ทุก session ที่เปิดพร้อมกันรอรอบเดียวกัน
+FIRST_LOAD_WAIT = 30
+# ส่วนสรุปยอดขายเช็ก snapshot ใหม่ทุกกี่วินาที (rerun เฉพาะส่วนนั้น ไม่ใช่ทั้งหน้า)
+LIVE_REFRESH = 2
 
-st.set_page_config(layout="wide", page_title="Dashboard")
-st.title("📊 Dashboard สรุปยอดขาย")
+def get_orders_snapshot():
+    # thread เบื้องหลังตัวเดียว sync ออเดอร์ใหม่และอัปเดต rollup รายวันให้ทุก session หน้านี้แค่อ่านผล
+    with perf_spans.span("dashboard.snapshot"):
+        snapshot = snapshots.orders(wait=FIRST_LOAD_WAIT)
+    if snapshots.last_orders_error is not None:
+        if snapshot is None or snapshot.high_water_mark == 0: st.error("ไม่สามารถดึงข้อมูลออเดอร์ได้")
+        else: st.warning("ไม่สามารถดึงออเดอร์ใหม่ได้ แสดงข้อมูลล่าสุดที่มีในเครื่อง")
+    return snapshot
 
-orders = get_all_orders()
-products = get_all_products()
+def get_summary(orders_snapshot, start_date, end_date, products):
+    # query rollup ใหม่เฉพาะเมื่อมีออเดอร์ใหม่ เปลี่ยนช่วงวันที่ หรือ catalog เปลี่ยน
+    summary_key = (orders_snapshot.version, start_date, end_date, catalog.version)
+    cached = st.session_state.get('dashboard_summary')
+    if cached is None or cached[0] != summary_key:
+        # ทุกตัวเลขมาจาก rollup รายวัน ใช้เวลาตามจำนวนวันในช่วง ไม่ต้องสแกนออเดอร์ทั้งหมด
+        with perf_spans.span("dashboard.query"):
+            cached = (summary_key, sales_rollup.query(start_date, end_date, products))
+        st.session_state.dashboard_summary = cached
+    return cached[1]
 
-if not orders:
-    st.info("ยังไม่มีข้อมูลการสั่งซื้อเพื่อนำมาวิเคราะห์")
-else:
-    orders_df = pd.DataFrame(orders)
-    orders_df['order_date'] = pd.to_datetime(orders_df['order_date'])
-    
-    st.sidebar.header("ตัวกรองข้อมูล")
-    today = datetime.now().date()
-    start_date = st.sidebar.date_input('วันที่เริ่มต้น', today - timedelta(days=7))
-    end_date = st.sidebar.date_input('วันที่สิ้นสุด', today)
+def live_caption(orders_snapshot):
+    updated = datetime.fromtimestamp(orders_snapshot.refreshed_at).strftime('%H:%M:%S')
+    if snapshots.live:
+        st.caption(f"🟢 อัปเดตสดจาก feed ออเดอร์ · ล่าสุด #{orders_snapshot.high_water_mark} เมื่อ {updated}")
+    else:
+        st.caption(f"🟡 ดึงออเดอร์ใหม่ทุก {snapshots.orders_interval:.0f} วินาที · ล่าสุด #{orders_snapshot.high_water_mark} เมื่อ {updated}")
 
-    mask = (orders_df['order_date'].dt.date >= start_date) & (orders_df['order_date'].dt.date <= end_date)
-    filtered_orders_df = orders_df.loc[mask]
+def get_all_products():
+    try:
+        return catalog.get_products()
+    except api_client.ApiError: st.error("ไม่สามารถดึงข้อมูลสินค้าได้"); return []
 
-    if filtered_orders_df.empty:
+@st.fragment(run_every=LIVE_REFRESH)
+def live_sales_summary(start_date, end_date):
+    orders_snapshot = snapshots.orders()
+    products = get_all_products()
+    live_caption(orders_snapshot)
+    summary = get_summary(orders_snapshot, start_date, end_date, products)
+    if summary.total_orders == 0:
         st.warning("ไม่พบข้อมูลในช่วงวันที่ที่เลือก")
     else:
-        total_revenue = filtered_orders_df['total_amount'].sum()
-        total_orders = len(filtered_orders_df)
+        total_revenue = summary.total_revenue
+        total_orders = summary.total_orders
         avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
 
         kpi1, kpi2, kpi3 = st.columns(3)
@@ -54,47 +67,47 @@ else:
 
         st.divider()
         
-        daily_sales = filtered_orders_df.set_index('order_date').resample('D')['total_amount'].sum().reset_index()
-        daily_sales.rename(columns={'order_date': 'วันที่', 'total_amount': 'ยอดขาย'}, inplace=True)
+        daily_sales = summary.daily_sales.rename(columns={'order_date': 'วันที่', 'total_amount': 'ยอดขาย'})
 
-        # --- ส่วน Logic ที่แก้ไขเพื่อรองรับข้อมูลเก่า ---
-        all_items_df = filtered_orders_df.explode('items')
-        items_detail_df = pd.json_normalize(all_items_df['items'].apply(lambda x: x if isinstance(x, dict) else {}))
-
-        # ตรวจสอบและสร้างคอลัมน์ 'item_total' ถ้ายังไม่มี
-        if 'item_total' not in items_detail_df.columns:
-            items_detail_df['item_total'] = 0
-        items_detail_df['item_total'].fillna(0, inplace=True)
-        # --------------------------------------------
-
-        top_products = items_detail_df.groupby('product_name')['quantity'].sum().sort_values(ascending=False).reset_index()
-        top_products.rename(columns={'product_name': 'สินค้า', 'quantity': 'จำนวนที่ขายได้'}, inplace=True)
+        top_products = summary.top_products.rename(columns={'product_name': 'สินค้า', 'quantity': 'จำนวนที่ขายได้'})
         
-        col1, col2 = st.columns(2)
-        with col1:
-            st.subheader("📈 ยอดขายรายวัน")
-            st.bar_chart(daily_sales, x='วันที่', y='ยอดขาย', use_container_width=True)
+        with perf_spans.span("dashboard.charts"):
+            col1, col2 = st.columns(2)
+            with col1:
+                st.subheader("📈 ยอดขายรายวัน")
+                st.bar_chart(daily_sales, x='วันที่', y='ยอดขาย', use_container_width=True)
             
-            st.subheader("🍰 ยอดขายตามหมวดหมู่")
-            if products and not items_detail_df.empty:
-                products_df = pd.DataFrame(products)
-                product_category_map = products_df.set_index('id')['category'].to_dict()
-                items_detail_df['category'] = items_detail_df['product_id'].apply(lambda x: product_category_map.get(x))
-                category_sales_df = items_detail_df.dropna(subset=['category'])
-                
-                if not category_sales_df.empty:
-                    category_sales = category_sales_df.groupby('category')['item_total'].sum().reset_index()
-                    category_sales.rename(columns={'category': 'หมวดหมู่', 'item_total': 'ยอดขาย'}, inplace=True)
-                    fig = px.pie(category_sales, names='หมวดหมู่', values='ยอดขาย', hole=.3)
-                    fig.update_traces(textposition='inside', textinfo='percent+label')
-                    st.plotly_chart(fig, use_container_width=True)
+                st.subheader("🍰 ยอดขายตามหมวดหมู่")
+                if products:
+                    if not summary.category_sales.empty:
+                        category_sales = summary.category_sales.rename(columns={'category': 'หมวดหมู่', 'item_total': 'ยอดขาย'})
+                        fig = px.pie(category_sales, names='หมวดหมู่', values='ยอดขาย', hole=.3)
+                        fig.update_traces(textposition='inside', textinfo='percent+label')
+                        st.plotly_chart(fig, use_container_width=True)
+                    else:
+                        st.info("ไม่พบข้อมูลยอดขายตามหมวดหมู่ในช่วงเวลานี้")
                 else:
-                    st.info("ไม่พบข้อมูลยอดขายตามหมวดหมู่ในช่วงเวลานี้")
-            else:
-                 st.info("ไม่สามารถแสดงยอดขายตามหมวดหมู่ได้")
-
-        with col2:
-            st.subheader("⭐ 5 อันดับสินค้าขายดี")
-            st.dataframe(top_products.head(5), use_container_width=True, hide_index=True)
-            st.subheader("📋 รายละเอียดสินค้าขายดีทั้งหมด")
-            st.dataframe(top_products, use_container_width=True, hide_index=True)
\ No newline at end of file
+                     st.info("ไม่สามารถแสดงยอดขายตามหมวดหมู่ได้")
+
+            with col2:
+                st.subheader("⭐ 5 อันดับสินค้าขายดี")
+                st.dataframe(top_products.head(5), use_container_width=True, hide_index=True)
+                st.subheader("📋 รายละเอียดสินค้าขายดีทั้งหมด")
+                st.dataframe(top_products, use_container_width=True, hide_index=True)
+
+st.set_page_config(layout="wide", page_title="Dashboard")
+st.title("📊 Dashboard สรุปยอดขาย")
+
+orders_snapshot = get_orders_snapshot()
+
+if orders_snapshot is None:
+    st.info("กำลังโหลดข้อมูลออเดอร์ครั้งแรก กรุณารอสักครู่แล้วรีเฟรช")
+elif orders_snapshot.high_water_mark == 0:
+    st.info("ยังไม่มีข้อมูลการสั่งซื้อเพื่อนำมาวิเคราะห์")
+else:
+    st.sidebar.header("ตัวกรองข้อมูล")
+    today = datetime.now().date()
+    start_date = st.sidebar.date_input('วันที่เริ่มต้น', today - timedelta(days=7))
+    end_date = st.sidebar.date_input('วันที่สิ้นสุด', today)
+
+    live_sales_summary(start_date, end_date)
@@ -1,65 +1,178 @@
 # pages/2_🧾_Order_History.py (Patched for backward compatibility)
 
 import streamlit as st
-import requests
-from datetime import datetime
+import os
+from datetime import date, datetime
 
-API_BASE_URL = "http://localhost:8000"
+import api_client
+import export_files
+import order_export
+import perf_spans
+from catalog_cache import catalog
+from line_items import item_unit_price
+from order_store import query_orders_page
+from snapshot_store import snapshots
 
-def get_all_orders():
+PAGE_SIZE_OPTIONS = [10, 25, 50, 100]
+EXPORT_MONTHS = 24
+EXPORT_KINDS = {"line_items": "รายการสินค้า", "orders": "ออเดอร์"}
+# รายการออเดอร์เช็ก snapshot ใหม่ทุกกี่วินาที (rerun เฉพาะรายการ ไม่ใช่ทั้งหน้า)
+LIVE_REFRESH = 2
+
+def get_orders_page(orders_snapshot, page_size, cursor, filters):
+    # อ่านจาก snapshot ออเดอร์ที่ทุก session ใช้ร่วมกัน ถาม backend เฉพาะตอนที่ snapshot ยังโหลดไม่เสร็จ
+    if orders_snapshot is not None:
+        with perf_spans.span("history.query"):
+            return query_orders_page(orders_snapshot.table, limit=page_size, cursor=cursor, **filters)
     try:
-        response = requests.get(f"{API_BASE_URL}/orders")
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        st.error(f"ไม่สามารถดึงข้อมูลออเดอร์ได้: {e}")
-        return []
+        return api_client.fetch_orders_page(limit=page_size, cursor=cursor, **filters)
+    except api_client.ApiError as e:
+        st.error(f"ไม่สามารถดึงข้อมูลออเดอร์ได้: {e.detail}")
+        return api_client.OrdersPage([], None)
+
+def reset_paging():
+    st.session_state.history_cursors = [None]
+    st.session_state.history_expanded = None
+    st.session_state.pop('history_page', None)
+
+def toggle_details(order_id):
+    st.session_state.history_expanded = None if st.session_state.history_expanded == order_id else order_id
+
+def go_next(next_cursor):
+    st.session_state.history_cursors.append(next_cursor)
+    st.session_state.history_expanded = None
+
+def go_prev():
+    if len(st.session_state.history_cursors) > 1:
+        st.session_state.history_cursors.pop()
+    st.session_state.history_expanded = None
+
+def render_order_items(order):
+    st.write(f"**สถานะ:** {order.get('status', 'N/A')}")
+    st.markdown("---")
+    st.write("**รายการสินค้า:**")
+
+    cols = st.columns([3, 1, 1, 2])
+    cols[0].write("**ชื่อสินค้า**")
+    cols[1].write("**จำนวน**")
+    cols[2].write("**ราคา/หน่วย**")
+    cols[3].write("**ตัวเลือก**")
+
+    for item in order['items']:
+        item_cols = st.columns([3, 1, 1, 2])
+        item_cols[0].write(f" ▸ {item.get('product_name', 'N/A')}")
+        item_cols[1].text(item.get('quantity', 0))
+        item_cols[2].text(f"{item_unit_price(item):.2f}")
+        selected_options = item.get('selected_options', [])
+        options_str = ", ".join([opt['name'] for opt in selected_options]) if selected_options else "ไม่มี"
+        item_cols[3].text(options_str)
+
+def prepare_export(month, kind, fmt):
+    # เขียนลงไฟล์ชั่วคราวทีละก้อนจาก snapshot (หรือจาก API ถ้ายังไม่มี) ไม่ได้สร้างไฟล์ทั้งไฟล์ในหน่วยความจำ
+    # ไฟล์ของ session ที่ปิดไปแล้วถูกลบโดย export_files.sweep
+    previous = st.session_state.pop('history_export', None)
+    if previous: export_files.remove(previous[0])
+    start_date, end_date = order_export.month_range(*month)
+    orders_snapshot = snapshots.orders()
+    if orders_snapshot is not None:
+        chunks = order_export.iter_snapshot_orders(orders_snapshot.table, start_date, end_date)
+    else:
+        chunks = order_export.iter_api_orders(start_date, end_date)
+    try:
+        products = catalog.get_products() if kind == "line_items" else None
+    except api_client.ApiError:
+        products = None
+    path = export_files.new_path(f"pos_{kind}_", f".{fmt}")
+    try:
+        with open(path, "wb") as f:
+            order_export.write_export(f, chunks, kind, fmt, products)
+    except api_client.ApiError as e:
+        export_files.remove(path)
+        st.error(f"ส่งออกไม่สำเร็จ: {e.detail}")
+        return
+    st.session_state.history_export = (path, f"{kind}-{start_date:%Y-%m}.{fmt}", fmt)
+
+@st.fragment
+def export_panel():
+    with st.expander("📤 ส่งออกรายเดือน (CSV / Parquet)"):
+        today = date.today()
+        months = [((today.year * 12 + today.month - 1 - i) // 12, (today.year * 12 + today.month - 1 - i) % 12 + 1) for i in range(EXPORT_MONTHS)]
+        export_cols = st.columns([1, 1, 1, 1])
+        month = export_cols[0].selectbox("เดือน", months, index=1, format_func=lambda m: f"{m[0]}-{m[1]:02d}", key="export_month")
+        kind = export_cols[1].radio("ข้อมูล", list(EXPORT_KINDS), format_func=EXPORT_KINDS.get, key="export_kind")
+        fmt = export_cols[2].radio("รูปแบบ", list(order_export.FORMATS), format_func=str.upper, key="export_format")
+        if export_cols[3].button("เตรียมไฟล์", use_container_width=True):
+            with st.spinner("กำลังเขียนไฟล์..."):
+                prepare_export(month, kind, fmt)
+        export_files.sweep()
+        export = st.session_state.get('history_export')
+        if export and os.path.exists(export[0]):
+            with open(export[0], "rb") as f:
+                st.download_button(f"⬇️ ดาวน์โหลด {export[1]} ({os.path.getsize(export[0]) / 1e6:.1f} MB)", f, file_name=export[1], mime=order_export.FORMATS[export[2]])
+
+@st.fragment(run_every=LIVE_REFRESH)
+def order_list(filters, page_size):
+    orders_snapshot = snapshots.orders()
+    # cursor ของ backend กับของ snapshot ไม่ใช่แบบเดียวกัน ถ้าแหล่งข้อมูลเปลี่ยนต้องเริ่มหน้าแรกใหม่
+    history_source = "snapshot" if orders_snapshot is not None else "api"
+    if st.session_state.get('history_source') != history_source:
+        st.session_state.history_source = history_source
+        reset_paging()
+    cursor = st.session_state.history_cursors[-1]
+
+    # เก็บหน้าปัจจุบันไว้ จะได้ไม่ต้องค้นใหม่ทุกครั้งที่กดดูรายละเอียด หน้าแรกค้นใหม่เมื่อ snapshot มีออเดอร์ใหม่
+    # ส่วนหน้าถัดไปใช้ cursor แบบ keyset ออเดอร์ใหม่ไม่ทำให้เนื้อหาเปลี่ยน จึงไม่ต้องค้นใหม่
+    live_version = orders_snapshot.version if orders_snapshot is not None and cursor is None else None
+    page_key = (history_source, cursor, page_size, tuple(sorted(filters.items())), live_version)
+    cached_page = st.session_state.get('history_page')
+    if st.button("🔄 รีเฟรช") or cached_page is None or cached_page[0] != page_key:
+        cached_page = (page_key, get_orders_page(orders_snapshot, page_size, cursor, filters))
+        st.session_state.history_page = cached_page
+    orders, next_cursor = cached_page[1]
+
+    if live_version is not None and snapshots.live:
+        st.caption("🟢 ออเดอร์ใหม่จะแสดงที่หน้าแรกอัตโนมัติ")
+    if not orders:
+        st.info("ยังไม่มีข้อมูลการสั่งซื้อในระบบ" if cursor is None and not any(filters.values()) else "ไม่พบออเดอร์ตามเงื่อนไขที่เลือก")
+    else:
+        with perf_spans.span("history.render"):
+            for order in orders:
+                order_date = datetime.fromisoformat(order['order_date']).strftime('%d %b %Y, %H:%M:%S')
+                is_expanded = st.session_state.history_expanded == order['id']
+                with st.container(border=True):
+                    row_cols = st.columns([6, 1])
+                    row_cols[0].markdown(f"**Order ID:** `{order['id']}` | **วันที่:** {order_date} | **ยอดรวม:** {order['total_amount']:.2f} บาท")
+                    row_cols[1].button("▲ ซ่อน" if is_expanded else "▼ รายละเอียด", key=f"toggle_{order['id']}", on_click=toggle_details, args=(order['id'],), use_container_width=True)
+                    # สร้าง widget ของรายการสินค้าเฉพาะออเดอร์ที่เปิดดูอยู่
+                    if is_expanded:
+                        render_order_items(order)
+
+    nav_cols = st.columns([1, 1, 4])
+    nav_cols[0].button("◀ ก่อนหน้า", disabled=len(st.session_state.history_cursors) <= 1, on_click=go_prev, use_container_width=True)
+    nav_cols[1].button("ถัดไป ▶", disabled=next_cursor is None, on_click=go_next, args=(next_cursor,), use_container_width=True)
+    nav_cols[2].caption(f"หน้า {len(st.session_state.history_cursors)}")
 
 st.set_page_config(layout="wide", page_title="ประวัติการสั่งซื้อ")
 st.title("🧾 ประวัติการสั่งซื้อย้อนหลัง")
 
-orders = get_all_orders()
-
-if not orders:
-    st.info("ยังไม่มีข้อมูลการสั่งซื้อในระบบ")
-else:
-    for order in orders:
-        order_date = datetime.fromisoformat(order['order_date']).strftime('%d %b %Y, %H:%M:%S')
-        with st.expander(f"**Order ID:** `{order['id']}` | **วันที่:** {order_date} | **ยอดรวม:** {order['total_amount']:.2f} บาท"):
-            st.write(f"**สถานะ:** {order.get('status', 'N/A')}")
-            st.markdown("---")
-            st.write("**รายการสินค้า:**")
-            
-            cols = st.columns([3, 1, 1, 2])
-            cols[0].write("**ชื่อสินค้า**")
-            cols[1].write("**จำนวน**")
-            cols[2].write("**ราคา/หน่วย**")
-            cols[3].write("**ตัวเลือก**")
-            
-            for item in order['items']:
-                item_cols = st.columns([3, 1, 1, 2])
-                item_cols[0].write(f" ▸ {item.get('product_name', 'N/A')}")
-                item_cols[1].text(item.get('quantity', 0))
-
-                # --- ส่วน Logic ที่แก้ไขเพื่อรองรับข้อมูลเก่าและใหม่ ---
-                price_to_display = item.get('price_per_unit')
-                
-                if price_to_display is None:
-                    # ลองหา key เก่า (ถ้าเคยมี)
-                    price_to_display = item.get('price_per_item')
-
-                if price_to_display is None:
-                    # ถ้าไม่มีจริงๆ ให้คำนวณจากยอดรวมของรายการ
-                    item_total = item.get('item_total', 0)
-                    quantity = item.get('quantity', 1)
-                    if quantity > 0:
-                        price_to_display = item_total / quantity
-                    else:
-                        price_to_display = 0
-
-                item_cols[2].text(f"{price_to_display:.2f}")
-                # ----------------------------------------------------
-                
-                selected_options = item.get('selected_options', [])
-                options_str = ", ".join([opt['name'] for opt in selected_options]) if selected_options else "ไม่มี"
-                item_cols[3].text(options_str)
\ No newline at end of file
+if 'history_cursors' not in st.session_state:
+    reset_paging()
+
+# ตัวกรองใช้กับตาราง snapshot ออเดอร์ในหน่วยความจำผ่าน query_orders_page (ไม่ได้วนกรองทีละออเดอร์ใน Python)
+# ก่อน snapshot แรกโหลดเสร็จ ตัวกรองเดียวกันจะส่งไปให้ backend กรองผ่าน fetch_orders_page แทน
+with st.container(border=True):
+    filter_cols = st.columns([2, 1, 2, 1])
+    date_range = filter_cols[0].date_input("ช่วงวันที่", value=(), key="history_dates", on_change=reset_paging)
+    order_id = filter_cols[1].text_input("Order ID", key="history_order_id", on_change=reset_paging)
+    product = filter_cols[2].text_input("ค้นหาชื่อสินค้า", key="history_product", on_change=reset_paging)
+    page_size = filter_cols[3].selectbox("ต่อหน้า", PAGE_SIZE_OPTIONS, index=1, key="history_page_size", on_change=reset_paging)
+
+export_panel()
+
+filters = {
+    "start_date": date_range[0].isoformat() if len(date_range) > 0 else None,
+    "end_date": date_range[1].isoformat() if len(date_range) > 1 else None,
+    "order_id": order_id.strip() or None,
+    "product": product.strip() or None,
+}
+order_list(filters, page_size)
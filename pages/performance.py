@@ -0,0 +1,47 @@
+# pages/performance.py - สรุปเวลาของแต่ละส่วนในการ rerun (จาก perf_spans)
+
+import streamlit as st
+import pandas as pd
+import time
+
+import perf_spans
+
+WINDOWS = {"ทั้งหมดใน buffer": None, "5 นาทีล่าสุด": 5 * 60, "1 ชั่วโมงล่าสุด": 60 * 60}
+
+st.set_page_config(layout="wide", page_title="ประสิทธิภาพ")
+st.title("⏱️ ประสิทธิภาพของระบบ")
+
+enabled = st.toggle("เปิดการจับเวลา (ทั้ง process)", value=perf_spans.is_enabled(), help="ตอนปิดแทบไม่มี overhead เริ่มต้นเปิดได้ด้วย POS_PERF_SPANS=1")
+if enabled != perf_spans.is_enabled():
+    perf_spans.set_enabled(enabled)
+
+control_cols = st.columns([2, 1, 1])
+window = control_cols[0].selectbox("ช่วงเวลา", list(WINDOWS))
+if control_cols[1].button("🔄 รีเฟรช", use_container_width=True):
+    st.rerun()
+if control_cols[2].button("🗑️ ล้างข้อมูล", use_container_width=True):
+    perf_spans.clear()
+
+since = time.time() - WINDOWS[window] if WINDOWS[window] else None
+stats = perf_spans.summary(since=since)
+
+if not stats:
+    st.info("ยังไม่มีข้อมูล เปิดการจับเวลาแล้วใช้งานหน้าอื่นสักพัก" if perf_spans.is_enabled() else "การจับเวลาปิดอยู่")
+else:
+    stats_df = pd.DataFrame(stats, columns=perf_spans.SpanStats._fields).rename(columns={
+        "name": "span", "count": "จำนวนครั้ง", "p50_ms": "p50 (ms)", "p95_ms": "p95 (ms)",
+        "p99_ms": "p99 (ms)", "max_ms": "สูงสุด (ms)", "total_ms": "รวม (ms)",
+    })
+    st.caption(f"เก็บล่าสุดไม่เกิน {perf_spans.RING_SIZE:,} ครั้ง เรียงตามเวลารวม")
+    st.dataframe(stats_df, use_container_width=True, hide_index=True, column_config={
+        c: st.column_config.NumberColumn(format="%.1f") for c in ["p50 (ms)", "p95 (ms)", "p99 (ms)", "สูงสุด (ms)", "รวม (ms)"]
+    })
+    st.subheader("p95 ต่อ span")
+    st.bar_chart(stats_df.set_index("span")["p95 (ms)"], horizontal=True)
+
+with st.expander("ส่งออกแบบ Prometheus"):
+    if perf_spans.PROMETHEUS_FILE:
+        st.caption(f"เขียนไฟล์ {perf_spans.PROMETHEUS_FILE} ทุก {perf_spans.PROMETHEUS_INTERVAL:.0f} วินาทีขณะเปิดการจับเวลา")
+    else:
+        st.caption("ตั้ง POS_PERF_PROMETHEUS_FILE เพื่อให้เขียนไฟล์ให้อัตโนมัติ (textfile collector ของ node_exporter)")
+    st.download_button("⬇️ ดาวน์โหลด metrics.prom", perf_spans.prometheus_text(), file_name="pos_metrics.prom", mime="text/plain")
@@ -1,46 +1,126 @@
 import streamlit as st
-import requests
+import pandas as pd
+import copy
+import os
 
-API_BASE_URL = "http://localhost:8000"
+import api_client
+import catalog_bulk
+import export_files
+import perf_spans
+from api_client import API_BASE_URL
+from catalog_cache import catalog
+from image_cache import images as product_images
+from snapshot_store import snapshots
+
+def editable_options(product):
+    # คัดลอก options ของสินค้าเข้า session เฉพาะตอนเริ่มแก้ไข ก่อนหน้านั้นแสดงจาก catalog ที่แชร์กันตรงๆ
+    key = f"options_{product['id']}"
+    if key not in st.session_state:
+        st.session_state[key] = copy.deepcopy(product.get('options', []))
+    return st.session_state[key]
 
 def get_products():
     try:
-        response = requests.get(f"{API_BASE_URL}/products")
-        response.raise_for_status()
-        return response.json()
-    except: return None
+        return catalog.get_products()
+    except api_client.ApiError: return None
 
 def create_product(name, price, category):
     try:
-        response = requests.post(f"{API_BASE_URL}/products", json={"name": name, "price": price, "category": category})
-        response.raise_for_status()
+        api_client.create_product(name, price, category)
+        catalog.invalidate()
         st.success(f"เพิ่มสินค้า '{name}' สำเร็จ!")
         return True
-    except Exception as e: return False
+    except api_client.ApiError as e:
+        st.error(f"เพิ่มสินค้าไม่สำเร็จ: {e.detail}")
+        return False
 
 def delete_product(product_id):
     try:
-        response = requests.delete(f"{API_BASE_URL}/products/{product_id}")
-        response.raise_for_status()
+        api_client.delete_product(product_id)
+        catalog.invalidate()
         st.success("ลบสินค้าสำเร็จ!")
         return True
-    except: return False
+    except api_client.ApiError as e:
+        st.error(f"ลบสินค้าไม่สำเร็จ: {e.detail}")
+        return False
 
 def upload_image(product_id, image_file):
     try:
-        response = requests.post(f"{API_BASE_URL}/products/{product_id}/upload-image", files={'file': image_file})
-        response.raise_for_status()
+        api_client.upload_product_image(product_id, image_file)
+        catalog.invalidate()
+        product_images.invalidate_product(product_id)
         st.success("อัปโหลดรูปภาพสำเร็จ!")
         return True
-    except: return False
+    except api_client.ApiError as e:
+        st.error(f"อัปโหลดรูปภาพไม่สำเร็จ: {e.detail}")
+        return False
 
 def update_product_options(product_id, options):
     try:
-        response = requests.put(f"{API_BASE_URL}/products/{product_id}", json={"options": options})
-        response.raise_for_status()
+        api_client.update_product(product_id, {"options": options})
+        catalog.invalidate()
         st.success("บันทึก Options สำเร็จ!")
         return True
-    except: return False
+    except api_client.ApiError as e:
+        st.error(f"บันทึก Options ไม่สำเร็จ: {e.detail}")
+        return False
+
+ACTION_LABELS = {catalog_bulk.CREATE: "เพิ่มใหม่", catalog_bulk.UPDATE: "แก้ไข", catalog_bulk.DELETE: "ลบ", catalog_bulk.UNCHANGED: "ไม่เปลี่ยน"}
+
+def bulk_plan(uploaded_file, delete_missing):
+    # อ่านไฟล์และเทียบกับ catalog ครั้งเดียวต่อไฟล์/ตัวเลือก ไม่ใช่ทุก rerun
+    plan_key = (uploaded_file.file_id, delete_missing, catalog.version)
+    cached = st.session_state.get("bulk_plan")
+    if cached and cached[0] == plan_key:
+        return cached[1]
+    try:
+        rows, issues = catalog_bulk.read_import(uploaded_file.name, uploaded_file.getvalue())
+        changes, plan_issues = catalog_bulk.plan(rows, catalog.get_products(), delete_missing=delete_missing, read_issues=issues)
+        result = (changes, sorted(issues + plan_issues), None)
+    except (ValueError, api_client.ApiError) as e:
+        result = ([], [], getattr(e, "detail", str(e)))
+    st.session_state["bulk_plan"] = (plan_key, result)
+    return result
+
+def show_bulk_results(job):
+    done = job.summary()
+    st.progress(job.completed / max(len(job.changes), 1), text=f"ทำแล้ว {job.completed}/{len(job.changes)} รายการ · สำเร็จ {done.get(catalog_bulk.DONE, 0)} · ผิดพลาด {done.get(catalog_bulk.ERROR, 0)}")
+    results = [r for r in job.results if r is not None]
+    if results:
+        st.dataframe(pd.DataFrame([{
+            "แถว": r.row or "-", "การเปลี่ยนแปลง": ACTION_LABELS[r.action], "สินค้า": r.name,
+            "ผล": "✅" if r.status == catalog_bulk.DONE else "❌", "รายละเอียด": r.message,
+        } for r in sorted(results, key=lambda r: r.status != catalog_bulk.ERROR)]), hide_index=True, use_container_width=True)
+
+@st.fragment(run_every=1)
+def bulk_progress(job):
+    # rerun เฉพาะส่วนนี้ทุกวินาทีระหว่างนำเข้า พอเสร็จค่อย rerun ทั้งหน้าเพื่อโหลดรายการสินค้าใหม่
+    if job.finished.is_set():
+        st.rerun()
+    show_bulk_results(job)
+    if st.button("⏹️ ยกเลิกรายการที่ยังไม่เริ่ม", key="bulk_cancel"):
+        job.cancel()
+
+def prepare_export(fmt):
+    # เขียนไฟล์เฉพาะตอนกดเตรียม ไม่ได้สร้างใหม่ทุก rerun ไฟล์ของ session ที่ปิดไปแล้วถูกลบโดย export_files.sweep
+    previous = st.session_state.pop("bulk_export", None)
+    if previous: export_files.remove(previous[0])
+    path = export_files.new_path("pos_catalog_", f".{fmt}")
+    try:
+        if fmt == "csv":
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                f.writelines(catalog_bulk.iter_csv(catalog_bulk.export_record(p) for p in catalog.get_products()))
+            issues = []
+        else:
+            with open(path, "wb") as f:
+                issues = catalog_bulk.write_export(f, catalog.get_products(), include_images=True)
+    except api_client.ApiError as e:
+        export_files.remove(path)
+        st.error(f"ส่งออกไม่สำเร็จ: {e.detail}")
+        return
+    st.session_state["bulk_export"] = (path, issues)
+
+snapshots.ensure_worker()
 
 st.set_page_config(layout="wide", page_title="จัดการสินค้า")
 st.title("📦 ระบบจัดการสินค้า (Admin Panel)")
@@ -55,63 +135,117 @@ with st.form("new_product_form", clear_on_submit=True):
         if new_name and new_category:
             create_product(new_name, new_price, new_category)
 
+with st.expander("📥 นำเข้า / ส่งออกสินค้าทีละมากๆ"):
+    st.caption("ไฟล์ CSV/JSON หรือ ZIP ที่มี products.csv หรือ products.json พร้อมรูป (คอลัมน์ "
+               f"{', '.join(catalog_bulk.CSV_COLUMNS)}; options เป็น JSON) ระบบจะทำเฉพาะรายการที่ต่างจากข้อมูลปัจจุบัน")
+    job = st.session_state.get("bulk_job")
+    if job is not None and not job.finished.is_set():
+        bulk_progress(job)
+    else:
+        if job is not None:
+            show_bulk_results(job)
+            if st.button("ปิดผลการนำเข้า", key="bulk_dismiss"):
+                st.session_state.pop("bulk_job"); st.rerun()
+        bulk_file = st.file_uploader("ไฟล์นำเข้า", type=["csv", "json", "zip"], key="bulk_file")
+        delete_missing = st.checkbox("ลบสินค้าที่ไม่มีในไฟล์", key="bulk_delete_missing")
+        if bulk_file:
+            changes, issues, error = bulk_plan(bulk_file, delete_missing)
+            if error:
+                st.error(f"อ่านไฟล์ไม่ได้: {error}")
+            pending = [c for c in changes if c.action != catalog_bulk.UNCHANGED]
+            metric_cols = st.columns(5)
+            for col, action in zip(metric_cols, ACTION_LABELS):
+                col.metric(ACTION_LABELS[action], sum(c.action == action for c in changes))
+            metric_cols[4].metric("แถวที่มีปัญหา", len(issues))
+            if issues:
+                st.dataframe(pd.DataFrame(issues, columns=["แถว", "ปัญหา"]), hide_index=True, use_container_width=True)
+            if pending:
+                st.dataframe(pd.DataFrame([{
+                    "แถว": c.row or "-", "การเปลี่ยนแปลง": ACTION_LABELS[c.action], "สินค้า": c.name,
+                    "ฟิลด์": ", ".join(c.fields) or ("(เทียบรูป)" if c.image_name else ""), "รูป": c.image_name or "",
+                } for c in pending]), hide_index=True, use_container_width=True)
+                if st.button(f"🚀 นำเข้า {len(pending)} รายการ", type="primary", key="bulk_apply"):
+                    st.session_state.pop("bulk_plan", None)
+                    st.session_state["bulk_job"] = catalog_bulk.BulkJob(pending).start(); st.rerun()
+            elif not error:
+                st.info("ไม่มีอะไรต้องเปลี่ยน")
+
+    st.markdown("---")
+    export_cols = st.columns(3)
+    if export_cols[0].button("📄 เตรียมไฟล์ CSV (ไม่รวมรูป)", use_container_width=True):
+        with perf_spans.span("products.export_csv"):
+            prepare_export("csv")
+    if export_cols[1].button("📦 เตรียมไฟล์สำรอง ZIP พร้อมรูป", use_container_width=True):
+        with st.spinner("กำลังดาวน์โหลดรูปและเขียนไฟล์..."):
+            prepare_export("zip")
+    export_files.sweep()
+    export = st.session_state.get("bulk_export")
+    if export and os.path.exists(export[0]):
+        is_csv = export[0].endswith(".csv")
+        with open(export[0], "rb") as f:
+            export_cols[2].download_button("⬇️ ดาวน์โหลด CSV" if is_csv else "⬇️ ดาวน์โหลด ZIP", f,
+                                           file_name="products.csv" if is_csv else "catalog_backup.zip",
+                                           mime="text/csv" if is_csv else "application/zip", use_container_width=True)
+        for issue in export[1]:
+            st.warning(f"สินค้าลำดับ {issue.row}: {issue.message}")
+
 st.divider()
 st.subheader("รายการสินค้าทั้งหมดในระบบ")
-products = get_products()
+with perf_spans.span("products.load"):
+    products = get_products()
 
 if products:
-    for product in products:
-        product_id = product['id']
-        with st.container(border=True):
-            col_info, col_manage = st.columns([3, 1])
-            with col_info:
-                st.subheader(f"{product['name']} ({product['category']}) - {product['price']:.2f} ฿")
-                if product.get('image_url'): st.image(API_BASE_URL + product['image_url'], width=150)
-                st.write("**Options ปัจจุบัน:**")
-                if product.get('options'):
-                    for opt_group in product['options']:
-                        choices_str = ", ".join([f"{c['name']} (+{c['price']:.2f}฿)" for c in opt_group['choices']])
-                        st.text(f"  - {opt_group['name']}: {choices_str}")
-                else: st.caption("ไม่มี")
-            with col_manage:
-                if st.button("🗑️ ลบสินค้านี้", key=f"delete_{product_id}", use_container_width=True):
-                    if delete_product(product_id): st.rerun()
-                with st.popover("📷 อัปโหลดรูป", use_container_width=True):
-                    uploaded_file = st.file_uploader("เลือกรูปภาพ", type=["png", "jpg"], key=f"upload_{product_id}")
-                    if uploaded_file and upload_image(product_id, uploaded_file): st.rerun()
-
-            with st.expander("จัดการ Options"):
-                if f"options_{product_id}" not in st.session_state:
-                    st.session_state[f"options_{product_id}"] = product.get('options', [])
-                options_in_state = st.session_state[f"options_{product_id}"]
-                for i, opt_group in enumerate(options_in_state):
-                    group_cols = st.columns([3, 1])
-                    group_cols[0].write(f"**กลุ่ม: {opt_group['name']}**")
-                    if group_cols[1].button("❌ ลบกลุ่มนี้", key=f"del_group_{product_id}_{i}"):
-                        options_in_state.pop(i); st.rerun()
-                    for j, choice in enumerate(opt_group['choices']):
-                        choice_cols = st.columns([1, 2, 2, 1])
-                        choice_cols[1].write(f"  - ตัวเลือก: {choice['name']}")
-                        choice_cols[2].write(f"  - ราคาบวกเพิ่ม: {choice['price']:.2f}")
-                        if choice_cols[3].button("ลบ", key=f"del_choice_{product_id}_{i}_{j}"):
-                            opt_group['choices'].pop(j); st.rerun()
-                st.markdown("---")
-                st.write("**เพิ่มกลุ่ม Option ใหม่**")
-                group_form_cols = st.columns([2, 1])
-                new_group_name = group_form_cols[0].text_input("ชื่อกลุ่ม", key=f"new_group_{product_id}")
-                if group_form_cols[1].button("➕ เพิ่มกลุ่ม", key=f"add_group_{product_id}"):
-                    if new_group_name:
-                        options_in_state.append({"name": new_group_name, "choices": []}); st.rerun()
-                for i, opt_group in enumerate(options_in_state):
-                    with st.container(border=True):
-                        st.write(f"**เพิ่มตัวเลือกในกลุ่ม '{opt_group['name']}'**")
-                        choice_form_cols = st.columns([2, 1, 1])
-                        new_choice_name = choice_form_cols[0].text_input("ชื่อตัวเลือก", key=f"new_choice_name_{product_id}_{i}")
-                        new_choice_price = choice_form_cols[1].number_input("ราคาบวกเพิ่ม", min_value=0.0, format="%.2f", key=f"new_choice_price_{product_id}_{i}")
-                        if choice_form_cols[2].button("➕ เพิ่มตัวเลือก", key=f"add_choice_{product_id}_{i}"):
-                            if new_choice_name:
-                                opt_group['choices'].append({"name": new_choice_name, "price": new_choice_price}); st.rerun()
-                st.markdown("---")
-                if st.button("💾 บันทึกการเปลี่ยนแปลง Options ทั้งหมด", key=f"save_{product_id}", type="primary"):
-                    if update_product_options(product_id, options_in_state):
-                        del st.session_state[f"options_{product_id}"]; st.rerun()
\ No newline at end of file
+    with perf_spans.span("products.render"):
+        for product in products:
+            product_id = product['id']
+            with st.container(border=True):
+                col_info, col_manage = st.columns([3, 1])
+                with col_info:
+                    st.subheader(f"{product['name']} ({product['category']}) - {product['price']:.2f} ฿")
+                    if product.get('image_url'): st.image(product_images.get(product, "admin") or API_BASE_URL + product['image_url'], width=150)
+                    st.write("**Options ปัจจุบัน:**")
+                    if product.get('options'):
+                        for opt_group in product['options']:
+                            choices_str = ", ".join([f"{c['name']} (+{c['price']:.2f}฿)" for c in opt_group['choices']])
+                            st.text(f"  - {opt_group['name']}: {choices_str}")
+                    else: st.caption("ไม่มี")
+                with col_manage:
+                    if st.button("🗑️ ลบสินค้านี้", key=f"delete_{product_id}", use_container_width=True):
+                        if delete_product(product_id): st.rerun()
+                    with st.popover("📷 อัปโหลดรูป", use_container_width=True):
+                        uploaded_file = st.file_uploader("เลือกรูปภาพ", type=["png", "jpg"], key=f"upload_{product_id}")
+                        if uploaded_file and upload_image(product_id, uploaded_file): st.rerun()
+
+                with st.expander("จัดการ Options"):
+                    options_in_state = st.session_state.get(f"options_{product_id}", product.get('options', []))
+                    for i, opt_group in enumerate(options_in_state):
+                        group_cols = st.columns([3, 1])
+                        group_cols[0].write(f"**กลุ่ม: {opt_group['name']}**")
+                        if group_cols[1].button("❌ ลบกลุ่มนี้", key=f"del_group_{product_id}_{i}"):
+                            editable_options(product).pop(i); st.rerun()
+                        for j, choice in enumerate(opt_group['choices']):
+                            choice_cols = st.columns([1, 2, 2, 1])
+                            choice_cols[1].write(f"  - ตัวเลือก: {choice['name']}")
+                            choice_cols[2].write(f"  - ราคาบวกเพิ่ม: {choice['price']:.2f}")
+                            if choice_cols[3].button("ลบ", key=f"del_choice_{product_id}_{i}_{j}"):
+                                editable_options(product)[i]['choices'].pop(j); st.rerun()
+                    st.markdown("---")
+                    st.write("**เพิ่มกลุ่ม Option ใหม่**")
+                    group_form_cols = st.columns([2, 1])
+                    new_group_name = group_form_cols[0].text_input("ชื่อกลุ่ม", key=f"new_group_{product_id}")
+                    if group_form_cols[1].button("➕ เพิ่มกลุ่ม", key=f"add_group_{product_id}"):
+                        if new_group_name:
+                            editable_options(product).append({"name": new_group_name, "choices": []}); st.rerun()
+                    for i, opt_group in enumerate(options_in_state):
+                        with st.container(border=True):
+                            st.write(f"**เพิ่มตัวเลือกในกลุ่ม '{opt_group['name']}'**")
+                            choice_form_cols = st.columns([2, 1, 1])
+                            new_choice_name = choice_form_cols[0].text_input("ชื่อตัวเลือก", key=f"new_choice_name_{product_id}_{i}")
+                            new_choice_price = choice_form_cols[1].number_input("ราคาบวกเพิ่ม", min_value=0.0, format="%.2f", key=f"new_choice_price_{product_id}_{i}")
+                            if choice_form_cols[2].button("➕ เพิ่มตัวเลือก", key=f"add_choice_{product_id}_{i}"):
+                                if new_choice_name:
+                                    editable_options(product)[i]['choices'].append({"name": new_choice_name, "price": new_choice_price}); st.rerun()
+                    st.markdown("---")
+                    if st.button("💾 บันทึกการเปลี่ยนแปลง Options ทั้งหมด", key=f"save_{product_id}", type="primary"):
+                        if update_product_options(product_id, options_in_state):
+                            st.session_state.pop(f"options_{product_id}", None); st.rerun()
\ No newline at end of file
@@ -0,0 +1,178 @@
+"""จับเวลาส่วนสำคัญของแต่ละ rerun (เรียก API, decode JSON, สร้าง widget ฯลฯ) แบบเบาๆ
+
+ใช้ ``with span("pos.menu"):`` รอบโค้ด หรือ ``@timed("api.fetch_products")`` กับฟังก์ชัน
+ผลแต่ละครั้งถูกเก็บใน ring buffer ขนาดจำกัดในหน่วยความจำของ process (ของเก่าหลุดไปเอง)
+หน้า "ประสิทธิภาพ" สรุปเป็น p50/p95/p99 ต่อ span และส่งออกเป็นไฟล์ Prometheus text ได้
+
+ปิดอยู่เป็นค่าเริ่มต้น (เปิดด้วย ``POS_PERF_SPANS=1`` หรือสวิตช์ในหน้า "ประสิทธิภาพ")
+ตอนปิด ``span`` คืน context ตัวเดิมที่ไม่ทำอะไร และ ``timed`` เช็ก flag ตัวเดียวแล้วเรียกฟังก์ชันตรงๆ
+
+ถ้าตั้ง ``POS_PERF_PROMETHEUS_FILE`` จะมี thread เขียนไฟล์นั้นใหม่ทุก ``PROMETHEUS_INTERVAL`` วินาที
+(ใช้กับ textfile collector ของ node_exporter ได้)
+"""
+
+import functools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+RING_SIZE = int(os.environ.get("POS_PERF_RING_SIZE", "20000"))
+PROMETHEUS_FILE = os.environ.get("POS_PERF_PROMETHEUS_FILE")
+PROMETHEUS_INTERVAL = 15.0
+QUANTILES = (0.5, 0.95, 0.99)
+
+_enabled = os.environ.get("POS_PERF_SPANS", "").lower() in ("1", "true", "yes")
+_NOOP = nullcontext()
+# (ชื่อ span, เวลาที่จบตาม time.time(), ระยะเวลาเป็นวินาที) - deque.append ปลอดภัยข้าม thread อยู่แล้ว
+_samples: Deque[Tuple[str, float, float]] = deque(maxlen=RING_SIZE)
+# ยอดสะสมตลอดอายุ process ต่อ span (ไม่หลุดตาม ring buffer) สำหรับ _count/_sum ของ Prometheus
+_totals: Dict[str, List[float]] = {}
+_totals_lock = threading.Lock()
+
+
+class SpanStats(NamedTuple):
+    name: str
+    count: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    total_ms: float
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def set_enabled(enabled: bool) -> None:
+    global _enabled
+    _enabled = enabled
+
+
+def record(name: str, seconds: float) -> None:
+    _samples.append((name, time.time(), seconds))
+    with _totals_lock:
+        totals = _totals.get(name)
+        if totals is None:
+            _totals[name] = [1, seconds]
+        else:
+            totals[0] += 1
+            totals[1] += seconds
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        record(self.name, time.perf_counter() - self.start)
+
+
+def span(name: str) -> Any:
+    """context manager จับเวลาโค้ดในบล็อก (นับทั้งกรณีจบปกติและโยน exception)"""
+    return _Span(name) if _enabled else _NOOP
+
+
+def timed(name: str) -> Callable[[Callable], Callable]:
+    """decorator จับเวลาทุกการเรียกฟังก์ชันเป็น span ชื่อ ``name``"""
+    def decorate(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not _enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def clear() -> None:
+    _samples.clear()
+    with _totals_lock:
+        _totals.clear()
+
+
+def summary(since: Optional[float] = None) -> List[SpanStats]:
+    """สรุป span ใน ring buffer (เฉพาะที่จบหลัง ``since`` ถ้ากำหนด) เรียงตามเวลารวมมากไปน้อย"""
+    durations: Dict[str, List[float]] = {}
+    for name, ended_at, seconds in list(_samples):
+        if since is None or ended_at >= since:
+            durations.setdefault(name, []).append(seconds)
+    stats = []
+    for name, values in durations.items():
+        ms = np.asarray(values) * 1000
+        p50, p95, p99 = np.percentile(ms, [q * 100 for q in QUANTILES])
+        stats.append(SpanStats(name, len(ms), float(p50), float(p95), float(p99), float(ms.max()), float(ms.sum())))
+    stats.sort(key=lambda s: s.total_ms, reverse=True)
+    return stats
+
+
+def prometheus_text() -> str:
+    """span ทั้งหมดในรูปแบบ Prometheus text (summary: quantile จาก ring buffer, _sum/_count สะสม)"""
+    lines = [
+        "# HELP pos_span_duration_seconds Duration of instrumented POS code sections.",
+        "# TYPE pos_span_duration_seconds summary",
+    ]
+    by_name = {s.name: s for s in summary()}
+    with _totals_lock:
+        totals = {name: tuple(values) for name, values in _totals.items()}
+    for name in sorted(totals):
+        label = name.replace("\\", "\\\\").replace('"', '\\"')
+        stats = by_name.get(name)
+        if stats is not None:
+            for q, value in zip(QUANTILES, (stats.p50_ms, stats.p95_ms, stats.p99_ms)):
+                lines.append(f'pos_span_duration_seconds{{span="{label}",quantile="{q}"}} {value / 1000:.6f}')
+        count, total = totals[name]
+        lines.append(f'pos_span_duration_seconds_sum{{span="{label}"}} {total:.6f}')
+        lines.append(f'pos_span_duration_seconds_count{{span="{label}"}} {int(count)}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path: str) -> None:
+    # เขียนไฟล์ชั่วคราวแล้ว rename เพื่อให้ collector ไม่อ่านเจอไฟล์ที่เขียนไม่ครบ
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(prometheus_text())
+    os.replace(tmp_path, path)
+
+
+def _export_loop(path: str) -> None:
+    while True:
+        time.sleep(PROMETHEUS_INTERVAL)
+        if _enabled:
+            try:
+                write_prometheus(path)
+            except OSError:
+                pass
+
+
+_exporter_lock = threading.Lock()
+_exporter: Optional[threading.Thread] = None
+
+
+def ensure_exporter() -> None:
+    """เริ่ม thread เขียนไฟล์ Prometheus (ถ้าตั้ง ``POS_PERF_PROMETHEUS_FILE`` ไว้) มีได้ตัวเดียวต่อ process"""
+    global _exporter
+    if not PROMETHEUS_FILE:
+        return
+    with _exporter_lock:
+        if _exporter is None:
+            _exporter = threading.Thread(target=_export_loop, args=(PROMETHEUS_FILE,), name="perf-spans-exporter", daemon=True)
+            _exporter.start()
+
+
+ensure_exporter()
@@ -1,32 +1,46 @@
 import streamlit as st
-import requests
+import sqlite3
 import uuid
-from typing import List, Dict, Any
+from datetime import datetime
+from typing import List, Dict, Any, Optional
 
-API_BASE_URL = "http://localhost:8000"
+import api_client
+import perf_spans
+from api_client import API_BASE_URL
+from catalog_index import ALL_CATEGORIES, CatalogIndex, get_index
+from image_cache import images as product_images
+from order_queue import outbox as order_outbox, PENDING, SENDING, FAILED, UNCONFIRMED
+from snapshot_store import snapshots
 
-def get_products() -> List[Dict[str, Any]]:
+def get_catalog_index() -> Optional[CatalogIndex]:
     try:
-        response = requests.get(f"{API_BASE_URL}/products")
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        st.error(f"ไม่สามารถเชื่อมต่อกับ API ได้: {e}")
-        return []
+        return get_index()
+    except api_client.ApiError as e:
+        st.error(f"ไม่สามารถเชื่อมต่อกับ API ได้: {e.detail}")
+        return None
 
 def post_order(order_items: List[Dict[str, Any]]) -> bool:
-    order_data_to_send = {"items": order_items}
+    # บันทึกลงคิวในเครื่องแล้วกลับมาทันที worker เบื้องหลังจะส่งเข้า backend ให้เอง
+    # ถูกเรียกจาก callback ของ fragment จึงเก็บข้อความไว้ให้ render_cart แสดงแทนการแสดงผลตรงนี้
     try:
-        response = requests.post(f"{API_BASE_URL}/orders", json=order_data_to_send)
-        response.raise_for_status()
-        st.success(f"บันทึกออเดอร์สำเร็จ! หมายเลขออเดอร์: {response.json().get('id')}")
-        return True
-    except requests.exceptions.RequestException as e:
-        st.error(f"ไม่สามารถบันทึกออเดอร์ได้: {e.response.json().get('detail')}")
+        key = order_outbox.enqueue(order_items)
+    except sqlite3.Error as e:
+        st.session_state.checkout_message = ("error", f"ไม่สามารถบันทึกออเดอร์ได้: {e}")
         return False
+    st.session_state.checkout_message = ("success", f"รับออเดอร์แล้ว (เลขอ้างอิง {key[:8]}) กำลังส่งเข้าระบบ")
+    return True
 
 if 'cart' not in st.session_state:
     st.session_state.cart = {}
+if 'cart_total' not in st.session_state:
+    st.session_state.cart_total = 0.0
+
+# ยอดรวมของตะกร้าถูกปรับทีละรายการในฟังก์ชันด้านล่าง ไม่ต้องวนคำนวณใหม่ทุก rerun
+def _adjust_cart_total(delta: float):
+    st.session_state.cart_total = round(st.session_state.cart_total + delta, 2)
+
+def _unit_price(details: Dict[str, Any]) -> float:
+    return details['base_price'] + details['options_price']
 
 def add_to_cart(product: Dict[str, Any], selected_options: List[Dict[str, Any]]):
     line_item_id = str(uuid.uuid4())
@@ -35,103 +49,162 @@ def add_to_cart(product: Dict[str, Any], selected_options: List[Dict[str, Any]])
         "product_id": product['id'], "name": product['name'], "base_price": product['price'],
         "quantity": 1, "selected_options": selected_options, "options_price": options_price
     }
+    _adjust_cart_total(product['price'] + options_price)
+    # ตะกร้าอยู่คนละ fragment กับเมนู จึงต้อง rerun ทั้งหน้าเพื่อให้ตะกร้าแสดงรายการใหม่
     st.rerun()
 
 def remove_from_cart(line_item_id: str):
-    if line_item_id in st.session_state.cart:
-        del st.session_state.cart[line_item_id]
-        st.rerun()
-
-def update_quantity(line_item_id: str, quantity: int):
-    if line_item_id in st.session_state.cart:
-        if quantity > 0:
-            st.session_state.cart[line_item_id]['quantity'] = quantity
+    details = st.session_state.cart.pop(line_item_id, None)
+    if details is not None:
+        _adjust_cart_total(-_unit_price(details) * details['quantity'])
+
+def update_quantity(line_item_id: str):
+    details = st.session_state.cart.get(line_item_id)
+    if details is None:
+        return
+    quantity = st.session_state[f"qty_{line_item_id}"]
+    if quantity > 0:
+        _adjust_cart_total(_unit_price(details) * (quantity - details['quantity']))
+        details['quantity'] = quantity
+    else:
+        remove_from_cart(line_item_id)
+
+def clear_cart():
+    st.session_state.cart = {}
+    st.session_state.cart_total = 0.0
+
+def checkout():
+    order_items_to_send = [{"product_id": d["product_id"], "quantity": d["quantity"], "selected_options": d["selected_options"]} for d in st.session_state.cart.values()]
+    if post_order(order_items_to_send):
+        clear_cart()
+
+@st.fragment
+def render_product(product: Dict[str, Any]):
+    with st.expander(f"{product['name']} - {product['price']:.2f} ฿", expanded=False):
+        col_img, col_details = st.columns([1, 2])
+        with col_img:
+            if product.get("image_url"):
+                # รูปย่อจากแคชในเครื่อง ถ้ายังดึงไม่ได้ค่อยให้ browser โหลดรูปต้นฉบับเอง
+                st.image(product_images.get(product, "menu") or f"{API_BASE_URL}{product['image_url']}", use_container_width=True)
+        with col_details:
+            st.subheader(product['name'])
+            selected_options = []
+            if product.get('options'):
+                for option_group in product['options']:
+                    st.write(f"**{option_group['name']}**")
+                    choices_data = {f"{c['name']} (+{c['price']:.2f}฿)": c for c in option_group['choices']}
+                    if "ท็อปปิ้ง" in option_group['name']:
+                        chosen_names = st.multiselect(f"เลือก {option_group['name']}", options=list(choices_data.keys()), key=f"options_{product['id']}_{option_group['name']}")
+                        for name in chosen_names:
+                            selected_options.append(choices_data[name])
+                    else:
+                        chosen_name = st.radio(f"เลือก {option_group['name']}", options=list(choices_data.keys()), key=f"options_{product['id']}_{option_group['name']}", horizontal=True)
+                        if chosen_name:
+                            selected_options.append(choices_data[chosen_name])
+            if st.button("✔️ ยืนยันและเพิ่มลงตะกร้า", key=f"add_{product['id']}", type="primary"):
+                add_to_cart(product, selected_options)
+
+@st.fragment
+@perf_spans.timed("pos.cart")
+def render_cart():
+    st.header("🛒 รายการสั่งซื้อปัจจุบัน")
+    checkout_message = st.session_state.pop('checkout_message', None)
+    if checkout_message:
+        kind, text = checkout_message
+        if kind == "success":
+            st.toast(text, icon="✅")
+            st.balloons()
         else:
-            del st.session_state.cart[line_item_id]
-        st.rerun()
+            st.error(text)
+    if not st.session_state.cart:
+        st.info("ตะกร้าสินค้าว่างเปล่า")
+        return
+    header_cols = st.columns([4, 2, 2, 1])
+    header_cols[0].write("**สินค้า**")
+    header_cols[1].write("**จำนวน**")
+    header_cols[2].write("**ราคารวม**")
+    for line_item_id, details in st.session_state.cart.items():
+        item_cols = st.columns([4, 2, 2, 1])
+        with item_cols[0]:
+            st.write(details['name'])
+            if details['selected_options']:
+                options_str = ", ".join([opt['name'] for opt in details['selected_options']])
+                st.caption(f"└ {options_str}")
+        item_cols[1].number_input("Qty", min_value=0, value=details['quantity'], key=f"qty_{line_item_id}", label_visibility="collapsed", on_change=update_quantity, args=(line_item_id,))
+        item_cols[2].write(f"{_unit_price(details) * details['quantity']:.2f}")
+        item_cols[3].button("🗑️", key=f"del_{line_item_id}", on_click=remove_from_cart, args=(line_item_id,))
+    st.divider()
+    st.subheader(f"ยอดรวม: {st.session_state.cart_total:.2f} บาท")
+    col_btn1, col_btn2 = st.columns(2)
+    with col_btn1:
+        st.button("✅ ยืนยันการสั่งซื้อ", use_container_width=True, type="primary", on_click=checkout)
+    with col_btn2:
+        st.button("❌ ล้างตะกร้า", use_container_width=True, on_click=clear_cart)
+
+@st.fragment(run_every="5s")
+@perf_spans.timed("pos.outbox_status")
+def render_outbox_status():
+    counts = order_outbox.counts()
+    waiting = counts[PENDING] + counts[SENDING]
+    if waiting:
+        st.caption(f"📤 ออเดอร์รอส่งเข้าระบบ {waiting} รายการ")
+    if counts[UNCONFIRMED]:
+        # ส่งไปแล้วแต่ไม่รู้ผล ส่งใหม่อัตโนมัติไม่ได้เพราะอาจได้ออเดอร์ซ้ำ
+        with st.expander(f"❓ ออเดอร์ที่ไม่แน่ใจว่าเข้าระบบแล้ว {counts[UNCONFIRMED]} รายการ", expanded=True):
+            st.caption("ตรวจในหน้าประวัติออเดอร์ก่อน: ถ้ามีแล้วกด \"เข้าระบบแล้ว\" ถ้าไม่มีกด \"ส่งใหม่\"")
+            for queued in order_outbox.list_orders([UNCONFIRMED]):
+                created_at = datetime.fromtimestamp(queued.created_at).strftime('%H:%M:%S')
+                total_qty = sum(item['quantity'] for item in queued.items)
+                row_cols = st.columns([4, 1, 1])
+                row_cols[0].write(f"`{queued.idempotency_key[:8]}` {created_at} ({total_qty} ชิ้น)")
+                row_cols[0].caption(queued.last_error or "")
+                row_cols[1].button("เข้าระบบแล้ว", key=f"confirm_{queued.idempotency_key}", on_click=order_outbox.confirm_sent, args=(queued.idempotency_key,))
+                row_cols[2].button("ส่งใหม่", key=f"resend_{queued.idempotency_key}", on_click=order_outbox.retry, args=(queued.idempotency_key,))
+    if not counts[FAILED]:
+        return
+    with st.expander(f"⚠️ ออเดอร์ที่ส่งไม่สำเร็จ {counts[FAILED]} รายการ", expanded=True):
+        for queued in order_outbox.list_orders([FAILED]):
+            created_at = datetime.fromtimestamp(queued.created_at).strftime('%H:%M:%S')
+            total_qty = sum(item['quantity'] for item in queued.items)
+            row_cols = st.columns([4, 1, 1])
+            row_cols[0].write(f"`{queued.idempotency_key[:8]}` {created_at} ({total_qty} ชิ้น)")
+            row_cols[0].caption(queued.last_error or "")
+            row_cols[1].button("ส่งใหม่", key=f"retry_{queued.idempotency_key}", on_click=order_outbox.retry, args=(queued.idempotency_key,))
+            row_cols[2].button("ยกเลิก", key=f"discard_{queued.idempotency_key}", on_click=order_outbox.discard, args=(queued.idempotency_key,))
 
 st.set_page_config(layout="wide", page_title="Point of Sale")
 st.title("☕ Point of Sale (POS)")
 
-products = get_products()
-
-if products:
-    all_categories = sorted(list(set(p['category'] for p in products)))
-    categories_with_all = ["แสดงทั้งหมด"] + all_categories
-else:
-    categories_with_all = ["แสดงทั้งหมด"]
+# catalog ถูก revalidate โดย thread เบื้องหลังตัวเดียวของ process ไม่ใช่โดยแต่ละ session
+snapshots.ensure_worker()
+# ดัชนีหมวดหมู่/ค้นหาสร้างครั้งเดียวต่อ version ของ catalog แชร์ทุก session
+with perf_spans.span("pos.catalog_index"):
+    catalog_index = get_catalog_index()
+categories_with_all = [ALL_CATEGORIES] + (catalog_index.categories if catalog_index else [])
 
 col_menu, col_cart = st.columns([2, 1.2])
 
 with col_menu:
     st.header("เมนูสินค้า")
-    selected_category = st.selectbox("เลือกหมวดหมู่:", options=categories_with_all)
-    filtered_products = [p for p in products if selected_category == "แสดงทั้งหมด" or p['category'] == selected_category]
-    
+    col_search, col_category = st.columns([3, 2])
+    search_text = col_search.text_input("ค้นหาสินค้า:", key="menu_search", placeholder="พิมพ์ชื่อเมนู เช่น ชาไทย")
+    selected_category = col_category.selectbox("เลือกหมวดหมู่:", options=categories_with_all)
+    if catalog_index is None:
+        filtered_products = []
+    elif search_text.strip():
+        with perf_spans.span("pos.search"):
+            filtered_products = catalog_index.search(search_text, category=selected_category)
+    else:
+        filtered_products = catalog_index.products_in(selected_category)
+
     if not filtered_products:
-        st.info("ไม่พบสินค้าในหมวดหมู่นี้")
+        st.info("ไม่พบสินค้าที่ค้นหา" if search_text.strip() else "ไม่พบสินค้าในหมวดหมู่นี้")
     else:
-        for product in filtered_products:
-            with st.expander(f"{product['name']} - {product['price']:.2f} ฿", expanded=False):
-                col_img, col_details = st.columns([1, 2])
-                with col_img:
-                    if product.get("image_url"):
-                        st.image(f"{API_BASE_URL}{product['image_url']}", use_container_width=True)
-                with col_details:
-                    st.subheader(product['name'])
-                    selected_options = []
-                    if product.get('options'):
-                        for option_group in product['options']:
-                            st.write(f"**{option_group['name']}**")
-                            choices_data = {f"{c['name']} (+{c['price']:.2f}฿)": c for c in option_group['choices']}
-                            if "ท็อปปิ้ง" in option_group['name']:
-                                chosen_names = st.multiselect(f"เลือก {option_group['name']}", options=list(choices_data.keys()), key=f"options_{product['id']}_{option_group['name']}")
-                                for name in chosen_names:
-                                    selected_options.append(choices_data[name])
-                            else:
-                                chosen_name = st.radio(f"เลือก {option_group['name']}", options=list(choices_data.keys()), key=f"options_{product['id']}_{option_group['name']}", horizontal=True)
-                                if chosen_name:
-                                    selected_options.append(choices_data[chosen_name])
-                    if st.button("✔️ ยืนยันและเพิ่มลงตะกร้า", key=f"add_{product['id']}", type="primary"):
-                        add_to_cart(product, selected_options)
+        with perf_spans.span("pos.menu"):
+            for product in filtered_products:
+                render_product(product)
 
 with col_cart:
-    st.header("🛒 รายการสั่งซื้อปัจจุบัน")
-    if not st.session_state.cart:
-        st.info("ตะกร้าสินค้าว่างเปล่า")
-    else:
-        total_amount = 0.0
-        header_cols = st.columns([4, 2, 2, 1])
-        header_cols[0].write("**สินค้า**")
-        header_cols[1].write("**จำนวน**")
-        header_cols[2].write("**ราคารวม**")
-        for line_item_id, details in list(st.session_state.cart.items()):
-            item_cols = st.columns([4, 2, 2, 1])
-            with item_cols[0]:
-                st.write(details['name'])
-                if details['selected_options']:
-                    options_str = ", ".join([opt['name'] for opt in details['selected_options']])
-                    st.caption(f"└ {options_str}")
-            new_quantity = item_cols[1].number_input("Qty", min_value=0, value=details['quantity'], key=f"qty_{line_item_id}", label_visibility="collapsed")
-            if new_quantity != details['quantity']:
-                update_quantity(line_item_id, new_quantity)
-            unit_price = details['base_price'] + details['options_price']
-            item_total = unit_price * details['quantity']
-            item_cols[2].write(f"{item_total:.2f}")
-            if item_cols[3].button("🗑️", key=f"del_{line_item_id}"):
-                remove_from_cart(line_item_id)
-            total_amount += item_total
-        st.divider()
-        st.subheader(f"ยอดรวม: {total_amount:.2f} บาท")
-        col_btn1, col_btn2 = st.columns(2)
-        with col_btn1:
-            if st.button("✅ ยืนยันการสั่งซื้อ", use_container_width=True, type="primary"):
-                order_items_to_send = [{"product_id": d["product_id"], "quantity": d["quantity"], "selected_options": d["selected_options"]} for d in st.session_state.cart.values()]
-                if post_order(order_items_to_send):
-                    st.session_state.cart = {}
-                    st.balloons()
-                    st.rerun()
-        with col_btn2:
-            if st.button("❌ ล้างตะกร้า", use_container_width=True):
-                st.session_state.cart = {}
-                st.rerun()
\ No newline at end of file
+    render_cart()
+    order_outbox.ensure_worker()
+    render_outbox_status()
@@ -0,0 +1,133 @@
+"""ยอดขายสรุปล่วงหน้า (rollup) รายวัน สำหรับตอบคำถามของ Dashboard ตามช่วงวันที่
+
+เก็บสองตาราง:
+  * ``daily``  - รายวัน: ยอดขาย (``total_amount``) และจำนวนออเดอร์
+  * ``cells``  - วัน x สินค้า: จำนวนชิ้น, ยอดขายของรายการ และจำนวนออเดอร์ที่มีสินค้านั้น
+
+หมวดหมู่ผูกกับสินค้าตอน query ผ่าน catalog ปัจจุบัน (มีแค่หลักร้อยแถว) จึงไม่ต้องสร้าง
+rollup ใหม่เมื่อย้ายหมวดหมู่สินค้า เมื่อ order store มีออเดอร์ใหม่ จะรวมเฉพาะแถวที่เพิ่มมา
+ต่อเข้ากับตารางเดิม การ query จึงใช้เวลาตามจำนวนวันในช่วง ไม่ใช่จำนวนออเดอร์ทั้งหมด
+"""
+
+import threading
+from datetime import date
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+import perf_spans
+from line_items import flatten_line_items
+
+DAILY_COLUMNS = ["total_amount", "order_count"]
+CELL_KEYS = ["day", "product_id", "product_name"]
+CELL_COLUMNS = ["quantity", "item_total", "order_count"]
+
+
+class RollupResult(NamedTuple):
+    total_revenue: float
+    total_orders: int
+    daily_sales: pd.DataFrame  # order_date, total_amount
+    top_products: pd.DataFrame  # product_name, quantity
+    category_sales: pd.DataFrame  # category, item_total
+
+
+def _day(timestamps: pa.ChunkedArray) -> pa.ChunkedArray:
+    return pc.cast(timestamps, pa.date32())
+
+
+def _aggregate(orders: pa.Table):
+    order_days = pa.table({"day": _day(orders.column("order_date")), "total_amount": orders.column("total_amount"), "id": orders.column("id")})
+    daily = order_days.group_by("day").aggregate([("total_amount", "sum"), ("id", "count")]).to_pandas()
+    daily = daily.rename(columns={"total_amount_sum": "total_amount", "id_count": "order_count"})
+    daily["day"] = pd.to_datetime(daily["day"])
+
+    with perf_spans.span("rollup.flatten"):
+        items = flatten_line_items(orders)
+    items = pa.table({
+        "day": _day(items.column("order_date")),
+        "product_id": items.column("product_id"),
+        "product_name": pc.cast(items.column("product_name"), pa.string()),
+        "quantity": items.column("quantity"),
+        "item_total": items.column("item_total"),
+        "order_id": items.column("order_id"),
+    })
+    with perf_spans.span("rollup.groupby"):
+        cells = items.group_by(CELL_KEYS).aggregate([("quantity", "sum"), ("item_total", "sum"), ("order_id", "count_distinct")]).to_pandas()
+    cells = cells.rename(columns={"quantity_sum": "quantity", "item_total_sum": "item_total", "order_id_count_distinct": "order_count"})
+    cells["day"] = pd.to_datetime(cells["day"])
+    return daily.set_index("day")[DAILY_COLUMNS], cells.set_index(CELL_KEYS)[CELL_COLUMNS]
+
+
+def _merge(current: Optional[pd.DataFrame], new: pd.DataFrame) -> pd.DataFrame:
+    # ออเดอร์ในแต่ละรอบไม่ซ้ำกัน จึงรวมค่าแต่ละ cell ด้วยการบวกได้ทุกคอลัมน์ (รวมถึงจำนวนออเดอร์)
+    # dropna=False: รายการข้อมูลเก่าที่ไม่มี product_id ต้องไม่หายไปตอนรวมรอบถัดไป
+    if current is None or current.empty:
+        return new.sort_index()
+    return pd.concat([current, new]).groupby(level=list(range(new.index.nlevels)), dropna=False).sum().sort_index()
+
+
+class SalesRollup:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation: Optional[int] = None
+        self._rows_seen = 0
+        self.daily: Optional[pd.DataFrame] = None
+        self.cells: Optional[pd.DataFrame] = None
+
+    def update(self, store: Any) -> int:
+        """รวมออเดอร์ที่ยังไม่เคยนับจาก ``order_store.OrderStore`` คืนจำนวนออเดอร์ที่รวมเพิ่ม"""
+        with self._lock:
+            if self._generation != store.generation:
+                self._generation = store.generation
+                self._rows_seen = 0
+                self.daily = self.cells = None
+            table = store.table()
+            if table.num_rows <= self._rows_seen:
+                return 0
+            new_rows = table.slice(self._rows_seen)
+            daily, cells = _aggregate(new_rows)
+            self.daily = _merge(self.daily, daily)
+            self.cells = _merge(self.cells, cells)
+            self._rows_seen = table.num_rows
+            return new_rows.num_rows
+
+    @perf_spans.timed("rollup.query")
+    def query(self, start_date: date, end_date: date, products: Optional[List[Dict[str, Any]]] = None) -> RollupResult:
+        """สรุปยอดขายตั้งแต่ ``start_date`` ถึง ``end_date`` (รวมทั้งสองวัน)"""
+        start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+        with self._lock:
+            daily, cells = self.daily, self.cells
+        if daily is None or daily.empty:
+            return RollupResult(0.0, 0, _empty(["order_date", "total_amount"]), _empty(["product_name", "quantity"]), _empty(["category", "item_total"]))
+
+        daily_in_range = daily.loc[start:end]
+        cells_in_range = cells.loc[start:end]
+        total_revenue = float(daily_in_range["total_amount"].sum())
+        total_orders = int(daily_in_range["order_count"].sum())
+
+        # เหมือน resample('D'): ทุกวันตั้งแต่วันแรกถึงวันสุดท้ายที่มีออเดอร์ วันที่ไม่มีขายเป็น 0
+        if daily_in_range.empty:
+            daily_sales = _empty(["order_date", "total_amount"])
+        else:
+            days = pd.date_range(daily_in_range.index.min(), daily_in_range.index.max(), freq="D")
+            daily_sales = daily_in_range["total_amount"].reindex(days, fill_value=0.0).rename_axis("order_date").reset_index()
+
+        top_products = cells_in_range.groupby(level="product_name")["quantity"].sum().sort_values(ascending=False).reset_index()
+
+        category_sales = _empty(["category", "item_total"])
+        if products and not cells_in_range.empty:
+            category_map = pd.Series({p["id"]: p.get("category") for p in products}, dtype=object)
+            revenue_by_product = cells_in_range.groupby(level="product_id")["item_total"].sum()
+            categories = revenue_by_product.index.map(category_map)
+            category_sales = revenue_by_product.groupby(categories).sum().rename_axis("category").reset_index()
+
+        return RollupResult(total_revenue, total_orders, daily_sales, top_products, category_sales)
+
+
+def _empty(columns: List[str]) -> pd.DataFrame:
+    return pd.DataFrame({c: [] for c in columns})
+
+
+rollup = SalesRollup()
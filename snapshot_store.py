@@ -0,0 +1,193 @@
+"""snapshot ของ catalog และออเดอร์ที่แชร์กันทุก session ใน process โดยมี thread เบื้องหลังตัวเดียวคอยดึงใหม่
+
+หน้าเพจไม่เรียก backend เองเพื่ออ่านข้อมูล แต่อ่าน snapshot ล่าสุดที่ thread นี้เตรียมไว้:
+  * catalog - ``catalog_cache.catalog`` ถูก revalidate ทุก ``CATALOG_INTERVAL`` วินาที เมื่อ version เปลี่ยน
+    จะส่งรูปสินค้าที่ยังไม่มีในแคชให้ ``image_cache.images`` สร้างเบื้องหลัง
+  * ออเดอร์ - ``order_store.store`` ถูก sync และ ``sales_rollup.rollup`` ถูกอัปเดตทุก ``ORDERS_INTERVAL``
+    วินาที แล้วเผยแพร่เป็น ``OrdersSnapshot`` (ตาราง Arrow ที่แก้ไขไม่ได้)
+
+จำนวน request ไป backend จึงขึ้นกับรอบเวลาเท่านั้น ไม่ขึ้นกับจำนวน session ที่เปิดอยู่ และทุก session
+ได้อ็อบเจกต์ชุดเดียวกัน (ไม่คัดลอก) ห้ามแก้ไขข้อมูลที่ได้จาก snapshot ในที่
+
+หลังโหลดออเดอร์ครั้งแรกจะเปิด feed สด (``order_feed``) ระหว่างที่ feed เชื่อมต่ออยู่จะไม่ poll ออเดอร์
+ออเดอร์จาก feed ถูกต่อท้าย store, รวมเข้า rollup และเผยแพร่เป็น snapshot ใหม่ทันที (รวบเป็นชุดตามที่
+thread เบื้องหลังตามทัน) ถ้า backend ไม่มี feed หรือ feed ขาดอยู่ จะกลับไป poll ทุก ``ORDERS_INTERVAL``
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import pyarrow as pa
+
+import api_client
+import perf_spans
+from catalog_cache import CatalogCache, catalog
+from image_cache import ImageCache, images as product_images
+from order_feed import FEED_ENABLED, OrderFeed
+from order_store import OrderStore, store as order_store
+from sales_rollup import SalesRollup, rollup as sales_rollup
+
+logger = logging.getLogger(__name__)
+
+CATALOG_INTERVAL = float(os.environ.get("POS_SNAPSHOT_CATALOG_INTERVAL", "15"))
+ORDERS_INTERVAL = float(os.environ.get("POS_SNAPSHOT_ORDERS_INTERVAL", "10"))
+
+
+class OrdersSnapshot(NamedTuple):
+    version: int
+    table: pa.Table
+    high_water_mark: int
+    refreshed_at: float
+
+
+class SnapshotStore:
+    def __init__(
+        self,
+        catalog_source: CatalogCache = catalog,
+        orders_source: OrderStore = order_store,
+        rollup: SalesRollup = sales_rollup,
+        catalog_interval: float = CATALOG_INTERVAL,
+        orders_interval: float = ORDERS_INTERVAL,
+        live_feed: bool = FEED_ENABLED,
+        images: Optional[ImageCache] = product_images,
+    ):
+        self.catalog_source = catalog_source
+        self.images = images
+        self._images_catalog_version = 0
+        self.orders_source = orders_source
+        self.rollup = rollup
+        self.catalog_interval = catalog_interval
+        self.orders_interval = orders_interval
+        self._orders: Optional[OrdersSnapshot] = None
+        self._orders_ready = threading.Event()
+        # sync, ต่อท้ายจาก feed และเผยแพร่ snapshot ทำได้ทีละงาน (feed ตามส่วนที่ขาดจาก thread ของมันเอง)
+        self._orders_lock = threading.Lock()
+        self._live_orders: List[Dict[str, Any]] = []
+        self._live_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+        self.last_orders_error: Optional[api_client.ApiError] = None
+        self.feed = OrderFeed(lambda: self.orders_source.high_water_mark, self._on_live_orders, self._catch_up) if live_feed else None
+
+    # --- ฝั่งหน้าเพจ ---
+
+    def orders(self, wait: float = 0.0) -> Optional[OrdersSnapshot]:
+        """snapshot ออเดอร์ล่าสุด หรือ ``None`` ถ้ายังไม่เคยโหลด
+
+        ``wait`` > 0 จะรอ (ไม่เกินเท่านั้นวินาที) ให้การโหลดครั้งแรกเสร็จ ทุก session รอรอบเดียวกัน
+        """
+        self.ensure_worker()
+        if wait and self._orders is None:
+            self._orders_ready.wait(wait)
+        return self._orders
+
+    @property
+    def live(self) -> bool:
+        """ได้ออเดอร์จาก feed สดอยู่ (False = poll ทุก ``orders_interval`` วินาที)"""
+        return self.feed is not None and self.feed.connected
+
+    # --- worker ---
+
+    def _publish_orders(self) -> None:
+        current = self._orders
+        if current is None or current.version != self.orders_source.version:
+            self._orders = OrdersSnapshot(self.orders_source.version, self.orders_source.table(), self.orders_source.high_water_mark, time.time())
+
+    @perf_spans.timed("snapshot.catalog")
+    def _refresh_catalog(self) -> None:
+        try:
+            self.catalog_source.refresh()
+        except api_client.ApiError as e:
+            logger.warning("catalog refresh failed: %s", e)
+        version = self.catalog_source.version
+        if self.images is not None and version and version != self._images_catalog_version:
+            self._images_catalog_version = version
+            scheduled = self.images.prefetch(self.catalog_source.get_snapshot().products)
+            if scheduled:
+                logger.info("prefetching %d product images", scheduled)
+
+    @perf_spans.timed("snapshot.orders")
+    def _refresh_orders(self) -> None:
+        with self._orders_lock:
+            try:
+                self.orders_source.sync(force=True)
+                self.last_orders_error = None
+            except api_client.ApiError as e:
+                self.last_orders_error = e
+                logger.warning("order refresh failed: %s", e)
+            try:
+                self.rollup.update(self.orders_source)
+                self._publish_orders()
+            finally:
+                self._orders_ready.set()
+
+    def _catch_up(self) -> None:
+        # feed แจ้งว่าส่งย้อนหลังให้ไม่ได้: ดึงส่วนที่ขาดทาง REST ก่อนให้ feed ต่อใหม่จาก high-water mark ใหม่
+        self._refresh_orders()
+        if self.last_orders_error is not None:
+            raise self.last_orders_error
+
+    def _on_live_orders(self, orders: List[Dict[str, Any]]) -> None:
+        with self._live_lock:
+            self._live_orders.extend(orders)
+        self._wake.set()
+
+    @perf_spans.timed("snapshot.live_orders")
+    def _apply_live_orders(self) -> None:
+        with self._live_lock:
+            batch, self._live_orders = self._live_orders, []
+        if not batch:
+            return
+        with self._orders_lock:
+            if self.orders_source.append_live(batch):
+                self.rollup.update(self.orders_source)
+                self._publish_orders()
+
+    def _run(self) -> None:
+        next_catalog = next_orders = 0.0
+        while not self._stop.is_set():
+            self._wake.clear()
+            now = time.monotonic()
+            try:
+                self._apply_live_orders()
+                if now >= next_catalog:
+                    self._refresh_catalog()
+                    next_catalog = time.monotonic() + self.catalog_interval
+                if now >= next_orders:
+                    if not self.live:
+                        self._refresh_orders()
+                    if self.feed is not None:
+                        self.feed.start()
+                    next_orders = time.monotonic() + self.orders_interval
+            except Exception:
+                logger.exception("snapshot refresh error")
+                next_catalog = max(next_catalog, time.monotonic() + self.catalog_interval)
+                next_orders = max(next_orders, time.monotonic() + self.orders_interval)
+            self._wake.wait(max(0.0, min(next_catalog, next_orders) - time.monotonic()))
+
+    def ensure_worker(self) -> None:
+        """เริ่ม thread เบื้องหลัง (ถ้ายังไม่ได้เริ่ม) มีได้ตัวเดียวต่อ process"""
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._stop.clear()
+                self.catalog_source.background_interval = self.catalog_interval
+                self._worker = threading.Thread(target=self._run, name="snapshot-refresher", daemon=True)
+                self._worker.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self.feed is not None:
+            self.feed.stop()
+        if self._worker is not None:
+            self._worker.join(timeout)
+        self.orders_source.flush_live()
+        self.catalog_source.background_interval = None
+
+
+snapshots = SnapshotStore()